@@ -33,7 +33,8 @@ async def save_upload_file(upload_file: UploadFile, upload_dir: str = None) -> s
     allowed_formats = (
         settings.ALLOWED_IMAGE_FORMATS +
         settings.ALLOWED_AUDIO_FORMATS +
-        settings.ALLOWED_VIDEO_FORMATS
+        settings.ALLOWED_VIDEO_FORMATS +
+        settings.ALLOWED_DOCUMENT_FORMATS
     )
     
     if file_extension not in allowed_formats:
@@ -61,6 +62,8 @@ def get_media_type(filename: str) -> str:
         return "audio"
     elif extension in settings.ALLOWED_VIDEO_FORMATS:
         return "video"
+    elif extension in settings.ALLOWED_DOCUMENT_FORMATS:
+        return "document"
     else:
         raise ValueError(f"Неподдерживаемый формат файла: {extension}")
 
@@ -1,9 +1,13 @@
 from fastapi import APIRouter, UploadFile, File, Form, HTTPException
+from fastapi.responses import StreamingResponse
 from app.api.dependencies import save_upload_file, get_media_type
-from app.core.models import ProcessMediaRequest, ProcessMediaResponse, MediaType
+from app.core.models import ProcessMediaRequest, ProcessMediaResponse, MediaType, DubbingResponse
+from app.core.config import settings
 from app.services.media_processor import media_processor
+from app.services.dubbing_service import dubbing_service
+from app.services.executors import service_executors, ExecutorBusyError
 from typing import List, Optional
-import asyncio
+import json
 import time
 import os
 
@@ -43,16 +47,16 @@ async def process_media(
             replace_text_on_image=replace_text_on_image,
             enable_diarization=enable_diarization
         )
-        loop = asyncio.get_event_loop()
-        result = await loop.run_in_executor(
-            None,
-            lambda: media_processor.process_media(request, file_path)
+        result = await service_executors.for_media(media_type.value).run(
+            media_processor.process_media, request, file_path
         )
         return result
         
     except HTTPException:
         
         raise
+    except ExecutorBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except ValueError as e:
         
         raise HTTPException(status_code=400, detail=f"Ошибка валидации: {str(e)}")
@@ -71,3 +75,145 @@ async def process_media(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Ошибка обработки файла: {str(e)}")
 
+
+
+@router.post("/images", response_model=List[ProcessMediaResponse])
+async def process_images(
+    files: List[UploadFile] = File(...),
+    target_languages: str = Form("ru,kk,en"),
+    replace_text_on_image: bool = Form(False)
+) -> List[ProcessMediaResponse]:
+    """
+    Пакетная обработка нескольких изображений (альбома): распознавание + перевод
+    
+    Параметры:
+    - files: Изображения для обработки
+    - target_languages: Языки для перевода (через запятую, например: "ru,kk,en")
+    - replace_text_on_image: Заменить ли текст на изображениях
+    
+    Результаты возвращаются в порядке загруженных файлов.
+    """
+    if len(files) > settings.OCR_BATCH_MAX_IMAGES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Слишком много изображений: максимум {settings.OCR_BATCH_MAX_IMAGES}"
+        )
+    try:
+        file_paths = []
+        for file in files:
+            if get_media_type(file.filename) != MediaType.IMAGE.value:
+                raise ValueError(f"Файл {file.filename} не является изображением")
+            file_paths.append(await save_upload_file(file))
+        
+        request = ProcessMediaRequest(
+            media_type=MediaType.IMAGE,
+            target_languages=[lang.strip() for lang in target_languages.split(",")],
+            replace_text_on_image=replace_text_on_image
+        )
+        return await service_executors["ocr"].run(media_processor.process_images, request, file_paths)
+        
+    except HTTPException:
+        raise
+    except ExecutorBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Ошибка валидации: {str(e)}")
+    except ImportError as e:
+        raise HTTPException(
+            status_code=503,
+            detail="Для обработки изображений необходимо установить EasyOCR. Выполните: pip install easyocr"
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Ошибка обработки файлов: {str(e)}")
+
+
+
+@router.post("/document")
+async def process_document(
+    file: UploadFile = File(...),
+    target_languages: str = Form("ru,kk,en")
+) -> StreamingResponse:
+    """
+    Постраничная обработка PDF или многостраничного TIFF (Server-Sent Events)
+    
+    Параметры:
+    - file: Документ (.pdf, .tif, .tiff)
+    - target_languages: Языки для перевода (через запятую, например: "ru,kk,en")
+    
+    События:
+    - page: распознанный и переведенный текст страницы (page, page_count,
+      source - "text_layer" или "ocr", dpi, recognition, translation)
+    - done: число обработанных страниц
+    - error: ошибка обработки
+    """
+    try:
+        if get_media_type(file.filename) != MediaType.DOCUMENT.value:
+            raise ValueError(f"Файл {file.filename} не является документом")
+        file_path = await save_upload_file(file)
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Ошибка валидации: {str(e)}")
+    
+    request = ProcessMediaRequest(
+        media_type=MediaType.DOCUMENT,
+        target_languages=[lang.strip() for lang in target_languages.split(",")]
+    )
+    
+    def event_stream():
+        pages = 0
+        try:
+            for page in media_processor.process_document(request, file_path):
+                pages += 1
+                yield f"event: page\ndata: {json.dumps(page, ensure_ascii=False)}\n\n"
+            yield f"event: done\ndata: {json.dumps({'pages': pages}, ensure_ascii=False)}\n\n"
+        except Exception as e:
+            yield f"event: error\ndata: {json.dumps({'detail': str(e)}, ensure_ascii=False)}\n\n"
+    
+    try:
+        events = await service_executors["ocr"].iterate(event_stream())
+    except ExecutorBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+
+@router.post("/dub", response_model=DubbingResponse)
+async def dub_video(
+    file: UploadFile = File(...),
+    target_language: str = Form("ru")
+) -> DubbingResponse:
+    """
+    Дубляж видео: речь распознается по сегментам, переводится и озвучивается
+    
+    Параметры:
+    - file: Видео (.mp4, .webm, .avi)
+    - target_language: Язык озвучки
+    
+    Каждый озвученный сегмент подгоняется под свой интервал (ускорение не
+    больше DUB_MAX_SPEEDUP), видеопоток копируется без перекодирования.
+    Результат - MP4 в каталоге загрузок (video_path).
+    """
+    try:
+        if get_media_type(file.filename) != MediaType.VIDEO.value:
+            raise ValueError(f"Файл {file.filename} не является видео")
+        file_path = await save_upload_file(file)
+        
+        result = await service_executors["asr"].run(dubbing_service.dub, file_path, target_language.strip())
+        return DubbingResponse(**result)
+        
+    except HTTPException:
+        raise
+    except ExecutorBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Ошибка валидации: {str(e)}")
+    except ImportError as e:
+        raise HTTPException(status_code=503, detail=f"AI-модель не установлена: {str(e)}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Ошибка дубляжа: {str(e)}")
@@ -2,8 +2,8 @@ from fastapi import APIRouter, UploadFile, File, Form, HTTPException
 from app.api.dependencies import save_upload_file, get_media_type
 from app.core.models import ProcessMediaRequest, ProcessMediaResponse, MediaType
 from app.services.media_processor import media_processor
+from app.services.executors import service_executors, ExecutorBusyError
 from typing import List, Optional
-import asyncio
 import time
 import os
 
@@ -42,15 +42,15 @@ async def process_media_quick(
             generate_tts=False,  
             replace_text_on_image=False  
         )
-        loop = asyncio.get_event_loop()
-        result = await loop.run_in_executor(
-            None,
-            lambda: media_processor.process_media(request, file_path)
+        result = await service_executors.for_media(media_type.value).run(
+            media_processor.process_media, request, file_path
         )
         return result
         
     except HTTPException:
         raise
+    except ExecutorBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except ValueError as e:
         raise HTTPException(status_code=400, detail=f"Ошибка валидации: {str(e)}")
     except ImportError as e:
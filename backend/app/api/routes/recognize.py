@@ -1,7 +1,8 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException
 from app.api.dependencies import save_upload_file, get_media_type
 from app.services.whisper_service import whisper_service
-from app.services.ocr_service import ocr_service
+from app.services.ocr_service import ocr_service, NoTextDetectedError
+from app.services.executors import service_executors, ExecutorBusyError
 from app.core.models import RecognitionResponse, MediaType
 import os
 
@@ -15,6 +16,27 @@ except ImportError:
 router = APIRouter()
 
 
+def _transcribe_video(file_path: str, enable_diarization: bool) -> dict:
+    """Извлечение звуковой дорожки видео и распознавание речи"""
+    audio_path = file_path.replace(os.path.splitext(file_path)[1], ".wav")
+    video = VideoFileClip(file_path)
+    if video.audio is None:
+        video.close()
+        raise ValueError("Видео не содержит аудио дорожку")
+    video.audio.write_audiofile(audio_path, verbose=False, logger=None)
+    video.close()
+    
+    result = whisper_service.transcribe(
+        audio_path, 
+        return_timestamps=True,
+        enable_diarization=enable_diarization
+    )
+    
+    if os.path.exists(audio_path):
+        os.remove(audio_path)
+    return result
+
+
 @router.post("", response_model=RecognitionResponse)
 async def recognize_media(
     file: UploadFile = File(...),
@@ -40,11 +62,12 @@ async def recognize_media(
         
         if media_type == "image":
             
-            result = ocr_service.recognize(file_path, return_boxes=True)
+            result = await service_executors["ocr"].run(ocr_service.recognize, file_path, return_boxes=True)
             
         elif media_type == "audio":
             
-            result = whisper_service.transcribe(
+            result = await service_executors["asr"].run(
+                whisper_service.transcribe,
                 file_path, 
                 return_timestamps=True,
                 enable_diarization=enable_diarization
@@ -54,24 +77,10 @@ async def recognize_media(
             
             if not MOVIEPY_AVAILABLE:
                 raise HTTPException(status_code=500, detail="MoviePy не установлен. Установите: pip install moviepy")
-            audio_path = file_path.replace(os.path.splitext(file_path)[1], ".wav")
             try:
-                video = VideoFileClip(file_path)
-                if video.audio is not None:
-                    video.audio.write_audiofile(audio_path, verbose=False, logger=None)
-                    video.close()
-                    
-                    result = whisper_service.transcribe(
-                        audio_path, 
-                        return_timestamps=True,
-                        enable_diarization=enable_diarization
-                    )
-                    
-                    if os.path.exists(audio_path):
-                        os.remove(audio_path)
-                else:
-                    video.close()
-                    raise HTTPException(status_code=400, detail="Видео не содержит аудио дорожку")
+                result = await service_executors["asr"].run(_transcribe_video, file_path, enable_diarization)
+            except ExecutorBusyError:
+                raise
             except Exception as e:
                 raise HTTPException(status_code=400, detail=f"Ошибка обработки видео: {str(e)}")
         
@@ -89,14 +98,14 @@ async def recognize_media(
             segments=result.get("segments"),
             bounding_boxes=result.get("bounding_boxes"),
             speakers=result.get("speakers")
-        )(
-            text=result.get("text", ""),
-            language=result.get("language"),
-            confidence=result.get("confidence"),
-            segments=result.get("segments"),
-            bounding_boxes=result.get("bounding_boxes")
         )
         
+    except HTTPException:
+        raise
+    except ExecutorBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except NoTextDetectedError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
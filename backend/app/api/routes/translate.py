@@ -1,6 +1,15 @@
 from fastapi import APIRouter, HTTPException
-from app.core.models import TranslationRequest, TranslationResponse
+from fastapi.responses import StreamingResponse
+from app.core.config import settings
+from app.core.models import (
+    TranslationRequest,
+    TranslationResponse,
+    TranslationBatchRequest,
+    TranslationBatchResponse
+)
 from app.services.translation_service import translation_service
+from app.services.executors import service_executors, ExecutorBusyError
+import json
 
 router = APIRouter()
 
@@ -20,22 +29,82 @@ async def translate_text(request: TranslationRequest) -> TranslationResponse:
     - zh: 中文 (бонус)
     """
     try:
-        translations = translation_service.translate_multiple(
+        result = await service_executors["mt"].run(
+            translation_service.translate_document,
             request.text,
             source_language=request.source_language,
             target_languages=request.target_languages
         )
         
+        return TranslationResponse(**result)
+    except ExecutorBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+
+@router.post("/stream")
+async def translate_text_stream(request: TranslationRequest) -> StreamingResponse:
+    """
+    Потоковый перевод текста (Server-Sent Events)
+    
+    События:
+    - start: определенный исходный язык и языки перевода
+    - delta: очередной кусок перевода для языка language
+    - done: полный результат в формате /api/translate
+    - error: ошибка перевода
+    """
+    def event_stream():
+        try:
+            for event in translation_service.translate_stream(
+                request.text,
+                source_language=request.source_language,
+                target_languages=request.target_languages
+            ):
+                name = event.pop("event")
+                yield f"event: {name}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+        except Exception as e:
+            yield f"event: error\ndata: {json.dumps({'detail': str(e)}, ensure_ascii=False)}\n\n"
+    
+    try:
+        events = await service_executors["mt"].iterate(event_stream())
+    except ExecutorBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.post("/batch", response_model=TranslationBatchResponse)
+async def translate_batch(request: TranslationBatchRequest) -> TranslationBatchResponse:
+    """
+    Пакетный перевод списка текстов на указанные языки
+    
+    Одинаковые тексты переводятся один раз, результаты возвращаются
+    в порядке входного списка.
+    """
+    if len(request.texts) > settings.TRANSLATION_BATCH_MAX_TEXTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Слишком много текстов в запросе (максимум {settings.TRANSLATION_BATCH_MAX_TEXTS})"
+        )
+    
+    try:
+        results = await service_executors["mt"].run(
+            translation_service.translate_batch,
+            request.texts,
+            source_language=request.source_language,
+            target_languages=request.target_languages
+        )
         
-        source_lang = request.source_language
-        if source_lang is None:
-            source_lang = translation_service.detect_language(request.text)
-        
-        return TranslationResponse(
-            original_text=request.text,
-            source_language=source_lang,
-            translations=translations
+        return TranslationBatchResponse(
+            results=[TranslationResponse(**result) for result in results]
         )
+    except ExecutorBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-
@@ -1,8 +1,9 @@
 from fastapi import APIRouter, HTTPException
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse
 from pydantic import BaseModel
 from typing import Optional
 from app.services.tts_service import tts_service
+from app.services.executors import service_executors, ExecutorBusyError
 import os
 
 router = APIRouter()
@@ -20,6 +21,7 @@ class TTSResponse(BaseModel):
     voice: str
     duration_seconds: float
     file_size_bytes: int
+    cached: bool = False
     success: bool
 
 
@@ -42,7 +44,8 @@ async def text_to_speech(request: TTSRequest) -> TTSResponse:
     - ar: العربية 🇸🇦 (использует английскую модель)
     """
     try:
-        result = tts_service.synthesize(
+        result = await service_executors["tts"].run(
+            tts_service.synthesize,
             text=request.text,
             language=request.language,
             voice=request.voice
@@ -65,8 +68,11 @@ async def text_to_speech(request: TTSRequest) -> TTSResponse:
             voice=result["voice"],
             duration_seconds=result["duration_seconds"],
             file_size_bytes=result["file_size_bytes"],
+            cached=result.get("cached", False),
             success=True
         )
+    except ExecutorBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -74,6 +80,53 @@ async def text_to_speech(request: TTSRequest) -> TTSResponse:
         )
 
 
+async def _stream_speech(text: str, language: str, voice: Optional[str]) -> StreamingResponse:
+    try:
+        media_type, audio = await service_executors["tts"].run(
+            tts_service.synthesize_stream, text, language=language, voice=voice
+        )
+        audio = await service_executors["tts"].iterate(audio)
+    except ExecutorBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Ошибка синтеза речи: {str(e)}"
+        )
+    
+    return StreamingResponse(
+        audio,
+        media_type=media_type,
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.post("/stream")
+async def text_to_speech_stream(request: TTSRequest) -> StreamingResponse:
+    """
+    Потоковый синтез речи: аудио отдается по мере синтеза предложений
+    
+    Ответ - chunked MP3 (audio/mpeg) при синтезе через Google TTS или
+    потоковый WAV (audio/wav) при синтезе через Coqui TTS. Воспроизведение
+    первого предложения можно начинать, пока синтезируются остальные.
+    """
+    return await _stream_speech(request.text, request.language, request.voice)
+
+
+@router.get("/stream")
+async def text_to_speech_stream_get(
+    text: str,
+    language: str = "en",
+    voice: Optional[str] = None
+) -> StreamingResponse:
+    """
+    Потоковый синтез речи для прямого использования в <audio src="...">
+    
+    Параметры те же, что у POST /stream, но передаются в строке запроса.
+    """
+    return await _stream_speech(text, language, voice)
+
+
 @router.get("/voices/{language}")
 async def get_available_voices(language: str):
     """
@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import Dict, List
 
 
 class Settings(BaseSettings):
@@ -24,6 +24,7 @@ class Settings(BaseSettings):
     ALLOWED_IMAGE_FORMATS: List[str] = [".jpg", ".jpeg", ".png"]
     ALLOWED_AUDIO_FORMATS: List[str] = [".mp3", ".wav", ".m4a"]
     ALLOWED_VIDEO_FORMATS: List[str] = [".mp4", ".webm", ".avi"]
+    ALLOWED_DOCUMENT_FORMATS: List[str] = [".pdf", ".tif", ".tiff"]
     
     
     MAX_FILE_SIZE: int = 100 * 1024 * 1024
@@ -41,10 +42,134 @@ class Settings(BaseSettings):
     
     
     WHISPER_MODEL: str = "tiny"  
+    DIARIZATION_RETRY_SECONDS: float = 300
+    
+    
+    # Все модели процесса: NLLB-600M в fp32 (~2.4 ГБ), Whisper, читатели OCR
+    # (OCR_READER_MEMORY_MB) и TTS (TTS_MODEL_MEMORY_MB) помещаются в бюджет
+    # целиком; лимит RSS ниже max_memory_restart pm2 (7G, мастер с моделями),
+    # чтобы при нехватке памяти выгружались холодные модели, а не весь процесс
+    MODEL_MEMORY_BUDGET_MB: int = 5120
+    MODEL_RSS_LIMIT_MB: int = 6144
+    MODEL_IDLE_TTL_SECONDS: float = 1800
+    MODEL_REAPER_INTERVAL_SECONDS: float = 60
+    # Модели, которые загружаются и прогреваются при старте (параллельно)
+    WARMUP_MODELS: List[str] = ["whisper", "ocr", "translation", "tts"]
+    
+    # Pre-fork сервер (python -m app.server): модели грузятся в мастере,
+    # воркеры делят веса copy-on-write; 0 потоков - ядра поровну на воркеры.
+    # max_memory_restart pm2 меряет только мастер, поэтому воркер с
+    # собственной памятью (без общих весов) выше SERVER_WORKER_MEMORY_MB
+    # перезапускает сам мастер (0 - без ограничения)
+    SERVER_HOST: str = "0.0.0.0"
+    SERVER_PORT: int = 8000
+    SERVER_WORKERS: int = 2
+    SERVER_THREADS_PER_WORKER: int = 0
+    SERVER_WORKER_MEMORY_MB: int = 3072
+    MALLOC_ARENA_MAX: int = 2
+    
+    # Пул процессов для OCR и Whisper (0 - инференс в потоках текущего процесса);
+    # у каждого процесса свои копии INFERENCE_MODELS
+    INFERENCE_PROCESSES: int = 0
+    INFERENCE_MODELS: List[str] = ["ocr", "whisper"]
+    INFERENCE_START_METHOD: str = "spawn"
+    
+    # Пулы потоков сервисов (распознавание речи, OCR, перевод, синтез речи);
+    # при EXECUTOR_QUEUE_LIMIT задачах в очереди сервиса запросы получают 503
+    EXECUTOR_WORKERS: Dict[str, int] = {"asr": 2, "ocr": 2, "mt": 4, "tts": 4}
+    EXECUTOR_QUEUE_LIMIT: int = 64
     
     
     NLLB_MODEL: str = "facebook/nllb-200-distilled-600M"
     
+    
+    TRANSLATION_CACHE_SIZE: int = 5000
+    TRANSLATION_BATCH_SIZE: int = 16
+    TRANSLATION_BATCH_MAX_TEXTS: int = 256
+    TRANSLATION_MEMORY_SIZE: int = 20000
+    TRANSLATION_MEMORY_THRESHOLD: float = 0.8
+    TRANSLATION_MEMORY_MAX_CHARS: int = 500
+    
+    
+    OCR_PROBE_SIZE: int = 640
+    OCR_TARGET_TEXT_HEIGHT: int = 32
+    OCR_MIN_SCALE: float = 0.25
+    # Проба (детектор на копии OCR_PROBE_SIZE) не видит строк ниже
+    # OCR_PROBE_MIN_TEXT_HEIGHT пикселей копии; уменьшение оставляет таким
+    # строкам не меньше OCR_MIN_TEXT_HEIGHT пикселей и требует хотя бы
+    # OCR_DOWNSCALE_MIN_BOXES найденных строк
+    OCR_PROBE_MIN_TEXT_HEIGHT: int = 8
+    OCR_MIN_TEXT_HEIGHT: int = 16
+    OCR_DOWNSCALE_MIN_BOXES: int = 6
+    OCR_TILE_SIZE: int = 1600
+    OCR_TILE_OVERLAP: int = 160
+    OCR_TILE_ASPECT: float = 2.5
+    OCR_TILE_WORKERS: int = 2
+    OCR_EDGE_SAMPLE_SIZE: int = 512
+    OCR_TEXT_MIN_EDGE_DENSITY: float = 0.002
+    OCR_ROI_MAX_COVERAGE: float = 0.6
+    OCR_BATCH_SIZE: int = 8
+    OCR_BATCH_MAX_IMAGES: int = 10
+    OCR_DECODE_WORKERS: int = 4
+    OCR_FONT_PATH: str = ""
+    OCR_CJK_FONT_PATH: str = ""
+    OCR_CACHE_SIZE: int = 1000
+    OCR_CACHE_MAX_DISTANCE: int = 6
+    OCR_CACHE_MIN_CORRELATION: float = 0.95
+    # Похожее (не побайтно равное) изображение берется из кэша, только если
+    # в каждой рамке текста ни один блок 8x8 не отличается сильнее порога
+    OCR_CACHE_MAX_BLOCK_DIFF: float = 24.0
+    # ... и вне рамок ни один блок карты мелких деталей кадра (копия 512
+    # пикселей) не отличается сильнее порога: иначе там добавился текст
+    OCR_CACHE_MAX_EDGE_DIFF: float = 6.0
+    OCR_CACHE_MAX_CROP_PIXELS: int = 2_000_000
+    
+    # В EasyOCR нет казахского набора: кириллический читатель совмещает языки,
+    # в алфавитах которых есть казахские Ғ, Қ, Ө, Ү, І (у всех одна модель cyrillic_g2)
+    OCR_SCRIPT_LANGUAGES: dict = {
+        "latin": ["en"],
+        "cyrillic": ["ru", "be", "mn", "tjk", "en"],
+        "cjk": ["ch_sim", "en"],
+    }
+    OCR_DEFAULT_SCRIPT: str = "cyrillic"
+    OCR_READER_MEMORY_MB: int = 1024
+    OCR_SCRIPT_SAMPLE_BOXES: int = 8
+    OCR_SCRIPT_MIN_CONFIDENCE: float = 0.4
+    OCR_ENGINE: str = "pytorch"
+    OCR_ONNX_THREADS: int = 0
+    OCR_ONNX_QUANTIZE: bool = False
+    
+    
+    DOCUMENT_TARGET_PIXELS: int = 2500
+    DOCUMENT_MIN_DPI: int = 100
+    DOCUMENT_MAX_DPI: int = 300
+    DOCUMENT_MIN_TEXT_CHARS: int = 20
+    DOCUMENT_WORKERS: int = 2
+    DOCUMENT_TRANSLATE_BATCH: int = 4
+    DOCUMENT_MAX_PAGES: int = 500
+    
+    
+    # Пусто - UPLOAD_DIR/tts/cache; каталог должен лежать внутри UPLOAD_DIR,
+    # иначе статический маршрут не отдаст закэшированное аудио
+    TTS_CACHE_DIR: str = ""
+    TTS_CACHE_MAX_MB: int = 500
+    # Вытеснение освобождает кэш до этой доли квоты (обход каталога - раз в
+    # несколько сотен записей, а не на каждой записи сверх квоты)
+    TTS_CACHE_LOW_WATER: float = 0.9
+    TTS_MODEL_MEMORY_MB: int = 1024
+    TTS_PRELOAD_LANGUAGES: List[str] = ["ru", "en"]
+    TTS_CHUNK_CHARS: int = 300
+    TTS_FIRST_CHUNK_CHARS: int = 120
+    TTS_MAX_CHARS: int = 20000
+    TTS_WORKERS: int = 4
+    
+    
+    FFMPEG_BINARY: str = "ffmpeg"
+    DUB_SAMPLE_RATE: int = 24000
+    DUB_MAX_SPEEDUP: float = 1.5
+    DUB_TAIL_SECONDS: float = 1.0
+    DUB_WORKERS: int = 4
+    
     class Config:
         env_file = ".env"
         case_sensitive = True
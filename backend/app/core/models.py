@@ -7,6 +7,7 @@ class MediaType(str, Enum):
     IMAGE = "image"
     AUDIO = "audio"
     VIDEO = "video"
+    DOCUMENT = "document"
 
 
 class LanguageCode(str, Enum):
@@ -43,6 +44,17 @@ class TranslationResponse(BaseModel):
     original_text: str
     source_language: str
     translations: Dict[str, str]  
+    memory_scores: Optional[Dict[str, float]] = None
+
+
+class TranslationBatchRequest(BaseModel):
+    texts: List[str]
+    source_language: Optional[str] = None
+    target_languages: List[str] = Field(default=["ru", "kk", "en"])
+
+
+class TranslationBatchResponse(BaseModel):
+    results: List[TranslationResponse]
 
 
 class TTSRequest(BaseModel):
@@ -54,6 +66,8 @@ class TTSRequest(BaseModel):
 class TTSResponse(BaseModel):
     audio_path: str
     duration: float
+    language: Optional[str] = None
+    cached: bool = False
 
 
 class ProcessMediaRequest(BaseModel):
@@ -64,9 +78,25 @@ class ProcessMediaRequest(BaseModel):
     enable_diarization: bool = False  
 
 
+class DubbingSegment(BaseModel):
+    start: float
+    end: float
+    text: str
+    translation: str
+    speedup: float = 1.0
+
+
+class DubbingResponse(BaseModel):
+    video_path: str
+    source_language: str
+    target_language: str
+    segments: List[DubbingSegment]
+
+
 class ProcessMediaResponse(BaseModel):
     recognition: RecognitionResponse
     translation: TranslationResponse
     tts: Optional[TTSResponse] = None
+    tts_by_language: Optional[Dict[str, TTSResponse]] = None
     processed_image_path: Optional[str] = None  
 
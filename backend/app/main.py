@@ -1,9 +1,13 @@
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from app.core.config import settings
 from app.api.routes import api_router
-from app.services.model_preloader import preload_models_sync
+from app.services.model_preloader import preload_models_sync, readiness
+from app.services.model_registry import model_registry
+from app.services.inference_pool import inference_pool
+from app.services.executors import service_executors
 import os
 import uvicorn
 
@@ -30,10 +34,17 @@ if os.path.exists(settings.UPLOAD_DIR):
 
 @app.on_event("startup")
 async def startup_event():
-    """Событие при старте сервера - предзагрузка моделей"""
+    """Событие при старте сервера - параллельная предзагрузка и прогрев моделей"""
     preload_models_sync()
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Остановка пулов сервисов и процессов пула инференса"""
+    service_executors.shutdown()
+    inference_pool.shutdown()
+
+
 @app.get("/")
 async def root():
     """Корневой endpoint"""
@@ -41,7 +52,8 @@ async def root():
         "message": "AI-Translate API",
         "version": settings.VERSION,
         "docs": "/docs",
-        "health": "/api/health"
+        "health": "/api/health",
+        "ready": "/api/ready"
     }
 
 
@@ -55,6 +67,28 @@ async def health_check():
     }
 
 
+@app.get("/api/ready")
+async def ready_check():
+    """
+    Готовность к запросам: 200, когда все модели прогреты (или недоступны
+    в этой установке), иначе 503 со статусом каждой модели
+    """
+    state = readiness()
+    return JSONResponse(state, status_code=200 if state["ready"] else 503)
+
+
+@app.get("/api/executors")
+async def executors_stats():
+    """Пулы сервисов: очередь, задачи в работе, время ожидания и выполнения"""
+    return service_executors.stats()
+
+
+@app.get("/api/models")
+async def models_residency():
+    """Загруженные модели: размер, простой, число обращений, RSS процесса и лимиты"""
+    return model_registry.residency()
+
+
 if __name__ == "__main__":
     uvicorn.run(
         "app.main:app",
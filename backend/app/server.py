@@ -0,0 +1,229 @@
+"""
+Pre-fork сервер: модели загружаются один раз и общие для всех воркеров
+
+Мастер-процесс загружает и прогревает модели PyTorch (WARMUP_MODELS, кроме
+FORK_UNSAFE_MODELS), замораживает объекты сборщика мусора (gc.freeze) и
+порождает SERVER_WORKERS воркеров uvicorn через fork на общем слушающем
+сокете. Веса моделей остаются общими страницами copy-on-write: память растет
+на рабочие буферы воркера, а не на копию моделей, как при увеличении
+instances в pm2. Унаследованные модели закреплены в реестре воркера и не
+выгружаются им по простою или давлению памяти.
+
+Whisper (faster-whisper/CTranslate2) в мастере не загружается: пул потоков
+CTranslate2 создается вместе с моделью, а после fork потоки родителя в
+воркере не существуют, и инференс зависнет. Каждый воркер загружает Whisper
+сам в startup event (preload_models_sync догружает недостающие модели).
+
+Чтобы страницы оставались общими:
+- gc.freeze переносит загруженные объекты в постоянное поколение, и сборщик
+  мусора воркера не пишет в их заголовки;
+- MALLOC_ARENA_MAX ограничивает число арен glibc (каждый поток иначе
+  получает свою арену и фрагментирует кучу); glibc читает переменную
+  только при старте, поэтому мастер перезапускает себя с ней через exec.
+
+Прогрев в мастере идет с одним потоком вычислений PyTorch
+(torch.set_num_threads(1)): пул потоков intra-op/OpenMP, запущенный до
+fork, в воркере не существует. ONNX Runtime создает свой пул вместе с
+сессией, поэтому при OCR_ENGINE=onnx читатели OCR, как и Whisper,
+загружает каждый воркер.
+
+Потоки BLAS/OpenMP/CTranslate2 делятся поровну: SERVER_THREADS_PER_WORKER
+или (число ядер / число воркеров), чтобы воркеры не дрались за ядра.
+
+pm2 видит только мастер и его память, поэтому лимит памяти воркеров
+соблюдает сам мастер: воркер, собственная память которого (без общих
+страниц весов) выше SERVER_WORKER_MEMORY_MB, плавно перезапускается.
+
+Запуск: python -m app.server
+"""
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+import traceback
+from typing import Dict, Set, Tuple
+from app.core.config import settings
+
+_THREAD_VARIABLES = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS", "NUMEXPR_NUM_THREADS")
+# Модели, которые нельзя загружать до fork (свои потоки создаются при загрузке)
+FORK_UNSAFE_MODELS = ("whisper",)
+# Как часто мастер проверяет память воркеров
+MEMORY_CHECK_INTERVAL_SECONDS = 5.0
+
+
+def threads_per_worker(workers: int) -> int:
+    """Число потоков вычислений на воркер"""
+    if settings.SERVER_THREADS_PER_WORKER > 0:
+        return settings.SERVER_THREADS_PER_WORKER
+    return max(1, (os.cpu_count() or 1) // max(workers, 1))
+
+
+def configure_environment(workers: int):
+    """
+    Переменные окружения, которые библиотеки читают при загрузке
+
+    Вызывается до импорта numpy/torch; явно заданные переменные не
+    перезаписываются.
+    """
+    if settings.MALLOC_ARENA_MAX > 0 and "MALLOC_ARENA_MAX" not in os.environ:
+        os.environ["MALLOC_ARENA_MAX"] = str(settings.MALLOC_ARENA_MAX)
+        os.execv(sys.executable, [sys.executable, "-m", "app.server", *sys.argv[1:]])
+
+    threads = str(threads_per_worker(workers))
+    for name in _THREAD_VARIABLES:
+        os.environ.setdefault(name, threads)
+
+
+def fork_unsafe_models() -> Tuple[str, ...]:
+    """Модели, которые воркеры загружают сами"""
+    if settings.OCR_ENGINE == "onnx":
+        return FORK_UNSAFE_MODELS + ("ocr",)
+    return FORK_UNSAFE_MODELS
+
+
+def load_models():
+    """Загрузка и прогрев моделей в мастере, затем заморозка кучи"""
+    from app.services.model_preloader import preload_models_sync
+    from app.services.model_registry import model_registry
+
+    # Прогрев без пула потоков PyTorch: воркеры создадут свой после fork
+    _limit_torch_threads(1)
+    names = [name for name in settings.WARMUP_MODELS if name not in fork_unsafe_models()]
+    for thread in preload_models_sync(names) if names else []:
+        thread.join()
+
+    # Мастер держит модели для будущих воркеров: простой в нем не считается
+    model_registry.reaping = False
+    gc.collect()
+    gc.freeze()
+
+
+def bind_socket(host: str, port: int) -> socket.socket:
+    """Слушающий сокет, общий для всех воркеров"""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _limit_torch_threads(threads: int):
+    try:
+        import torch
+    except ImportError:
+        return
+    torch.set_num_threads(threads)
+
+
+def spawn_worker(app, sock: socket.socket, threads: int) -> int:
+    """Fork воркера uvicorn на общем сокете; в мастере возвращает pid"""
+    pid = os.fork()
+    if pid:
+        return pid
+
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    code = 0
+    try:
+        import uvicorn
+
+        _limit_torch_threads(threads)
+        uvicorn.Server(uvicorn.Config(app, lifespan="on")).run(sockets=[sock])
+    except BaseException:
+        code = 1
+        # os._exit не сбрасывает буферы: без этого падение воркера не оставит следа в логе
+        print(f"Воркер {os.getpid()} завершился с ошибкой:", file=sys.stderr)
+        traceback.print_exc()
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os._exit(code)
+
+
+def oversized_workers(children: Dict[int, float], terminating: Set[int]) -> Set[int]:
+    """Воркеры, собственная память которых выше SERVER_WORKER_MEMORY_MB"""
+    from app.services.model_registry import private_rss
+
+    if settings.SERVER_WORKER_MEMORY_MB <= 0:
+        return set()
+    limit = settings.SERVER_WORKER_MEMORY_MB * 1024 * 1024
+    oversized = set()
+    for pid in children:
+        if pid in terminating:
+            continue
+        memory = private_rss(pid)
+        if memory is not None and memory > limit:
+            print(
+                f"Воркер {pid} занял {memory / (1024 * 1024):.0f} МБ "
+                f"(SERVER_WORKER_MEMORY_MB={settings.SERVER_WORKER_MEMORY_MB}), перезапуск",
+                file=sys.stderr
+            )
+            oversized.add(pid)
+    return oversized
+
+
+def serve(workers: int = settings.SERVER_WORKERS):
+    """Мастер: загрузка моделей, fork воркеров и их перезапуск при падении"""
+    configure_environment(workers)
+
+    from app.main import app
+
+    load_models()
+    sock = bind_socket(settings.SERVER_HOST, settings.SERVER_PORT)
+    threads = threads_per_worker(workers)
+
+    children: Dict[int, float] = {}
+    terminating: Set[int] = set()
+    checked = time.monotonic()
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    while not stopping:
+        while len(children) < workers and not stopping:
+            children[spawn_worker(app, sock, threads)] = time.monotonic()
+        try:
+            pid, _ = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            pid = 0
+        if pid in children:
+            # Воркер, упавший сразу после старта, перезапускается не чаще раза в секунду
+            started = children.pop(pid)
+            terminating.discard(pid)
+            time.sleep(max(0.0, 1.0 - (time.monotonic() - started)))
+        else:
+            time.sleep(0.5)
+
+        if time.monotonic() - checked >= MEMORY_CHECK_INTERVAL_SECONDS:
+            checked = time.monotonic()
+            for pid in oversized_workers(children, terminating):
+                # SIGTERM: uvicorn дообслуживает текущие запросы, затем воркер перезапускается
+                try:
+                    os.kill(pid, signal.SIGTERM)
+                    terminating.add(pid)
+                except ProcessLookupError:
+                    pass
+
+    for pid in children:
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+    for pid in children:
+        try:
+            os.waitpid(pid, 0)
+        except ChildProcessError:
+            pass
+    sock.close()
+
+
+if __name__ == "__main__":
+    serve()
@@ -0,0 +1,132 @@
+"""
+Склейка аудиофрагментов без перекодирования
+
+MP3 склеивается по кадрам: у фрагментов срезаются теги ID3 и служебный
+кадр Xing/Info (в нем длительность одного фрагмента, а не всего файла).
+WAV склеивается по PCM-данным под одним заголовком.
+"""
+import os
+import shutil
+import wave
+from typing import List, Optional, Tuple
+
+# Битрейты (кбит/с) и частоты для MPEG Layer III
+_BITRATES = {
+    1: [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    2: [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+_SAMPLE_RATES = {
+    3: [44100, 48000, 32000],   # MPEG-1
+    2: [22050, 24000, 16000],   # MPEG-2
+    0: [11025, 12000, 8000],    # MPEG-2.5
+}
+
+
+def _id3v2_size(data: bytes) -> int:
+    """Длина тега ID3v2 в начале файла (0, если тега нет)"""
+    if len(data) < 10 or data[:3] != b"ID3":
+        return 0
+    size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+    footer = 10 if data[5] & 0x10 else 0
+    return 10 + size + footer
+
+
+def _frame_length(header: bytes) -> Optional[int]:
+    """Длина кадра MPEG Layer III по заголовку или None, если это не кадр"""
+    if len(header) < 4 or header[0] != 0xFF or (header[1] & 0xE0) != 0xE0:
+        return None
+    version = (header[1] >> 3) & 0x03
+    layer = (header[1] >> 1) & 0x03
+    bitrate_index = header[2] >> 4
+    rate_index = (header[2] >> 2) & 0x03
+    if version == 1 or layer != 1 or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+    padding = (header[2] >> 1) & 0x01
+    bitrate = _BITRATES[1 if version == 3 else 2][bitrate_index] * 1000
+    sample_rate = _SAMPLE_RATES[version][rate_index]
+    coefficient = 144 if version == 3 else 72
+    return coefficient * bitrate // sample_rate + padding
+
+
+def mp3_frames(data: bytes) -> bytes:
+    """Кадры MP3 без тегов ID3 и без служебного кадра Xing/Info/VBRI"""
+    start = _id3v2_size(data)
+    end = len(data) - 128 if len(data) >= 128 and data[-128:-125] == b"TAG" else len(data)
+
+    length = _frame_length(data[start:start + 4])
+    if length and any(marker in data[start:start + min(length, 200)] for marker in (b"Xing", b"Info", b"VBRI")):
+        start += length
+    return data[start:end]
+
+
+def _concatenate_mp3(paths: List[str], output_path: str):
+    with open(output_path, "wb") as output:
+        for path in paths:
+            with open(path, "rb") as f:
+                output.write(mp3_frames(f.read()))
+
+
+def _concatenate_wav(paths: List[str], output_path: str):
+    with wave.open(paths[0], "rb") as first:
+        params = first.getparams()
+    with wave.open(output_path, "wb") as output:
+        output.setnchannels(params.nchannels)
+        output.setsampwidth(params.sampwidth)
+        output.setframerate(params.framerate)
+        for path in paths:
+            with wave.open(path, "rb") as part:
+                if (part.getnchannels(), part.getsampwidth(), part.getframerate()) != \
+                        (params.nchannels, params.sampwidth, params.framerate):
+                    raise ValueError(f"Несовместимый формат WAV во фрагменте {path}")
+                while True:
+                    frames = part.readframes(65536)
+                    if not frames:
+                        break
+                    output.writeframes(frames)
+
+
+def concatenate_audio(paths: List[str], output_path: str) -> str:
+    """
+    Склейка фрагментов одного формата (MP3 или WAV) в output_path
+
+    Returns:
+        Путь к результату
+    """
+    if not paths:
+        raise ValueError("Нет фрагментов для склейки")
+    if len(paths) == 1:
+        shutil.copyfile(paths[0], output_path)
+        return output_path
+
+    extension = os.path.splitext(paths[0])[1].lower()
+    if extension == ".mp3":
+        _concatenate_mp3(paths, output_path)
+    elif extension == ".wav":
+        _concatenate_wav(paths, output_path)
+    else:
+        raise ValueError(f"Склейка не поддерживается для формата {extension}")
+    return output_path
+
+
+def wav_stream_header(nchannels: int, sampwidth: int, framerate: int) -> bytes:
+    """
+    Заголовок WAV для потоковой передачи
+
+    Длина данных заранее неизвестна, поэтому в размерах стоит 0xFFFFFFFF:
+    так пишут потоковый WAV ffmpeg и sox, браузеры читают до конца потока.
+    """
+    block_align = nchannels * sampwidth
+    return b"".join([
+        b"RIFF", (0xFFFFFFFF).to_bytes(4, "little"), b"WAVE",
+        b"fmt ", (16).to_bytes(4, "little"), (1).to_bytes(2, "little"),
+        nchannels.to_bytes(2, "little"), framerate.to_bytes(4, "little"),
+        (framerate * block_align).to_bytes(4, "little"), block_align.to_bytes(2, "little"),
+        (sampwidth * 8).to_bytes(2, "little"),
+        b"data", (0xFFFFFFFF).to_bytes(4, "little"),
+    ])
+
+
+def wav_pcm(path: str) -> Tuple[bytes, Tuple[int, int, int]]:
+    """PCM-данные и параметры WAV-файла: (данные, (каналы, байт на отсчет, частота))"""
+    with wave.open(path, "rb") as part:
+        return part.readframes(part.getnframes()), (part.getnchannels(), part.getsampwidth(), part.getframerate())
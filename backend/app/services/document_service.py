@@ -0,0 +1,173 @@
+"""
+Многостраничные документы (PDF, TIFF): растеризация и OCR по страницам
+"""
+import os
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, Optional, Tuple
+from app.core.config import settings
+from app.services.ocr_service import ocr_service
+
+try:
+    import fitz  # PyMuPDF
+    PYMUPDF_AVAILABLE = True
+except ImportError:
+    PYMUPDF_AVAILABLE = False
+    fitz = None
+
+try:
+    import cv2
+    import numpy as np
+    from PIL import Image
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+    cv2 = None
+    np = None
+    Image = None
+
+
+class DocumentService:
+    """Постраничное распознавание PDF и многостраничных TIFF"""
+
+    def __init__(self):
+        # MuPDF и Pillow не потокобезопасны, поэтому страницы
+        # растеризуются по одной, а OCR идет параллельно
+        self._render_lock = threading.Lock()
+
+    def _is_pdf(self, file_path: str) -> bool:
+        return os.path.splitext(file_path)[1].lower() == ".pdf"
+
+    def page_count(self, file_path: str) -> int:
+        """Число страниц документа"""
+        if self._is_pdf(file_path):
+            if not PYMUPDF_AVAILABLE:
+                raise ImportError("PyMuPDF не установлен. Установите: pip install PyMuPDF")
+            with self._render_lock:
+                with fitz.open(file_path) as document:
+                    return document.page_count
+
+        if not PIL_AVAILABLE:
+            raise ImportError("Pillow не установлен. Установите: pip install Pillow")
+        with self._render_lock:
+            with Image.open(file_path) as image:
+                return getattr(image, "n_frames", 1)
+
+    def choose_dpi(self, long_side_inches: float, native_dpi: Optional[float] = None) -> int:
+        """
+        DPI растеризации страницы
+
+        Длинная сторона страницы приводится примерно к DOCUMENT_TARGET_PIXELS,
+        но не выше собственного разрешения скана (увеличение не добавляет
+        деталей) и в пределах DOCUMENT_MIN_DPI..DOCUMENT_MAX_DPI.
+        """
+        dpi = settings.DOCUMENT_TARGET_PIXELS / max(long_side_inches, 1e-3)
+        if native_dpi:
+            dpi = min(dpi, native_dpi)
+        return int(min(max(dpi, settings.DOCUMENT_MIN_DPI), settings.DOCUMENT_MAX_DPI))
+
+    def _load_pdf_page(self, file_path: str, index: int) -> Tuple[str, Any, Optional[int]]:
+        with fitz.open(file_path) as document:
+            page = document.load_page(index)
+
+            text = page.get_text("text").strip()
+            if len(text) >= settings.DOCUMENT_MIN_TEXT_CHARS:
+                return "text_layer", text, None
+
+            native_dpi = None
+            try:
+                for info in page.get_image_info():
+                    x0, _, x1, _ = info["bbox"]
+                    if x1 - x0 > 0:
+                        native_dpi = max(native_dpi or 0, info["width"] / ((x1 - x0) / 72))
+            except Exception:
+                native_dpi = None
+
+            dpi = self.choose_dpi(max(page.rect.width, page.rect.height) / 72, native_dpi)
+            pixmap = page.get_pixmap(dpi=dpi, alpha=False)
+            rgb = np.frombuffer(pixmap.samples, dtype=np.uint8).reshape(pixmap.height, pixmap.width, pixmap.n)
+            return "ocr", cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR), dpi
+
+    def _load_tiff_page(self, file_path: str, index: int) -> Tuple[str, Any, Optional[int]]:
+        with Image.open(file_path) as image:
+            image.seek(index)
+            native_dpi = float((image.info.get("dpi") or (0, 0))[0]) or None
+            frame = image.convert("RGB")
+
+        width, height = frame.size
+        if native_dpi:
+            dpi = self.choose_dpi(max(width, height) / native_dpi, native_dpi)
+            scale = dpi / native_dpi
+        else:
+            scale = min(1.0, settings.DOCUMENT_TARGET_PIXELS / max(width, height))
+            dpi = None
+        if scale < 1.0:
+            frame = frame.resize((max(int(width * scale), 1), max(int(height * scale), 1)), Image.LANCZOS)
+        return "ocr", cv2.cvtColor(np.asarray(frame), cv2.COLOR_RGB2BGR), dpi
+
+    def load_page(self, file_path: str, index: int) -> Tuple[str, Any, Optional[int]]:
+        """
+        Загрузка страницы
+
+        Returns:
+            ("text_layer", текст, None) для PDF с текстовым слоем или
+            ("ocr", изображение BGR, DPI растеризации)
+        """
+        with self._render_lock:
+            if self._is_pdf(file_path):
+                return self._load_pdf_page(file_path, index)
+            return self._load_tiff_page(file_path, index)
+
+    def _recognize_page(self, file_path: str, index: int, page_count: int) -> Dict[str, Any]:
+        source, payload, dpi = self.load_page(file_path, index)
+        if source == "text_layer":
+            recognition = {"text": payload, "language": "auto", "bounding_boxes": None, "confidence": None}
+        else:
+            recognition = ocr_service.recognize_batch([payload], return_boxes=True)[0]
+        return {
+            "page": index + 1,
+            "page_count": page_count,
+            "source": source,
+            "dpi": dpi,
+            "recognition": recognition,
+        }
+
+    def recognize_pages(self, file_path: str) -> Iterator[Dict[str, Any]]:
+        """
+        Постраничное распознавание документа
+
+        Страницы загружаются и распознаются в пуле из DOCUMENT_WORKERS потоков.
+        В работе одновременно не больше 2 * DOCUMENT_WORKERS страниц, а
+        изображение страницы освобождается сразу после OCR, поэтому память
+        не растет с числом страниц. Результаты выдаются в порядке страниц.
+
+        Yields:
+            page, page_count, source ("ocr" или "text_layer"), dpi, recognition
+        """
+        page_count = self.page_count(file_path)
+        if page_count > settings.DOCUMENT_MAX_PAGES:
+            raise ValueError(f"Слишком много страниц: {page_count} (максимум {settings.DOCUMENT_MAX_PAGES})")
+
+        window = 2 * settings.DOCUMENT_WORKERS
+        with ThreadPoolExecutor(max_workers=settings.DOCUMENT_WORKERS) as executor:
+            pending = deque()
+            next_page = 0
+            try:
+                while next_page < page_count and len(pending) < window:
+                    pending.append(executor.submit(self._recognize_page, file_path, next_page, page_count))
+                    next_page += 1
+
+                while pending:
+                    result = pending.popleft().result()
+                    if next_page < page_count:
+                        pending.append(executor.submit(self._recognize_page, file_path, next_page, page_count))
+                        next_page += 1
+                    yield result
+            finally:
+                # Клиент мог перестать читать поток: не начинаем оставшиеся страницы
+                for future in pending:
+                    future.cancel()
+
+
+document_service = DocumentService()
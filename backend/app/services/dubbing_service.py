@@ -0,0 +1,223 @@
+"""
+Дубляж видео: распознавание речи по сегментам, перевод, озвучка и сведение
+
+Сегменты Whisper переводятся одним пакетом, озвучиваются параллельно
+(в работе не больше 2 * DUB_WORKERS сегментов), каждый клип подгоняется
+под свой интервал и по порядку пишется как PCM в stdin ffmpeg. Видеопоток
+копируется без декодирования (-c:v copy), поэтому память не зависит от
+длины видео.
+"""
+import os
+import subprocess
+import tempfile
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+from app.core.config import settings
+from app.services.whisper_service import whisper_service
+from app.services.translation_service import translation_service
+from app.services.tts_service import tts_service
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+    np = None
+
+
+def fit_to_slot(clip: "np.ndarray", slot: int, max_speedup: float) -> "np.ndarray":
+    """
+    Подгонка клипа под интервал в slot отсчетов
+
+    Длинный клип ускоряется линейной интерполяцией (np.interp по всему
+    клипу сразу), но не больше чем в max_speedup раз; то, что все равно не
+    поместилось, обрезается с коротким затуханием. Короткий клип не
+    замедляется, а дополняется тишиной.
+    """
+    if slot <= 0:
+        return np.zeros(0, dtype=np.float32)
+    if len(clip) > slot:
+        length = max(slot, int(len(clip) / max_speedup))
+        positions = np.linspace(0, len(clip) - 1, length)
+        clip = np.interp(positions, np.arange(len(clip)), clip).astype(np.float32)
+        if len(clip) > slot:
+            clip = clip[:slot]
+            fade = min(slot, 480)
+            clip[-fade:] *= np.linspace(1.0, 0.0, fade, dtype=np.float32)
+        return clip
+    return np.concatenate([clip, np.zeros(slot - len(clip), dtype=np.float32)])
+
+
+class DubbingService:
+    """Озвучка переведенной речи поверх исходного видео"""
+
+    def __init__(self):
+        self.upload_dir = settings.UPLOAD_DIR
+        self.sample_rate = settings.DUB_SAMPLE_RATE
+
+    def _ffmpeg(self) -> str:
+        return settings.FFMPEG_BINARY
+
+    def extract_audio(self, video_path: str, output_path: str) -> str:
+        """Моно-дорожка 16 кГц для Whisper"""
+        subprocess.run(
+            [self._ffmpeg(), "-y", "-loglevel", "error", "-i", video_path,
+             "-vn", "-ac", "1", "-ar", "16000", output_path],
+            check=True, capture_output=True
+        )
+        return output_path
+
+    def decode_clip(self, audio_path: str) -> "np.ndarray":
+        """Клип TTS (MP3 или WAV) в float32 моно с частотой DUB_SAMPLE_RATE"""
+        result = subprocess.run(
+            [self._ffmpeg(), "-loglevel", "error", "-i", audio_path,
+             "-f", "f32le", "-ac", "1", "-ar", str(self.sample_rate), "pipe:1"],
+            check=True, capture_output=True
+        )
+        return np.frombuffer(result.stdout, dtype=np.float32)
+
+    def _voice_segment(self, text: str, language: str, slot: int) -> Dict[str, Any]:
+        if not text.strip():
+            return {"audio": np.zeros(max(slot, 0), dtype=np.float32), "speedup": 1.0}
+        result = tts_service.synthesize(text, language=language)
+        if not result.get("success"):
+            raise ValueError(result.get("error", "Ошибка синтеза речи"))
+        clip = self.decode_clip(result["audio_path"])
+        speedup = min(len(clip) / slot, settings.DUB_MAX_SPEEDUP) if len(clip) > slot > 0 else 1.0
+        return {"audio": fit_to_slot(clip, slot, settings.DUB_MAX_SPEEDUP), "speedup": round(speedup, 2)}
+
+    def _slots(self, segments: List[Dict[str, Any]]) -> List[int]:
+        """
+        Интервал каждого сегмента в отсчетах: от его начала до начала
+        следующего (пауза после фразы тоже доступна для озвучки)
+        """
+        starts = [int(segment["start"] * self.sample_rate) for segment in segments]
+        slots = []
+        for index, segment in enumerate(segments):
+            if index + 1 < len(segments):
+                end = starts[index + 1]
+            else:
+                end = int((segment["end"] + settings.DUB_TAIL_SECONDS) * self.sample_rate)
+            slots.append(max(end - starts[index], 0))
+        return slots
+
+    def dub(self, video_path: str, target_language: str, output_path: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Дубляж видео на язык target_language
+
+        Returns:
+            video_path (имя файла в UPLOAD_DIR), source_language,
+            target_language и сегменты с переводом и коэффициентом ускорения
+        """
+        if not NUMPY_AVAILABLE:
+            raise ImportError("NumPy не установлен. Установите: pip install numpy")
+
+        with tempfile.TemporaryDirectory() as workdir:
+            audio_path = self.extract_audio(video_path, os.path.join(workdir, "speech.wav"))
+            recognition = whisper_service.transcribe(audio_path, return_timestamps=True)
+
+        segments = [segment for segment in recognition.get("segments") or [] if segment["text"].strip()]
+        if not segments:
+            raise ValueError("В видео не найдена речь для дубляжа")
+
+        source_language = recognition.get("language")
+        if source_language not in settings.SUPPORTED_LANGUAGES:
+            source_language = None
+        documents = translation_service.translate_documents(
+            [segment["text"] for segment in segments],
+            source_language,
+            [target_language]
+        )
+        texts = [document["translations"].get(target_language, "") for document in documents]
+        slots = self._slots(segments)
+
+        if output_path is None:
+            output_path = os.path.join(self.upload_dir, f"dubbed_{uuid.uuid4().hex[:8]}.mp4")
+        report = []
+
+        with tempfile.TemporaryFile() as errors:
+            process = subprocess.Popen(
+                [self._ffmpeg(), "-y", "-loglevel", "error",
+                 "-i", video_path,
+                 "-f", "f32le", "-ar", str(self.sample_rate), "-ac", "1", "-i", "pipe:0",
+                 "-map", "0:v:0", "-map", "1:a:0",
+                 "-c:v", "copy", "-c:a", "aac", "-b:a", "128k",
+                 "-movflags", "+faststart", output_path],
+                stdin=subprocess.PIPE, stderr=errors
+            )
+            try:
+                self._write_track(process, segments, texts, slots, target_language, report)
+                process.stdin.close()
+                code = process.wait()
+            except BaseException:
+                process.kill()
+                process.wait()
+                raise
+            if code != 0:
+                errors.seek(0)
+                raise ValueError(f"Ошибка сведения видео: {errors.read().decode(errors='replace').strip()}")
+
+        return {
+            "video_path": os.path.relpath(output_path, self.upload_dir).replace("\\", "/"),
+            "source_language": documents[0]["source_language"] if documents else "auto",
+            "target_language": target_language,
+            "segments": report
+        }
+
+    def _write_track(
+        self,
+        process: subprocess.Popen,
+        segments: List[Dict[str, Any]],
+        texts: List[str],
+        slots: List[int],
+        target_language: str,
+        report: List[Dict[str, Any]]
+    ):
+        """Озвучка сегментов в ограниченном окне и запись дорожки по порядку"""
+        silence = np.zeros(self.sample_rate, dtype=np.float32)
+        position = 0
+        window = 2 * settings.DUB_WORKERS
+
+        with ThreadPoolExecutor(max_workers=settings.DUB_WORKERS) as executor:
+            pending = deque()
+            next_index = 0
+            try:
+                while next_index < len(segments) and len(pending) < window:
+                    pending.append(executor.submit(
+                        self._voice_segment, texts[next_index], target_language, slots[next_index]
+                    ))
+                    next_index += 1
+
+                for index, segment in enumerate(segments):
+                    voiced = pending.popleft().result()
+                    if next_index < len(segments):
+                        pending.append(executor.submit(
+                            self._voice_segment, texts[next_index], target_language, slots[next_index]
+                        ))
+                        next_index += 1
+
+                    # Тишина до начала сегмента пишется блоками по секунде
+                    gap = int(segment["start"] * self.sample_rate) - position
+                    while gap > 0:
+                        block = silence[:min(gap, len(silence))]
+                        process.stdin.write(block.tobytes())
+                        gap -= len(block)
+                        position += len(block)
+
+                    process.stdin.write(voiced["audio"].tobytes())
+                    position += len(voiced["audio"])
+                    report.append({
+                        "start": segment["start"],
+                        "end": segment["end"],
+                        "text": segment["text"],
+                        "translation": texts[index],
+                        "speedup": voiced["speedup"]
+                    })
+            finally:
+                for future in pending:
+                    future.cancel()
+
+
+dubbing_service = DubbingService()
@@ -0,0 +1,173 @@
+"""
+Пулы потоков сервисов с метриками очереди
+
+Блокирующие вызовы сервисов выполняются не в общем пуле по умолчанию, а в
+пуле своего сервиса (asr, ocr, mt, tts) с числом потоков из
+EXECUTOR_WORKERS: десятиминутная транскрипция занимает поток ASR и не
+задерживает быстрый перевод. Каждый пул считает задачи в очереди и в работе
+и время ожидания до старта; при EXECUTOR_QUEUE_LIMIT задач в очереди новые
+задачи отклоняются (ExecutorBusyError), а не копятся без ограничения.
+
+Потоковые ответы (SSE, аудио) тоже не уходят в общий пул Starlette: каждый
+шаг блокирующего генератора выполняется в пуле своего сервиса (iterate).
+"""
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, Iterator, List, Optional
+from app.core.config import settings
+
+
+class ExecutorBusyError(RuntimeError):
+    """Очередь пула сервиса заполнена"""
+    pass
+
+
+# Конец итератора в iterate: next(iterator, _DONE) не бросает StopIteration через Future
+_DONE = object()
+
+
+class ServiceExecutor:
+    """Пул потоков одного сервиса: ограниченная очередь, время ожидания и выполнения"""
+
+    def __init__(self, name: str, workers: int, queue_limit: int = settings.EXECUTOR_QUEUE_LIMIT):
+        self.name = name
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"{name}-executor")
+        self._lock = threading.Lock()
+        self.queued = 0
+        self.running = 0
+        self.completed = 0
+        self.rejected = 0
+        self._waits: deque = deque(maxlen=200)
+        self._durations: deque = deque(maxlen=200)
+
+    def submit(self, function: Callable[..., Any], *args, **kwargs) -> Future:
+        return self._submit(function, args, kwargs)
+
+    def _submit(self, function: Callable[..., Any], args: tuple, kwargs: dict, limited: bool = True) -> Future:
+        """Постановка в пул; limited=False - без проверки очереди (продолжение принятой задачи)"""
+        with self._lock:
+            if limited and self.queue_limit > 0 and self.queued >= self.queue_limit:
+                self.rejected += 1
+                raise ExecutorBusyError(f"Сервис {self.name} перегружен, повторите запрос позже")
+            self.queued += 1
+        submitted = time.monotonic()
+
+        def call():
+            started = time.monotonic()
+            with self._lock:
+                self.queued -= 1
+                self.running += 1
+                self._waits.append(started - submitted)
+            try:
+                return function(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self.running -= 1
+                    self.completed += 1
+                    self._durations.append(time.monotonic() - started)
+
+        future = self._executor.submit(call)
+
+        def release(done: Future):
+            # Отмена до старта (клиент отключился): call не выполнится, задача уходит из очереди здесь
+            if done.cancelled():
+                with self._lock:
+                    self.queued -= 1
+
+        future.add_done_callback(release)
+        return future
+
+    async def run(self, function: Callable[..., Any], *args, **kwargs) -> Any:
+        """Выполнение function в пуле сервиса без блокировки event loop"""
+        return await asyncio.wrap_future(self.submit(function, *args, **kwargs))
+
+    async def iterate(self, iterable: Iterable[Any]) -> AsyncIterator[Any]:
+        """
+        Асинхронный обход блокирующего итератора в пуле сервиса
+
+        Каждый шаг next() выполняется в пуле и попадает в метрики. Первый шаг
+        выполняется до возврата: при заполненной очереди ExecutorBusyError
+        поднимается до открытия потокового ответа (503). Следующие шаги
+        принятого потока очередью не отклоняются, чтобы поток не обрывался.
+        """
+        iterator = iter(iterable)
+        first = await self.run(next, iterator, _DONE)
+        return self._iterate(iterator, first)
+
+    async def _iterate(self, iterator: Iterator[Any], item: Any) -> AsyncIterator[Any]:
+        step: Optional[Future] = None
+        try:
+            while item is not _DONE:
+                yield item
+                step = self._submit(next, (iterator, _DONE), {}, limited=False)
+                item = await asyncio.wrap_future(step)
+        finally:
+            # Клиент отключился: генератор закрывается тоже в пуле (его finally
+            # может ждать потоков) и только после шага, который еще выполняется
+            close = getattr(iterator, "close", None)
+            if close is not None and item is not _DONE:
+                if step is None or step.done():
+                    self._submit(close, (), {}, limited=False)
+                else:
+                    step.add_done_callback(lambda _: self._submit(close, (), {}, limited=False))
+
+    def stats(self) -> Dict[str, Any]:
+        """Очередь, задачи в работе и время ожидания/выполнения (мс) по последним 200 задачам"""
+        with self._lock:
+            waits = sorted(self._waits)
+            durations = sorted(self._durations)
+            return {
+                "workers": self.workers,
+                "queued": self.queued,
+                "running": self.running,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "queue_limit": self.queue_limit,
+                "wait_ms": _summary(waits),
+                "run_ms": _summary(durations),
+            }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _summary(values: List[float]) -> Dict[str, Any]:
+    if not values:
+        return {"avg": None, "p95": None, "max": None}
+    return {
+        "avg": round(sum(values) / len(values) * 1000, 1),
+        "p95": round(values[min(len(values) - 1, int(len(values) * 0.95))] * 1000, 1),
+        "max": round(values[-1] * 1000, 1),
+    }
+
+
+class ServiceExecutors:
+    """Пулы всех сервисов по имени (asr, ocr, mt, tts)"""
+
+    # Полная обработка файла ставится в пул сервиса распознавания своего типа
+    MEDIA_EXECUTORS = {"image": "ocr", "document": "ocr", "audio": "asr", "video": "asr"}
+
+    def __init__(self, workers: Dict[str, int] = settings.EXECUTOR_WORKERS):
+        self._executors = {name: ServiceExecutor(name, count) for name, count in workers.items()}
+
+    def __getitem__(self, name: str) -> ServiceExecutor:
+        return self._executors[name]
+
+    def for_media(self, media_type: str) -> ServiceExecutor:
+        """Пул для обработки файла типа media_type"""
+        return self._executors[self.MEDIA_EXECUTORS[media_type]]
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {name: executor.stats() for name, executor in self._executors.items()}
+
+    def shutdown(self):
+        for executor in self._executors.values():
+            executor.shutdown()
+
+
+service_executors = ServiceExecutors()
@@ -0,0 +1,179 @@
+"""
+Подготовка изображений к OCR: адаптивное уменьшение и нарезка на плитки
+"""
+from typing import List, Optional, Sequence, Tuple
+import numpy as np
+
+
+def downscale_factor(
+    text_heights: Sequence[float],
+    target_height: float,
+    min_scale: float,
+    undetected_height: float = 0.0,
+    readable_height: float = 0.0,
+    min_boxes: int = 1
+) -> float:
+    """
+    Коэффициент уменьшения, при котором мелкие строки получают высоту target_height
+
+    Высоты строк берутся из пробной детекции на уменьшенной копии, а она не
+    видит строк ниже своего предела (undetected_height в пикселях исходного
+    изображения): основной текст документа может не попасть в высоты
+    вовсе, и тогда масштаб задал бы один крупный заголовок. Поэтому:
+
+    - при числе найденных строк меньше min_boxes изображение не уменьшается;
+    - берется нижний квартиль высот, а не медиана;
+    - масштаб не опускается ниже readable_height / undetected_height:
+      строка чуть ниже предела пробы сохраняет высоту readable_height.
+
+    Изображение никогда не увеличивается: для мелкого текста возвращается 1.0.
+    """
+    if len(text_heights) == 0 or len(text_heights) < min_boxes:
+        return 1.0
+    small = float(np.percentile(text_heights, 25))
+    if small <= 0:
+        return 1.0
+    scale = float(np.clip(target_height / small, min_scale, 1.0))
+    if undetected_height > 0 and readable_height > 0:
+        scale = max(scale, min(readable_height / undetected_height, 1.0))
+    return scale
+
+
+def plan_tiles(
+    height: int,
+    width: int,
+    tile_size: int,
+    overlap: int,
+    max_aspect: float
+) -> List[Tuple[int, int, int, int]]:
+    """
+    Нарезка очень высокого или очень широкого изображения на перекрывающиеся плитки
+
+    Плитки идут вдоль длинной стороны и занимают короткую сторону целиком.
+    Перекрытие должно быть больше высоты строки, чтобы каждая строка целиком
+    попала хотя бы в одну плитку.
+
+    Returns:
+        Список окон (y0, y1, x0, x1); одно окно, если нарезка не нужна
+    """
+    long_side, short_side = max(height, width), min(height, width)
+    if long_side <= tile_size or long_side / max(short_side, 1) < max_aspect:
+        return [(0, height, 0, width)]
+
+    length = max(tile_size, short_side)
+    step = max(length - overlap, 1)
+    starts = list(range(0, long_side - length + 1, step))
+    if starts[-1] + length < long_side:
+        starts.append(long_side - length)
+
+    if height >= width:
+        return [(start, start + length, 0, width) for start in starts]
+    return [(0, height, start, start + length) for start in starts]
+
+
+def merge_tile_boxes(
+    rects: np.ndarray,
+    scores: np.ndarray,
+    tile_ids: np.ndarray,
+    containment: float = 0.6
+) -> np.ndarray:
+    """
+    Удаление дублей на стыках плиток
+
+    Строка из зоны перекрытия распознается в обеих плитках, причем в одной
+    из них она может быть обрезана краем. Из пары рамок разных плиток, где
+    пересечение покрывает не меньше containment меньшей рамки, остается
+    большая (при равенстве - с большей уверенностью).
+
+    Args:
+        rects: Массив (n, 4) рамок [x_min, y_min, x_max, y_max]
+        scores: Уверенность распознавания
+        tile_ids: Номер плитки для каждой рамки
+        containment: Порог доли перекрытия
+
+    Returns:
+        Отсортированные индексы оставленных рамок
+    """
+    if len(rects) == 0:
+        return np.zeros(0, dtype=np.int64)
+
+    x1, y1, x2, y2 = rects[:, 0], rects[:, 1], rects[:, 2], rects[:, 3]
+    areas = np.maximum(x2 - x1, 0) * np.maximum(y2 - y1, 0)
+    order = np.lexsort((-scores, -areas))
+    suppressed = np.zeros(len(rects), dtype=bool)
+    keep = []
+
+    for index in order:
+        if suppressed[index]:
+            continue
+        keep.append(index)
+        inter_w = np.clip(np.minimum(x2[index], x2) - np.maximum(x1[index], x1), 0, None)
+        inter_h = np.clip(np.minimum(y2[index], y2) - np.maximum(y1[index], y1), 0, None)
+        smaller = np.maximum(np.minimum(areas[index], areas), 1e-6)
+        duplicate = (inter_w * inter_h / smaller >= containment) & (tile_ids != tile_ids[index])
+        suppressed |= duplicate
+
+    return np.array(sorted(keep), dtype=np.int64)
+
+
+def edge_density(grey: np.ndarray, threshold: int = 40) -> float:
+    """
+    Доля пикселей с резким перепадом яркости (по соседям справа и снизу)
+
+    Текст - это плотные контрастные штрихи, поэтому на однородных фото
+    (небо, стена, размытый фон) доля близка к нулю и текст можно не искать.
+    """
+    if grey.shape[0] < 2 or grey.shape[1] < 2:
+        return 0.0
+    grey = grey.astype(np.int16)
+    horizontal = np.abs(np.diff(grey, axis=1))[:-1] > threshold
+    vertical = np.abs(np.diff(grey, axis=0))[:, :-1] > threshold
+    return float(np.mean(horizontal | vertical))
+
+
+def text_regions(
+    boxes: Sequence[Sequence[float]],
+    height: int,
+    width: int,
+    margin: float,
+    max_coverage: float
+) -> Optional[List[Tuple[int, int, int, int]]]:
+    """
+    Области с текстом по рамкам пробной детекции
+
+    Рамки расширяются на margin и объединяются, пока пересекаются.
+    Если области покрывают больше max_coverage площади изображения,
+    выгоднее распознавать изображение целиком.
+
+    Args:
+        boxes: Рамки [x_min, x_max, y_min, y_max] в пикселях изображения
+
+    Returns:
+        Окна (y0, y1, x0, x1) или None, если нужно все изображение
+    """
+    rects = [
+        [
+            max(int(box[0] - margin), 0), min(int(box[1] + margin), width),
+            max(int(box[2] - margin), 0), min(int(box[3] + margin), height)
+        ]
+        for box in boxes
+    ]
+    merged = True
+    while merged and len(rects) > 1:
+        merged = False
+        result = []
+        for rect in rects:
+            for other in result:
+                if rect[0] < other[1] and other[0] < rect[1] and rect[2] < other[3] and other[2] < rect[3]:
+                    other[0], other[1] = min(other[0], rect[0]), max(other[1], rect[1])
+                    other[2], other[3] = min(other[2], rect[2]), max(other[3], rect[3])
+                    merged = True
+                    break
+            else:
+                result.append(rect)
+        rects = result
+
+    covered = sum((rect[1] - rect[0]) * (rect[3] - rect[2]) for rect in rects)
+    if not rects or covered > max_coverage * height * width:
+        return None
+    return [(rect[2], rect[3], rect[0], rect[1]) for rect in rects]
@@ -0,0 +1,213 @@
+"""
+Пул процессов для инференса OCR и Whisper
+
+В потоках пула по умолчанию Python-часть предобработки и постобработки
+EasyOCR и Whisper держит GIL, и загрузка ядер упирается в один процесс.
+Здесь инференс идет в INFERENCE_PROCESSES долгоживущих процессах, каждый со
+своими загруженными моделями. Декодированные изображения и аудио не
+сериализуются через pickle: родитель кладет массив в
+multiprocessing.shared_memory, процесс пула читает его без копирования, а
+обратно возвращается только небольшой словарь с результатом.
+
+Длинное аудио режется на окна по 30 секунд, окна распознаются разными
+процессами из одного и того же сегмента общей памяти.
+
+INFERENCE_PROCESSES = 0 (по умолчанию) отключает пул: каждый процесс держит
+свои копии моделей, поэтому число процессов подбирается под память.
+"""
+import multiprocessing
+import subprocess
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import ExitStack, contextmanager
+from multiprocessing import shared_memory
+from typing import Any, Dict, Iterator, List, Optional
+from app.core.config import settings
+from app.services.ocr_service import ocr_service
+from app.services.whisper_service import whisper_service
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+    np = None
+
+SAMPLE_RATE = 16000
+WINDOW_SECONDS = 30.0
+
+
+@contextmanager
+def shared_array(array: "np.ndarray") -> Iterator[Dict[str, Any]]:
+    """
+    Копия массива в общей памяти на время блока
+
+    Returns:
+        Описание сегмента для процесса пула: имя, форма и тип данных
+    """
+    array = np.ascontiguousarray(array)
+    segment = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    try:
+        np.ndarray(array.shape, dtype=array.dtype, buffer=segment.buf)[...] = array
+        yield {"name": segment.name, "shape": array.shape, "dtype": array.dtype.str}
+    finally:
+        segment.close()
+        segment.unlink()
+
+
+@contextmanager
+def attached_array(handle: Dict[str, Any]) -> Iterator["np.ndarray"]:
+    """Массив из сегмента общей памяти (только на время блока, без копирования)"""
+    segment = shared_memory.SharedMemory(name=handle["name"])
+    try:
+        yield np.ndarray(handle["shape"], dtype=np.dtype(handle["dtype"]), buffer=segment.buf)
+    finally:
+        try:
+            segment.close()
+        except BufferError:
+            # На массив еще есть ссылки: отображение закроется вместе с ними
+            pass
+
+
+def _initialize(models: List[str], threads: int):
+    """Загрузка моделей при старте процесса пула"""
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+
+    loaders = {"ocr": ocr_service.load_model, "whisper": whisper_service.load_model}
+    for name in models:
+        try:
+            loaders[name]()
+        except Exception:
+            # Модель загрузится при первой задаче, ошибка вернется вызывающему
+            pass
+
+
+def _recognize_images(handles: List[Dict[str, Any]], return_boxes: bool) -> List[Dict[str, Any]]:
+    with ExitStack() as stack:
+        images = [stack.enter_context(attached_array(handle)) for handle in handles]
+        results = ocr_service.recognize_batch(images, return_boxes=return_boxes)
+        del images
+    return results
+
+
+def _transcribe_window(
+    handle: Dict[str, Any],
+    start: int,
+    end: int,
+    language: Optional[str],
+    return_timestamps: bool
+) -> Dict[str, Any]:
+    with attached_array(handle) as audio:
+        result = whisper_service.transcribe_window(
+            audio[start:end], language, return_timestamps, offset=start / SAMPLE_RATE
+        )
+        del audio
+    return result
+
+
+class InferencePool:
+    """Долгоживущие процессы с моделями OCR и Whisper"""
+
+    def __init__(self, processes: int = settings.INFERENCE_PROCESSES):
+        self.processes = processes
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.processes > 0 and NUMPY_AVAILABLE
+
+    def _pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                threads = max(1, (multiprocessing.cpu_count() or 1) // self.processes)
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.processes,
+                    mp_context=multiprocessing.get_context(settings.INFERENCE_START_METHOD),
+                    initializer=_initialize,
+                    initargs=(list(settings.INFERENCE_MODELS), threads)
+                )
+            return self._executor
+
+    def _broken(self) -> RuntimeError:
+        # Процесс пула упал (например, убит по памяти): следующий вызов создаст новый пул
+        with self._lock:
+            self._executor = None
+        return RuntimeError("Процесс инференса завершился аварийно")
+
+    def recognize_batch(self, images: List["np.ndarray"], return_boxes: bool = True) -> List[Dict[str, Any]]:
+        """ocr_service.recognize_batch в процессе пула"""
+        with ExitStack() as stack:
+            handles = [stack.enter_context(shared_array(image)) for image in images]
+            try:
+                return self._pool().submit(_recognize_images, handles, return_boxes).result()
+            except BrokenProcessPool:
+                raise self._broken()
+
+    def decode_audio(self, audio_path: str) -> "np.ndarray":
+        """Аудио или видео в float32 моно 16 кГц"""
+        result = subprocess.run(
+            [settings.FFMPEG_BINARY, "-loglevel", "error", "-i", audio_path,
+             "-vn", "-f", "f32le", "-ac", "1", "-ar", str(SAMPLE_RATE), "pipe:1"],
+            check=True, capture_output=True
+        )
+        return np.frombuffer(result.stdout, dtype=np.float32)
+
+    def transcribe(
+        self,
+        audio_path: str,
+        language: Optional[str] = None,
+        return_timestamps: bool = False,
+        enable_diarization: bool = False
+    ) -> Dict[str, Any]:
+        """
+        whisper_service.transcribe в процессах пула
+
+        Окна по 30 секунд распознаются параллельно, результат собирается
+        по порядку окон; диаризация выполняется в текущем процессе.
+        """
+        audio = self.decode_audio(audio_path)
+        window = int(WINDOW_SECONDS * SAMPLE_RATE)
+        bounds = [(start, min(start + window, len(audio))) for start in range(0, max(len(audio), 1), window)]
+
+        with shared_array(audio) as handle:
+            pool = self._pool()
+            futures = [
+                pool.submit(_transcribe_window, handle, start, end, language, return_timestamps)
+                for start, end in bounds
+            ]
+            try:
+                windows = [future.result() for future in futures]
+            except BrokenProcessPool:
+                raise self._broken()
+            finally:
+                for future in futures:
+                    future.cancel()
+
+        detected = next((item["language"] for item in windows if item["text"] and item["language"]), None)
+        result = {
+            "text": " ".join(item["text"] for item in windows if item["text"]).strip(),
+            "language": detected or "auto",
+            "segments": [segment for item in windows for segment in item["segments"]] if return_timestamps else []
+        }
+
+        if enable_diarization:
+            speakers_info = whisper_service.perform_speaker_diarization(audio_path)
+            if speakers_info:
+                result["speakers"] = speakers_info
+                result = whisper_service._merge_transcription_with_speakers(result)
+        return result
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+inference_pool = InferencePool()
@@ -0,0 +1,308 @@
+"""
+Определение языка текста по символьным n-граммам
+
+Профили языков строятся один раз из встроенных образцов текста: частоты
+1-3-грамм хешируются в таблицу весов размером HASH_BUCKETS x число языков.
+Пакет строк кодируется в один массив кодовых точек, и n-граммы всех строк
+хешируются и суммируются векторно в NumPy, без циклов Python по символам.
+"""
+from typing import List, Optional, Tuple
+import numpy as np
+from app.core.config import settings
+
+
+LANGUAGE_SAMPLES = {
+    "ru": (
+        "В этом году мы начали новый проект по распознаванию и переводу текста. "
+        "Пользователи отправляют фотографии, аудио и видео, а система извлекает из них "
+        "текст и переводит его на другие языки. Это очень удобно для тех, кто путешествует "
+        "или работает с документами на иностранном языке. Мы хотим, чтобы сервис был "
+        "быстрым, надёжным и понятным для всех. Сегодня хорошая погода, и я иду домой "
+        "после работы. Что ты будешь делать вечером? Спасибо, до свидания. Привет, как дела? "
+        "Нажмите кнопку, чтобы продолжить. Здесь можно купить билеты и посмотреть расписание."
+    ),
+    "kk": (
+        "Биыл біз мәтінді тану және аудару бойынша жаңа жобаны бастадық. Пайдаланушылар "
+        "фотосуреттерді, аудио және бейне жібереді, ал жүйе олардан мәтінді алып, басқа "
+        "тілдерге аударады. Бұл саяхаттайтын немесе шетел тіліндегі құжаттармен жұмыс "
+        "істейтін адамдар үшін өте ыңғайлы. Біз қызметтің жылдам, сенімді және барлығына "
+        "түсінікті болғанын қалаймыз. Бүгін ауа райы жақсы, мен жұмыстан кейін үйге қайтып "
+        "келемін. Кешке не істейсің? Рахмет, сау болыңыз. Сәлеметсіз бе, қалыңыз қалай? "
+        "Жалғастыру үшін түймені басыңыз. Мұнда билет сатып алуға және кестені көруге болады."
+    ),
+    "en": (
+        "This year we started a new project for recognizing and translating text. Users send "
+        "photos, audio and video, and the system extracts the text from them and translates it "
+        "into other languages. This is very useful for people who travel or work with documents "
+        "in a foreign language. We want the service to be fast, reliable and easy to understand "
+        "for everyone. The weather is nice today, and I am going home after work. What will you "
+        "do this evening? Thank you and have a good day. Hello, how are you? Press the button "
+        "to continue. Here you can buy tickets and check the schedule."
+    ),
+    "de": (
+        "In diesem Jahr haben wir ein neues Projekt zur Erkennung und Übersetzung von Texten "
+        "begonnen. Die Benutzer senden Fotos, Audio und Videos, und das System extrahiert den "
+        "Text daraus und übersetzt ihn in andere Sprachen. Das ist sehr praktisch für Menschen, "
+        "die reisen oder mit Dokumenten in einer fremden Sprache arbeiten. Wir wollen, dass der "
+        "Dienst schnell, zuverlässig und für alle verständlich ist. Heute ist das Wetter schön, "
+        "und ich gehe nach der Arbeit nach Hause. Was machst du heute Abend? Vielen Dank und auf "
+        "Wiedersehen. Hallo, wie geht es dir? Drücken Sie die Taste, um fortzufahren. Hier "
+        "können Sie Fahrkarten kaufen und den Fahrplan ansehen. Die Straße ist größer."
+    ),
+    "fr": (
+        "Cette année, nous avons commencé un nouveau projet de reconnaissance et de traduction "
+        "de texte. Les utilisateurs envoient des photos, de l'audio et des vidéos, et le système "
+        "en extrait le texte et le traduit dans d'autres langues. C'est très pratique pour les "
+        "personnes qui voyagent ou qui travaillent avec des documents dans une langue étrangère. "
+        "Nous voulons que le service soit rapide, fiable et compréhensible pour tous. "
+        "Aujourd'hui il fait beau, et je rentre à la maison après le travail. Qu'est-ce que tu "
+        "vas faire ce soir? Merci beaucoup et au revoir. Bonjour, comment ça va? Appuyez sur le "
+        "bouton pour continuer. Ici vous pouvez acheter des billets et voir les horaires."
+    ),
+    "es": (
+        "Este año comenzamos un nuevo proyecto de reconocimiento y traducción de textos. Los "
+        "usuarios envían fotos, audio y vídeos, y el sistema extrae el texto y lo traduce a "
+        "otros idiomas. Es muy útil para las personas que viajan o trabajan con documentos en "
+        "un idioma extranjero. Queremos que el servicio sea rápido, fiable y comprensible para "
+        "todos. Hoy hace buen tiempo y voy a casa después del trabajo. ¿Qué vas a hacer esta "
+        "noche? Muchas gracias y hasta mañana. Hola, ¿cómo estás? Pulse el botón para "
+        "continuar. Aquí puede comprar los billetes y consultar el horario."
+    ),
+    "zh": (
+        "今年我们开始了一个新的文本识别和翻译项目。用户发送照片、音频和视频，系统从中提取文本"
+        "并将其翻译成其他语言。这对于旅行或使用外语文件工作的人来说非常方便。我们希望这项服务"
+        "快速、可靠，并且每个人都能理解。今天天气很好，下班后我要回家。你今天晚上做什么？"
+        "谢谢，再见。你好，最近怎么样？请按按钮继续。在这里可以买票和查看时刻表。"
+    ),
+}
+
+LANGUAGE_COMMON_WORDS = {
+    "ru": (
+        "и в не на я что он с как а то все она так его но да ты к у же вы за бы по только "
+        "ее мне было вот от меня еще нет о из ему теперь когда даже ну вдруг ли если уже или "
+        "ни быть был него до вас нибудь опять уж вам ведь там потом себя ничего ей может они "
+        "тут где есть надо ней для мы тебя их чем была сам чтоб без будто чего раз тоже себе "
+        "под будет тогда кто этот того потому этого какой совсем ним здесь этом один почти мой "
+        "тем чтобы нее сейчас были куда зачем всех никогда можно при наконец два об другой хоть "
+        "после над больше тот через эти нас про всего них какая много разве три эту моя впрочем "
+        "хорошо свою этой перед иногда лучше чуть том нельзя такой им более всегда конечно всю "
+        "между вход выход закрыто открыто цена скидка магазин улица дом мама рама работа время"
+    ),
+    "kk": (
+        "және мен бұл ол да де бір үшін деп бар еді екен жоқ болып болды болса сол осы біз "
+        "сіз сен олар мына ең тек кейін дейін бойынша арқылы туралы қазір бүгін ертең кеше "
+        "жақсы үлкен кіші жаңа ескі көп аз барлық әр әрбір қандай қалай неге қашан қайда кім "
+        "не немесе бірақ сондықтан себебі егер онда мұнда сонда біздің сіздің оның менің "
+        "сенің олардың керек мүмкін болады емес және де ғана тағы әлі енді қазақ тілі ана "
+        "бала үй жұмыс уақыт күн жыл адам халық ел жер су нан кіру шығу жабық ашық баға "
+        "жеңілдік дүкен көше рахмет сәлем қош келдіңіз кешіріңіз иә жоқ өте ұлы үлкен"
+    ),
+    "en": (
+        "the of and to a in is it you that he was for on are with as i his they be at one "
+        "have this from or had by not word but what some we can out other were all there "
+        "when up use your how said an each she which do their time if will way about many "
+        "then them write would like so these her long make thing see him two has look more "
+        "day could go come did number sound no most people my over know water than call first "
+        "who may down side been now find any new work part take get place made live where "
+        "after back little only round man year came show every good me give our under name "
+        "very through just form much great think say help low line before turn cause same "
+        "exit entrance open closed price sale off items store street please thank welcome"
+    ),
+    "de": (
+        "der die und in den von zu das mit sich des auf für ist im dem nicht ein eine als auch "
+        "es an werden aus er hat dass sie nach wird bei einer um am sind noch wie einem über "
+        "einen so zum war haben nur oder aber vor zur bis mehr durch man sein wurde sei hatte "
+        "kann gegen vom können schon wenn habe seine ihre dann unter wir soll ich eines jahr "
+        "zwei jahren diese dieser wieder keine seiner worden und will zwischen immer millionen "
+        "was sagte gibt alle seit muss doch jetzt drei neue damit bereits da auch ihr seinen "
+        "müssen ab ihrer ob sowie gut heute bitte danke ausgang eingang geöffnet geschlossen "
+        "preis angebot straße nicht rauchen verboten möglich achtung willkommen"
+    ),
+    "fr": (
+        "de la le et les des en un du une que est pour qui dans par plus pas au sur ne se "
+        "ce il sont avec ou son aux mais nous comme leur a ont été être cette elle ses fait "
+        "on y deux tout peut aussi sa bien sans même entre dont très depuis après encore "
+        "leurs avait autres ces sous lui tous deux où fait ans avant cela trois contre non "
+        "alors moins premier faire dit peu quand elles notre vous je tu mon ma mes votre "
+        "sortie entrée ouvert fermé prix soldes rue merci bienvenue défense interdit fumer "
+        "paiement carte accepté déranger pas ne voudrais plaît bonjour au revoir"
+    ),
+    "es": (
+        "de la que el en y a los se del las un por con no una su para es al lo como más o pero "
+        "sus le ha me si sin sobre este ya entre cuando todo esta ser son dos también fue "
+        "había era muy años hasta desde está mi porque qué sólo han yo hay vez puede todos "
+        "así nos ni parte tiene él uno donde bien tiempo mismo ese ahora cada e vida otro "
+        "después te otros aunque esa eso hace otra gobierno tan durante siempre día tanto "
+        "ella tres sí dijo sido gran país según menos salida entrada abierto cerrado precio "
+        "oferta calle gracias bienvenido prohibido fumar pago tarjeta molestar quiero pedir"
+    ),
+    "zh": (
+        "的 一 是 不 了 在 人 有 我 他 这 个 们 中 来 上 大 为 和 国 地 到 以 说 时 要 就 出 会 "
+        "可 也 你 对 生 能 而 子 那 得 于 着 下 自 之 年 过 发 后 作 里 用 道 行 所 然 家 种 事 "
+        "成 方 多 经 么 去 法 学 如 都 同 现 当 没 动 面 起 看 定 天 分 还 进 好 小 部 其 些 主 "
+        "样 理 心 她 本 前 开 但 因 只 从 想 实 入口 出口 营业 关闭 价格 禁止 吸烟 欢迎 谢谢"
+    ),
+}
+
+LANGUAGE_SCRIPTS = {
+    "ru": "cyrillic",
+    "kk": "cyrillic",
+    "en": "latin",
+    "de": "latin",
+    "fr": "latin",
+    "es": "latin",
+    "zh": "han",
+}
+
+SCRIPTS = ["latin", "cyrillic", "han"]
+
+HASH_BUCKETS = 1 << 14
+HASH_BITS = 14
+NGRAM_ORDERS = (1, 2, 3)
+FREQUENCY_SCALE = 2000.0
+SCRIPT_WEIGHT = 2.0
+
+_SPACE = 0x20
+_CODE_BITS = 21
+_HASH_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
+
+
+def _encode(texts: List[str], max_chars: int):
+    """
+    Кодирование пакета строк в один массив кодовых точек
+
+    Строки приводятся к нижнему регистру и обрамляются пробелами, всё кроме
+    букв латиницы, кириллицы и иероглифов заменяется пробелом. В конец массива
+    добавляются два пробела, чтобы у последней строки были все n-граммы.
+
+    Returns:
+        (кодовые точки uint64, маски письменностей, начала строк в массиве)
+    """
+    padded = [" " + text[:max_chars].lower() + " " for text in texts]
+    lengths = np.fromiter((len(text) for text in padded), dtype=np.int64, count=len(padded))
+    codes = np.frombuffer(("".join(padded) + "  ").encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+
+    masks = _script_masks(codes)
+    codes[~masks.any(axis=0)] = _SPACE
+
+    starts = np.zeros(len(padded), dtype=np.int64)
+    np.cumsum(lengths[:-1], out=starts[1:])
+    return codes, masks, starts
+
+
+def _script_masks(codes: np.ndarray) -> np.ndarray:
+    """Принадлежность каждой кодовой точки письменностям SCRIPTS (latin, cyrillic, han)"""
+    latin = ((codes >= 0x61) & (codes <= 0x7A)) | ((codes >= 0xDF) & (codes <= 0x24F))
+    cyrillic = (codes >= 0x400) & (codes <= 0x4FF)
+    han = ((codes >= 0x4E00) & (codes <= 0x9FFF)) | ((codes >= 0x3400) & (codes <= 0x4DBF))
+    return np.stack([latin, cyrillic, han])
+
+
+def _hash_ngrams(codes: np.ndarray):
+    """
+    Индексы корзин для 1-3-грамм, начинающихся в каждой позиции массива
+
+    Кодовые точки n-граммы упаковываются в одно 64-битное число и хешируются
+    умножением со сдвигом. N-граммы из одного пробела или с двумя пробелами
+    подряд (в том числе на стыке строк) попадают в пустую корзину HASH_BUCKETS.
+
+    Returns:
+        Список массивов индексов, по одному на порядок n-грамм
+    """
+    total = len(codes) - (max(NGRAM_ORDERS) - 1)
+    space = codes == _SPACE
+    double_space = space[:-1] & space[1:]
+
+    buckets = []
+    packed = np.zeros(total, dtype=np.uint64)
+    empty = np.zeros(total, dtype=bool)
+    for order in NGRAM_ORDERS:
+        offset = order - 1
+        packed = (packed << np.uint64(_CODE_BITS)) | codes[offset:offset + total]
+        if order == 1:
+            empty |= space[:total]
+        else:
+            empty |= double_space[offset - 1:offset - 1 + total]
+        hashed = ((packed + np.uint64(order)) * _HASH_MULTIPLIER) >> np.uint64(64 - HASH_BITS)
+        hashed = hashed.astype(np.int64)
+        hashed[empty] = HASH_BUCKETS
+        buckets.append(hashed)
+    return buckets
+
+
+class LanguageDetector:
+    """Определитель языка по хешированным символьным n-граммам"""
+
+    def __init__(self, max_chars: int = 1000):
+        self.max_chars = max_chars
+        self.languages = [lang for lang in settings.SUPPORTED_LANGUAGES if lang in LANGUAGE_SAMPLES]
+
+        # Последний столбец считает непустые n-граммы, последняя строка - пустая корзина
+        self.weights = np.zeros((HASH_BUCKETS + 1, len(self.languages) + 1), dtype=np.float32)
+        self.weights[:HASH_BUCKETS, -1] = 1.0
+        for column, lang in enumerate(self.languages):
+            sample = LANGUAGE_SAMPLES[lang] + " " + LANGUAGE_COMMON_WORDS.get(lang, "")
+            codes, _, _ = _encode([sample], max_chars=len(sample))
+            buckets = np.concatenate(_hash_ngrams(codes))
+            counts = np.bincount(buckets, minlength=HASH_BUCKETS + 1)[:HASH_BUCKETS].astype(np.float64)
+            self.weights[:HASH_BUCKETS, column] = np.log1p(counts / counts.sum() * FREQUENCY_SCALE)
+
+        self.script_matrix = np.zeros((len(SCRIPTS), len(self.languages)), dtype=np.float32)
+        for column, lang in enumerate(self.languages):
+            self.script_matrix[SCRIPTS.index(LANGUAGE_SCRIPTS[lang]), column] = 1.0
+
+    def scores(self, texts: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Оценки языков для пакета строк
+
+        Returns:
+            Матрица (число строк x число языков) и число букв в каждой строке
+        """
+        codes, masks, starts = _encode(texts, self.max_chars)
+
+        totals = None
+        for buckets in _hash_ngrams(codes):
+            row_sums = np.add.reduceat(self.weights[buckets], starts, axis=0)
+            totals = row_sums if totals is None else totals + row_sums
+
+        scores = totals[:, :-1] / np.maximum(totals[:, -1:], 1.0)
+
+        script_counts = np.add.reduceat(masks.T.astype(np.float32), starts, axis=0)
+        letters = script_counts.sum(axis=1)
+        shares = script_counts / np.maximum(letters, 1.0)[:, None]
+        scores += SCRIPT_WEIGHT * np.log(shares @ self.script_matrix + 0.01)
+
+        return scores, letters
+
+    def detect_batch(
+        self,
+        texts: List[str],
+        default: Optional[str] = "en",
+        min_letters: int = 1
+    ) -> List[Optional[str]]:
+        """
+        Определение языка для пакета строк
+
+        Args:
+            texts: Список строк
+            default: Язык для строк, где букв меньше min_letters
+            min_letters: Минимум букв для надежного определения
+
+        Returns:
+            Коды языков в порядке входных строк
+        """
+        if not texts:
+            return []
+        scores, letters = self.scores(texts)
+        best = scores.argmax(axis=1)
+        return [
+            self.languages[index] if letter_count >= min_letters else default
+            for index, letter_count in zip(best.tolist(), letters.tolist())
+        ]
+
+    def detect(self, text: str, default: Optional[str] = "en") -> Optional[str]:
+        """Определение языка одной строки"""
+        return self.detect_batch([text], default=default)[0]
+
+
+language_detector = LanguageDetector()
@@ -1,6 +1,9 @@
 import os
 import time
-from typing import Dict, Any
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from collections import Counter
+from typing import Dict, Any, Iterator, List, Optional, Tuple
 
 try:
     from moviepy.editor import VideoFileClip
@@ -17,9 +20,13 @@ from app.core.models import (
     TTSResponse
 )
 from app.services.whisper_service import whisper_service
-from app.services.ocr_service import ocr_service
+from app.services.ocr_service import ocr_service, NoTextDetectedError
 from app.services.translation_service import translation_service
 from app.services.tts_service import tts_service
+from app.services.text_layout import group_text_blocks
+from app.services.document_service import document_service
+from app.services.inference_pool import inference_pool
+from app.services.executors import service_executors, ExecutorBusyError
 from app.core.config import settings
 
 
@@ -30,6 +37,10 @@ class MediaProcessor:
         self.upload_dir = settings.UPLOAD_DIR
         os.makedirs(self.upload_dir, exist_ok=True)
     
+    def _speech_recognizer(self):
+        """Пул процессов инференса (если включен) или whisper_service в текущем процессе"""
+        return inference_pool if inference_pool.enabled else whisper_service
+    
     def extract_audio_from_video(self, video_path: str, output_audio_path: str) -> str:
         """Извлечение аудио из видео файла"""
         if not MOVIEPY_AVAILABLE:
@@ -68,16 +79,26 @@ class MediaProcessor:
             Результат обработки
         """
         
+        if request.media_type == MediaType.DOCUMENT:
+            return self.collect_document(request, file_path)
+        
         recognition_result = None
+        image = None
         
         try:
             if request.media_type == MediaType.IMAGE:
                 
-                recognition_result = ocr_service.recognize(file_path, return_boxes=False)
+                image = ocr_service.load_image(file_path)
+                if inference_pool.enabled:
+                    recognition_result = inference_pool.recognize_batch([image], return_boxes=True)[0]
+                    if not recognition_result["text"].strip():
+                        raise NoTextDetectedError("На изображении не найден текст")
+                else:
+                    recognition_result = ocr_service.recognize(image, return_boxes=True)
                 
             elif request.media_type == MediaType.AUDIO:
                 
-                recognition_result = whisper_service.transcribe(
+                recognition_result = self._speech_recognizer().transcribe(
                     file_path, 
                     return_timestamps=False,
                     enable_diarization=request.enable_diarization
@@ -88,7 +109,7 @@ class MediaProcessor:
                 audio_path = os.path.join(self.upload_dir, f"temp_audio_{os.path.basename(file_path)}.wav")
                 self.extract_audio_from_video(file_path, audio_path)
                 
-                recognition_result = whisper_service.transcribe(
+                recognition_result = self._speech_recognizer().transcribe(
                     audio_path, 
                     return_timestamps=False,
                     enable_diarization=request.enable_diarization
@@ -96,6 +117,8 @@ class MediaProcessor:
                 
                 if os.path.exists(audio_path):
                     os.remove(audio_path)
+        except NoTextDetectedError:
+            raise
         except ImportError as e:
             raise ImportError(f"AI-модель не установлена: {str(e)}. Для обработки {request.media_type.value} установите необходимые зависимости.")
         except Exception as e:
@@ -127,7 +150,7 @@ class MediaProcessor:
                     language=recognition_result.get("language"),
                     confidence=recognition_result.get("confidence"),
                     segments=recognition_result.get("segments"),
-                    bounding_boxes=recognition_result.get("bounding_boxes")
+                    bounding_boxes=recognition_result.get("bounding_boxes") if request.replace_text_on_image else None
                 ),
                 translation=TranslationResponse(**translation_result),
                 tts=None,
@@ -149,17 +172,49 @@ class MediaProcessor:
                 "chinese": "zh",
             }
             source_language = whisper_to_our_codes.get(source_language, source_language)
-        translations = translation_service.translate_multiple(
-            recognized_text,
-            source_language=source_language,
-            target_languages=request.target_languages
-        )
+        # Озвучка языка начинается сразу после его перевода, не дожидаясь остальных
+        tts_futures = {}
+        
+        def schedule_tts(lang: str, text: str):
+            if request.generate_tts and text.strip():
+                try:
+                    tts_futures[lang] = service_executors["tts"].submit(self.synthesize_translation, text, lang)
+                except ExecutorBusyError:
+                    # Пул TTS перегружен: язык остается без озвучки, как при ошибке синтеза
+                    pass
         
-        translation_result = {
-            "original_text": recognition_result["text"],
-            "source_language": source_language or "auto",
-            "translations": translations
-        }
+        blocks = None
+        if request.media_type == MediaType.IMAGE:
+            translation_result, blocks = self.translate_image_blocks(
+                [recognition_result],
+                request.target_languages
+            )[0]
+            translations = translation_result["translations"]
+            for lang in request.target_languages:
+                schedule_tts(lang, translations[lang])
+        else:
+            if request.generate_tts:
+                translated = {}
+                for lang, text in translation_service.translate_as_completed(
+                    recognized_text,
+                    source_language,
+                    request.target_languages
+                ):
+                    translated[lang] = text
+                    schedule_tts(lang, text)
+                translations = {lang: translated[lang] for lang in request.target_languages}
+            else:
+                translations = translation_service.translate_multiple(
+                    recognized_text,
+                    source_language=source_language,
+                    target_languages=request.target_languages
+                )
+            
+            translation_result = {
+                "original_text": recognition_result["text"],
+                "source_language": source_language or "auto",
+                "translations": translations
+            }
         
         
         processed_image_path = None
@@ -168,27 +223,21 @@ class MediaProcessor:
             file_ext = os.path.splitext(file_path)[1]
             output_filename = f"processed_{uuid.uuid4().hex[:8]}{file_ext}"
             output_image_path = os.path.join(self.upload_dir, output_filename)
-            ocr_service.replace_text_on_image(file_path, translations, output_image_path)
+            ocr_service.replace_text_on_image(
+                image,
+                blocks,
+                request.target_languages[0] if request.target_languages else "ru",
+                output_image_path
+            )
             processed_image_path = output_filename  
         
         
-        tts_result = None
-        if request.generate_tts:
-            
-            target_lang = request.target_languages[0] if request.target_languages else "ru"
-            translated_text = translations.get(target_lang, recognition_result["text"])
-            
-            import uuid
-            tts_filename = f"tts_{uuid.uuid4().hex[:8]}.wav"
-            tts_output_path = os.path.join(self.upload_dir, tts_filename)
-            
-            tts_result = tts_service.generate_speech(
-                translated_text,
-                language=target_lang,
-                output_path=tts_output_path
-            )
-            
-            tts_result["audio_path"] = tts_filename
+        tts_by_language = {}
+        for lang in request.target_languages:
+            future = tts_futures.get(lang)
+            tts_response = future.result() if future else None
+            if tts_response is not None:
+                tts_by_language[lang] = tts_response
         
         
         return ProcessMediaResponse(
@@ -197,13 +246,269 @@ class MediaProcessor:
                 language=recognition_result.get("language"),
                 confidence=recognition_result.get("confidence"),
                 segments=recognition_result.get("segments"),
-                bounding_boxes=recognition_result.get("bounding_boxes"),
+                bounding_boxes=recognition_result.get("bounding_boxes") if request.replace_text_on_image else None,
                 speakers=recognition_result.get("speakers")
             ),
             translation=TranslationResponse(**translation_result),
-            tts=TTSResponse(**tts_result) if tts_result else None,
+            tts=tts_by_language.get(request.target_languages[0]) if request.target_languages else None,
+            tts_by_language=tts_by_language or None,
             processed_image_path=processed_image_path
         )
+    
+    def synthesize_translation(self, text: str, language: str) -> Optional[TTSResponse]:
+        """
+        Озвучка перевода на один язык
+        
+        Returns:
+            Путь к аудио относительно UPLOAD_DIR или None, если синтез не удался
+        """
+        try:
+            result = tts_service.synthesize(text, language=language)
+        except Exception:
+            return None
+        if not result.get("success"):
+            return None
+        return TTSResponse(
+            audio_path=os.path.relpath(result["audio_path"], self.upload_dir).replace("\\", "/"),
+            duration=result["duration_seconds"],
+            language=language,
+            cached=result.get("cached", False)
+        )
+    
+    def translate_image_blocks(
+        self,
+        recognitions: List[Dict[str, Any]],
+        target_languages: List[str]
+    ) -> List[Tuple[Dict[str, Any], List[Dict[str, Any]]]]:
+        """
+        Перевод текста изображений по блокам одним пакетным вызовом
+        
+        Рамки OCR группируются в строки и абзацы, каждый блок переводится
+        как отдельный текст (язык по умолчанию - язык всего изображения),
+        поэтому на изображение можно вернуть перевод каждого блока в его рамку.
+        
+        Args:
+            recognitions: Результаты OCRService.recognize с bounding_boxes
+            target_languages: Языки перевода
+            
+        Returns:
+            Для каждого изображения: (результат перевода в формате TranslationResponse,
+            блоки с переводами в поле translations)
+        """
+        blocks_per_image = [
+            group_text_blocks(recognition.get("bounding_boxes") or [])
+            for recognition in recognitions
+        ]
+        image_languages = translation_service.detect_languages(
+            [recognition["text"] for recognition in recognitions]
+        )
+        
+        texts = []
+        sources = []
+        for blocks, language in zip(blocks_per_image, image_languages):
+            for block in blocks:
+                texts.append(block["text"])
+                sources.append(language)
+        documents = iter(translation_service.translate_documents(texts, sources, target_languages))
+        
+        results = []
+        for recognition, blocks, language in zip(recognitions, blocks_per_image, image_languages):
+            memory_scores = {}
+            for block in blocks:
+                document = next(documents)
+                block["translations"] = document["translations"]
+                for lang, score in document["memory_scores"].items():
+                    memory_scores[lang] = min(score, memory_scores.get(lang, 1.0))
+            
+            translation_result = {
+                "original_text": recognition["text"],
+                "source_language": language,
+                "translations": {
+                    lang: "\n".join(block["translations"][lang] for block in blocks)
+                    for lang in target_languages
+                },
+                "memory_scores": memory_scores
+            }
+            results.append((translation_result, blocks))
+        return results
+    
+    def process_images(self, request: ProcessMediaRequest, file_paths: List[str]) -> List[ProcessMediaResponse]:
+        """
+        Пакетная обработка нескольких изображений: распознавание + перевод
+        
+        Изображения декодируются параллельно, детекция текста идет одним
+        пакетом на все изображения, весь распознанный текст переводится
+        одним пакетным вызовом. Изображение без текста не прерывает обработку
+        остальных: для него возвращается пустой результат.
+        
+        Args:
+            request: Запрос на обработку (TTS для пакета не генерируется)
+            file_paths: Пути к изображениям
+            
+        Returns:
+            Результаты в порядке входных файлов
+        """
+        with ThreadPoolExecutor(max_workers=settings.OCR_DECODE_WORKERS) as executor:
+            images = list(executor.map(ocr_service.load_image, file_paths))
+        
+        try:
+            if inference_pool.enabled:
+                recognitions = inference_pool.recognize_batch(images, return_boxes=True)
+            else:
+                recognitions = ocr_service.recognize_batch(images, return_boxes=True)
+        except ImportError as e:
+            raise ImportError(f"AI-модель не установлена: {str(e)}. Для обработки image установите необходимые зависимости.")
+        except Exception as e:
+            raise ValueError(f"Ошибка распознавания image: {str(e)}")
+        
+        with_text = [index for index, recognition in enumerate(recognitions) if recognition["text"].strip()]
+        translated = self.translate_image_blocks(
+            [recognitions[index] for index in with_text],
+            request.target_languages
+        )
+        translation_results = {index: result for index, result in zip(with_text, translated)}
+        
+        def finish(index: int) -> ProcessMediaResponse:
+            recognition = recognitions[index]
+            translation_result, blocks = translation_results.get(index) or ({
+                "original_text": recognition["text"],
+                "source_language": "auto",
+                "translations": {lang: "" for lang in request.target_languages}
+            }, [])
+            
+            processed_image_path = None
+            if request.replace_text_on_image and blocks:
+                file_ext = os.path.splitext(file_paths[index])[1]
+                output_filename = f"processed_{uuid.uuid4().hex[:8]}{file_ext}"
+                ocr_service.replace_text_on_image(
+                    images[index],
+                    blocks,
+                    request.target_languages[0],
+                    os.path.join(self.upload_dir, output_filename)
+                )
+                processed_image_path = output_filename
+            
+            return ProcessMediaResponse(
+                recognition=RecognitionResponse(
+                    text=recognition["text"],
+                    language=recognition.get("language"),
+                    confidence=recognition.get("confidence"),
+                    bounding_boxes=recognition.get("bounding_boxes") if request.replace_text_on_image else None
+                ),
+                translation=TranslationResponse(**translation_result),
+                processed_image_path=processed_image_path
+            )
+        
+        with ThreadPoolExecutor(max_workers=settings.OCR_DECODE_WORKERS) as executor:
+            return list(executor.map(finish, range(len(images))))
+
+    
+    def _translate_pages(self, pages: List[Dict[str, Any]], target_languages: List[str]) -> List[Dict[str, Any]]:
+        """Перевод пачки страниц: OCR-страницы по блокам, текстовый слой целиком"""
+        translations = {}
+        
+        scanned = [
+            index for index, page in enumerate(pages)
+            if page["source"] == "ocr" and page["recognition"]["text"].strip()
+        ]
+        if scanned:
+            translated = self.translate_image_blocks(
+                [pages[index]["recognition"] for index in scanned],
+                target_languages
+            )
+            for index, (translation_result, _) in zip(scanned, translated):
+                translations[index] = translation_result
+        
+        text_layer = [index for index, page in enumerate(pages) if page["source"] == "text_layer"]
+        if text_layer:
+            documents = translation_service.translate_documents(
+                [pages[index]["recognition"]["text"] for index in text_layer],
+                None,
+                target_languages
+            )
+            for index, document in zip(text_layer, documents):
+                translations[index] = document
+        
+        results = []
+        for index, page in enumerate(pages):
+            recognition = page["recognition"]
+            translation_result = translations.get(index) or {
+                "original_text": recognition["text"],
+                "source_language": "auto",
+                "translations": {lang: "" for lang in target_languages}
+            }
+            results.append({
+                "page": page["page"],
+                "page_count": page["page_count"],
+                "source": page["source"],
+                "dpi": page["dpi"],
+                "recognition": {
+                    "text": recognition["text"],
+                    "language": recognition.get("language"),
+                    "confidence": recognition.get("confidence")
+                },
+                "translation": translation_result
+            })
+        return results
+    
+    def process_document(self, request: ProcessMediaRequest, file_path: str) -> Iterator[Dict[str, Any]]:
+        """
+        Постраничная обработка PDF или многостраничного TIFF: распознавание + перевод
+        
+        Страницы распознаются параллельно (DocumentService.recognize_pages) и
+        переводятся пачками по DOCUMENT_TRANSLATE_BATCH страниц, поэтому первые
+        результаты приходят до окончания OCR всего документа, а в памяти
+        держится не больше одной пачки.
+        
+        Yields:
+            Результат страницы: page, page_count, source, dpi, recognition, translation
+        """
+        batch = []
+        for page in document_service.recognize_pages(file_path):
+            batch.append(page)
+            if len(batch) >= settings.DOCUMENT_TRANSLATE_BATCH:
+                yield from self._translate_pages(batch, request.target_languages)
+                batch = []
+        if batch:
+            yield from self._translate_pages(batch, request.target_languages)
+    
+    def collect_document(self, request: ProcessMediaRequest, file_path: str) -> ProcessMediaResponse:
+        """Обработка документа целиком: текст страниц объединяется, по странице на сегмент"""
+        try:
+            pages = list(self.process_document(request, file_path))
+        except ImportError as e:
+            raise ImportError(f"AI-модель не установлена: {str(e)}. Для обработки document установите необходимые зависимости.")
+        except Exception as e:
+            raise ValueError(f"Ошибка распознавания document: {str(e)}")
+        
+        texts = [page["recognition"]["text"] for page in pages]
+        if not any(text.strip() for text in texts):
+            raise ValueError("Не удалось распознать текст из документа. Возможно, страницы не содержат текста.")
+        
+        languages = Counter(
+            page["translation"]["source_language"] for page in pages
+            if page["recognition"]["text"].strip() and page["translation"]["source_language"] != "auto"
+        )
+        language = languages.most_common(1)[0][0] if languages else None
+        text = "\n\n".join(texts)
+        return ProcessMediaResponse(
+            recognition=RecognitionResponse(
+                text=text,
+                language=language,
+                segments=[
+                    {"page": page["page"], "source": page["source"], "text": page["recognition"]["text"]}
+                    for page in pages
+                ]
+            ),
+            translation=TranslationResponse(
+                original_text=text,
+                source_language=language or "auto",
+                translations={
+                    lang: "\n\n".join(page["translation"]["translations"].get(lang, "") for page in pages)
+                    for lang in request.target_languages
+                }
+            )
+        )
 
 
 media_processor = MediaProcessor()
@@ -1,53 +1,177 @@
 """
-Предзагрузка моделей при старте сервера для ускорения первого запроса
+Предзагрузка и прогрев моделей при старте сервера
+
+Модели грузятся параллельно, каждая в своем потоке, после загрузки
+выполняется крошечный инференс, чтобы первый настоящий запрос не платил
+за ленивую инициализацию (JIT, аллокаторы, кэши ядер). Прогретые модели
+закрепляются в реестре, чтобы простой и бюджеты их не выгружали. Состояние
+каждой модели (статус, время загрузки и прогрева, ошибка) отдает /api/ready.
 """
-import asyncio
+import threading
+import time
+from typing import Any, Callable, Dict, List, Tuple
+from app.core.config import settings
+from app.services.model_registry import model_registry
 from app.services.whisper_service import whisper_service
 from app.services.ocr_service import ocr_service
 from app.services.translation_service import translation_service
+from app.services.tts_service import tts_service
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+    np = None
+
+
+def _load_whisper():
+    return whisper_service.load_model()
+
+
+def _warm_whisper(model):
+    segments, _ = model.transcribe(np.zeros(16000, dtype=np.float32), beam_size=1)
+    list(segments)
+
+
+def _whisper_keys(_) -> List[str]:
+    return [f"whisper:{whisper_service.model_name}"]
+
+
+def _load_ocr():
+    return ocr_service.load_model()
+
+
+def _warm_ocr(reader):
+    reader.readtext(np.full((64, 256, 3), 255, dtype=np.uint8), detail=1)
+
+
+def _ocr_keys(_) -> List[str]:
+    readers = ocr_service.readers
+    return [readers._key(readers.languages_for(ocr_service.default_script))]
+
+
+def _load_translation():
+    return translation_service.load_model()
+
+
+def _warm_translation(_):
+    translation_service._nllb_translate_batch(["Hello"], "en", "ru")
+
+
+def _translation_keys(_) -> List[str]:
+    return [f"nllb:{translation_service.model_name}"]
+
+
+def _load_tts():
+    models = [tts_service._load(language) for language in settings.TTS_PRELOAD_LANGUAGES]
+    if any(model is None for _, model in models):
+        raise RuntimeError("Не удалось загрузить модель TTS")
+    return models
+
+
+def _warm_tts(models):
+    for name, model in models:
+        with tts_service.models.synthesis_lock(name):
+            model.tts(text="Ok.")
+
+
+def _tts_keys(models) -> List[str]:
+    return [f"coqui:{name}" for name, _ in models]
+
+
+# Загрузка, прогрев и ключи загруженных моделей в model_registry
+WARMUP_TASKS: Dict[str, Tuple[Callable[[], Any], Callable[[Any], None], Callable[[Any], List[str]]]] = {
+    "whisper": (_load_whisper, _warm_whisper, _whisper_keys),
+    "ocr": (_load_ocr, _warm_ocr, _ocr_keys),
+    "translation": (_load_translation, _warm_translation, _translation_keys),
+    "tts": (_load_tts, _warm_tts, _tts_keys),
+}
+
+
+_status: Dict[str, Dict[str, Any]] = {}
+_keys: Dict[str, List[str]] = {}
+_status_lock = threading.Lock()
+
+
+def _update(name: str, **fields):
+    with _status_lock:
+        _status[name].update(fields)
+
+
+def _evicted(name: str) -> bool:
+    """Прогретая модель выгружена из реестра (например, явным unload)"""
+    return _status[name]["status"] == "ready" and not all(model_registry.is_loaded(key) for key in _keys.get(name, []))
+
+
+def _run(
+    name: str,
+    load: Callable[[], Any],
+    warm: Callable[[Any], None],
+    keys: Callable[[Any], List[str]]
+):
+    _update(name, status="loading")
+    started = time.perf_counter()
+    try:
+        model = load()
+        loaded = time.perf_counter()
+        _update(name, status="warming", load_seconds=round(loaded - started, 2))
+        warm(model)
+        with _status_lock:
+            _keys[name] = keys(model)
+        for key in _keys[name]:
+            model_registry.pin(key)
+        _update(name, status="ready", warmup_seconds=round(time.perf_counter() - loaded, 2))
+    except ImportError as e:
+        # Зависимость не установлена: функция отключена, готовности это не мешает
+        _update(name, status="unavailable", error=str(e))
+    except Exception as e:
+        _update(name, status="failed", error=str(e))
+
+
+def preload_models_sync(names: List[str] = None) -> List[threading.Thread]:
+    """Параллельная предзагрузка и прогрев моделей (для использования в startup event)"""
+    with _status_lock:
+        # Уже загруженные (например, мастером pre-fork сервера) и загружаемые
+        # модели повторно не запускаются, упавшие и выгруженные - запускаются заново
+        names = [
+            name for name in (names or settings.WARMUP_MODELS)
+            if name in WARMUP_TASKS and (
+                name not in _status or _status[name]["status"] == "failed" or _evicted(name)
+            )
+        ]
+        for name in names:
+            _status[name] = {
+                "status": "pending",
+                "load_seconds": None,
+                "warmup_seconds": None,
+                "error": None,
+            }
+
+    threads = []
+    for name in names:
+        thread = threading.Thread(target=_run, args=(name, *WARMUP_TASKS[name]), daemon=True, name=f"warmup-{name}")
+        thread.start()
+        threads.append(thread)
+    return threads
 
 
-async def preload_models():
-    """Предзагрузка всех моделей в фоновом режиме"""
-    async def load_whisper():
-        try:
-            whisper_service.load_model()
-        except Exception:
-            pass
-    
-    async def load_ocr():
-        try:
-            ocr_service.load_model()
-        except Exception:
-            pass
-    
-    async def load_translation():
-        try:
-            translation_service.load_model()
-        except Exception:
-            pass
-    
-    await asyncio.gather(
-        load_whisper(),
-        load_ocr(),
-        load_translation(),
-        return_exceptions=True
-    )
-
-
-def preload_models_sync():
-    """Синхронная предзагрузка моделей (для использования в startup event)"""
-    import threading
-    
-    def load_in_thread():
-        try:
-            whisper_service.load_model()
-            ocr_service.load_model()
-            translation_service.load_model()
-        except Exception:
-            pass
-    
-    
-    thread = threading.Thread(target=load_in_thread, daemon=True)
-    thread.start()
+def readiness() -> Dict[str, Any]:
+    """
+    Готовность моделей
 
+    Процесс готов, когда каждая модель прогрета или недоступна (не
+    установлена зависимость); модель с ошибкой загрузки держит процесс
+    неготовым, чтобы балансировщик не направлял на него запросы. Статус
+    "ready" сверяется с реестром: выгруженная модель получает статус
+    "evicted" и тоже держит процесс неготовым.
+    """
+    with _status_lock:
+        models = {name: dict(state) for name, state in _status.items()}
+        for name, state in models.items():
+            if _evicted(name):
+                state["status"] = "evicted"
+    return {
+        "ready": all(state["status"] in ("ready", "unavailable") for state in models.values()),
+        "models": models,
+    }
@@ -0,0 +1,405 @@
+"""
+Общий реестр загруженных моделей
+
+Все сервисы (Whisper, EasyOCR, NLLB, Coqui TTS, pyannote) загружают модели
+через model_registry.get. Реестр помнит размер каждой модели (прирост RSS
+при загрузке или размер весов), держит общий бюджет MODEL_MEMORY_BUDGET_MB
+и бюджеты групп, выгружает давно не использованные модели по
+MODEL_IDLE_TTL_SECONDS, а при RSS процесса выше MODEL_RSS_LIMIT_MB выгружает
+самые холодные модели - вместо перезапуска процесса менеджером pm2.
+Закрепленные модели (pin) автоматически не выгружаются.
+Для давления памяти учитывается только собственная память процесса: у
+воркеров pre-fork сервера общие с мастером страницы весов не считаются.
+"""
+import gc
+import os
+import threading
+import time
+import warnings
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+from app.core.config import settings
+
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def current_rss(pid: Optional[int] = None) -> Optional[int]:
+    """Резидентная память процесса (по умолчанию текущего) в байтах (None, если /proc недоступен)"""
+    try:
+        with open(f"/proc/{pid or 'self'}/statm") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def private_rss(pid: Optional[int] = None) -> Optional[int]:
+    """
+    Собственная (не общая с другими процессами) резидентная память в байтах
+
+    После fork веса моделей остаются общими страницами мастера и воркеров;
+    statm считает их в RSS каждого процесса, smaps_rollup - нет.
+    """
+    try:
+        with open(f"/proc/{pid or 'self'}/smaps_rollup") as f:
+            private = [int(line.split()[1]) for line in f if line.startswith(("Private_Clean:", "Private_Dirty:"))]
+        if private:
+            return sum(private) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return current_rss(pid)
+
+
+def parameter_bytes(model: Any, depth: int = 3) -> int:
+    """
+    Размер весов PyTorch в объекте модели
+
+    Обертки (Reader, TTS, кортеж (модель, токенизатор)) обходятся по
+    атрибутам на несколько уровней вглубь; каждый модуль учитывается один раз.
+    """
+    seen = set()
+
+    def visit(obj: Any, level: int) -> int:
+        if obj is None or id(obj) in seen or isinstance(obj, (str, bytes, int, float, bool)):
+            return 0
+        seen.add(id(obj))
+        if hasattr(obj, "parameters") and hasattr(obj, "named_modules"):
+            return sum(p.numel() * p.element_size() for p in obj.parameters())
+        if level == 0:
+            return 0
+        if isinstance(obj, (list, tuple)):
+            return sum(visit(item, level - 1) for item in obj)
+        if hasattr(obj, "__dict__"):
+            return sum(visit(value, level - 1) for value in vars(obj).values())
+        return 0
+
+    return visit(model, depth)
+
+
+def directory_bytes(path: str) -> int:
+    """
+    Размер файлов модели на диске
+
+    Модели CTranslate2 (faster-whisper) не содержат параметров PyTorch;
+    их веса загружаются в память целиком, и размер каталога модели - честная
+    оценка занимаемой памяти.
+    """
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+class ModelRegistry:
+    """LRU-реестр моделей с общим бюджетом памяти и выгрузкой простаивающих"""
+
+    def __init__(
+        self,
+        budget_mb: int = settings.MODEL_MEMORY_BUDGET_MB,
+        rss_limit_mb: int = settings.MODEL_RSS_LIMIT_MB,
+        idle_ttl: float = settings.MODEL_IDLE_TTL_SECONDS
+    ):
+        self.budget = budget_mb * 1024 * 1024
+        self.rss_limit = rss_limit_mb * 1024 * 1024
+        self.idle_ttl = idle_ttl
+
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._group_budgets: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._load_locks: Dict[str, threading.Lock] = {}
+        self._loading = 0
+        self._load_starts = 0
+        self._reaper: Optional[threading.Thread] = None
+        self.reaping = True
+
+    def set_group_budget(self, group: str, budget_mb: int):
+        """Отдельный бюджет для группы моделей (например, читатели OCR)"""
+        with self._lock:
+            self._group_budgets[group] = budget_mb * 1024 * 1024
+
+    def is_loaded(self, key: str) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def pin(self, key: str) -> bool:
+        """
+        Закрепление загруженной модели: бюджеты, простой и давление памяти ее не выгружают
+
+        Returns:
+            False, если модель не загружена
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False
+            entry["pinned"] = True
+            return True
+
+    def get(
+        self,
+        key: str,
+        loader: Callable[[], Any],
+        group: Optional[str] = None,
+        measure: Callable[[Any], int] = parameter_bytes
+    ) -> Any:
+        """
+        Модель по ключу; при отсутствии загружается через loader()
+
+        Загрузка идет вне общей блокировки (разные модели грузятся
+        параллельно), одна и та же модель дважды не загружается.
+
+        Args:
+            measure: Оценка размера модели в байтах, если прирост RSS
+                измерить нельзя (по умолчанию размер весов PyTorch)
+        """
+        self._start_reaper()
+        with self._lock:
+            entry = self._touch(key)
+            if entry is not None:
+                return entry["model"]
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+
+        with load_lock:
+            with self._lock:
+                entry = self._touch(key)
+                if entry is not None:
+                    return entry["model"]
+                self._loading += 1
+                self._load_starts += 1
+                overlapped = self._loading > 1
+                started = self._load_starts
+
+            rss_before = current_rss()
+            try:
+                model = loader()
+            finally:
+                with self._lock:
+                    self._loading -= 1
+                    overlapped = overlapped or self._load_starts != started
+            rss_after = current_rss()
+
+            # Прирост RSS честен, только если параллельно ничего не грузилось
+            size, measured = self._measure(key, model, measure)
+            if not overlapped and rss_before is not None and rss_after is not None and rss_after - rss_before > size:
+                size = rss_after - rss_before
+                measured = "rss"
+
+            self._check_budget(key, group, size)
+            now = time.monotonic()
+            with self._lock:
+                self._entries[key] = {
+                    "model": model,
+                    "group": group,
+                    "size": size,
+                    "measured": measured,
+                    "loaded_at": now,
+                    "last_used": now,
+                    "uses": 1,
+                    "pinned": False,
+                }
+                evicted = self._enforce_budgets(keep=key)
+        if evicted:
+            gc.collect()
+        self.relieve_pressure(keep=key)
+        return model
+
+    def _measure(self, key: str, model: Any, measure: Callable[[Any], int]):
+        """
+        Размер модели и способ его оценки
+
+        Ошибка оценки (например, каталог модели не найден в кэше) не должна
+        выбросить уже загруженную модель: берется размер весов PyTorch.
+        """
+        for function in dict.fromkeys([measure, parameter_bytes]):
+            try:
+                return function(model), "parameters" if function is parameter_bytes else "estimate"
+            except Exception as e:
+                warnings.warn(f"Не удалось оценить размер модели {key}: {e}", RuntimeWarning)
+        return 0, "unknown"
+
+    def _check_budget(self, key: str, group: Optional[str], size: int):
+        """Предупреждение о модели, которая одна больше общего бюджета или бюджета группы"""
+        budgets = [("MODEL_MEMORY_BUDGET_MB", self.budget)]
+        with self._lock:
+            if group in self._group_budgets:
+                budgets.append((f"бюджет группы {group}", self._group_budgets[group]))
+        for name, budget in budgets:
+            if size > budget:
+                warnings.warn(
+                    f"Модель {key} ({size / (1024 * 1024):.0f} МБ) больше, чем {name} "
+                    f"({budget / (1024 * 1024):.0f} МБ): остальные модели будут выгружаться при каждой ее загрузке",
+                    RuntimeWarning
+                )
+
+    def _touch(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            entry["last_used"] = time.monotonic()
+            entry["uses"] += 1
+        return entry
+
+    def _enforce_budgets(self, keep: str) -> List[str]:
+        evicted = []
+        group = self._entries[keep]["group"]
+        group_budget = self._group_budgets.get(group)
+        if group_budget is not None:
+            while True:
+                members = [key for key, entry in self._entries.items() if entry["group"] == group]
+                if sum(self._entries[key]["size"] for key in members) <= group_budget:
+                    break
+                oldest = self._coldest(members, keep)
+                if oldest is None:
+                    break
+                evicted.append(oldest)
+                del self._entries[oldest]
+
+        while sum(entry["size"] for entry in self._entries.values()) > self.budget:
+            oldest = self._coldest(self._entries, keep)
+            if oldest is None:
+                break
+            evicted.append(oldest)
+            del self._entries[oldest]
+        return evicted
+
+    def _coldest(self, keys, keep: Optional[str]) -> Optional[str]:
+        """Давно не использованная незакрепленная модель (кроме keep)"""
+        return next((key for key in keys if key != keep and not self._entries[key]["pinned"]), None)
+
+    def unload(self, key: str) -> bool:
+        """Выгрузка модели (сервис, который сейчас ее использует, доработает со своей ссылкой)"""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        del entry
+        gc.collect()
+        return True
+
+    def unload_idle(self) -> List[str]:
+        """Выгрузка моделей, не использованных дольше MODEL_IDLE_TTL_SECONDS"""
+        if self.idle_ttl <= 0:
+            return []
+        deadline = time.monotonic() - self.idle_ttl
+        with self._lock:
+            idle = [
+                key for key, entry in self._entries.items()
+                if entry["last_used"] < deadline and not entry["pinned"]
+            ]
+            for key in idle:
+                del self._entries[key]
+        if idle:
+            gc.collect()
+        return idle
+
+    def relieve_pressure(self, keep: Optional[str] = None) -> List[str]:
+        """
+        Выгрузка самых холодных моделей, пока собственная память процесса выше MODEL_RSS_LIMIT_MB
+
+        Если выгрузка не уменьшила память (на модель еще ссылается работающий
+        запрос, аллокатор не вернул страницы системе или память занята не
+        моделями), выгрузка прекращается: иначе реестр опустел бы целиком.
+        """
+        if self.rss_limit <= 0:
+            return []
+        evicted = []
+        rss = private_rss()
+        while rss is not None and rss > self.rss_limit:
+            with self._lock:
+                coldest = self._coldest(self._entries, keep)
+                if coldest is None:
+                    break
+                evicted.append(coldest)
+                del self._entries[coldest]
+            gc.collect()
+            previous, rss = rss, private_rss()
+            if rss is not None and rss >= previous:
+                break
+        return evicted
+
+    def _start_reaper(self):
+        if self._reaper is not None or (self.idle_ttl <= 0 and self.rss_limit <= 0):
+            return
+        with self._lock:
+            if self._reaper is not None:
+                return
+
+            def reap():
+                while True:
+                    time.sleep(settings.MODEL_REAPER_INTERVAL_SECONDS)
+                    if not self.reaping:
+                        continue
+                    try:
+                        self.unload_idle()
+                        self.relieve_pressure()
+                    except Exception:
+                        pass
+
+            self._reaper = threading.Thread(target=reap, daemon=True)
+            self._reaper.start()
+
+    def after_fork(self):
+        """
+        Сброс состояния в дочернем процессе после fork
+
+        Из потоков родителя в дочернем процессе остается только вызвавший
+        fork: блокировки, которые держал поток-сборщик, и сам поток
+        создаются заново. Унаследованные модели закрепляются: их страницы
+        общие с родителем, и выгрузка в дочернем процессе памяти не
+        освободит, а лишь заставит позже загрузить собственную копию.
+        """
+        self._lock = threading.Lock()
+        self._load_locks = {}
+        self._loading = 0
+        self._reaper = None
+        self.reaping = True
+        for entry in self._entries.values():
+            entry["pinned"] = True
+
+    def entries(self, group: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Загруженные модели от давно использованных к недавним"""
+        now = time.monotonic()
+        with self._lock:
+            return [
+                {
+                    "key": key,
+                    "group": entry["group"],
+                    "size_mb": round(entry["size"] / (1024 * 1024), 1),
+                    "measured": entry["measured"],
+                    "over_budget": entry["size"] > self.budget,
+                    "idle_seconds": round(now - entry["last_used"], 1),
+                    "loaded_seconds": round(now - entry["loaded_at"], 1),
+                    "uses": entry["uses"],
+                    "pinned": entry["pinned"],
+                }
+                for key, entry in self._entries.items()
+                if group is None or entry["group"] == group
+            ]
+
+    def residency(self) -> Dict[str, Any]:
+        """Текущее состояние: модели, сумма их размеров, RSS процесса и лимиты"""
+        models = self.entries()
+        rss = current_rss()
+        private = private_rss()
+        return {
+            "pid": os.getpid(),
+            "models": models,
+            "models_mb": round(sum(model["size_mb"] for model in models), 1),
+            "rss_mb": round(rss / (1024 * 1024), 1) if rss is not None else None,
+            "private_mb": round(private / (1024 * 1024), 1) if private is not None else None,
+            "budget_mb": round(self.budget / (1024 * 1024), 1),
+            "rss_limit_mb": round(self.rss_limit / (1024 * 1024), 1),
+            "idle_ttl_seconds": self.idle_ttl,
+        }
+
+
+model_registry = ModelRegistry()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=model_registry.after_fork)
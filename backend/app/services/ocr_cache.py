@@ -0,0 +1,430 @@
+"""
+Кэш результатов OCR по перцептивному хэшу изображения
+
+Пересланные скриншоты приходят пережатыми, уменьшенными или с другими
+метаданными, поэтому хэш байтов не совпадает, хотя текст тот же. Здесь
+изображение описывается 64-битным pHash (DCT уменьшенной копии), а похожие
+хэши ищутся в BK-дереве по расстоянию Хэмминга.
+
+Миниатюры не различают мелкий текст: два счета одной верстки с "100 USD" и
+"900 EUR" дают одинаковый pHash и корреляцию миниатюр 0.998. Поэтому
+результат без проверки отдается только при точном совпадении хэша
+декодированных пикселей. Похожий кандидат подтверждается в полном
+разрешении: области всех его рамок текста вырезаются из нового изображения
+и сравниваются с сохраненными вырезками по блокам примерно в символ.
+Вырезки не видят текста, добавленного вне рамок (скриншот с лишней
+строкой), поэтому весь кадр вне рамок сверяется еще и по карте мелких
+деталей: блоки уменьшенной копии с остатком после размытия.
+"""
+import hashlib
+import math
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+from app.core.config import settings
+
+try:
+    import cv2
+    import numpy as np
+    CV2_AVAILABLE = True
+except ImportError:
+    CV2_AVAILABLE = False
+    cv2 = None
+    np = None
+
+
+HASH_SIZE = 8
+DCT_SIZE = 32
+THUMBNAIL_SIZE = 64
+SAMPLE_SIZE = 512
+BLOCK_SIZE = 8
+BLUR_SIGMA = 1.0
+CROP_PADDING = 2
+EDGE_SIZE = 512
+EDGE_BLOCK = 8
+
+
+def _dct_matrix(size: int) -> "np.ndarray":
+    """Матрица DCT-II с ортонормировкой"""
+    k = np.arange(size)[:, None]
+    n = np.arange(size)[None, :]
+    matrix = np.cos(np.pi * (2 * n + 1) * k / (2 * size)) * np.sqrt(2.0 / size)
+    matrix[0] /= np.sqrt(2.0)
+    return matrix
+
+
+_DCT = _dct_matrix(DCT_SIZE) if CV2_AVAILABLE else None
+
+
+def grey_thumbnail(image: "np.ndarray") -> "np.ndarray":
+    """
+    Серая миниатюра THUMBNAIL_SIZE x THUMBNAIL_SIZE
+
+    Большие изображения сначала прореживаются до ~SAMPLE_SIZE пикселей
+    по короткой стороне: усреднение INTER_AREA по 12 Мп стоит десятки
+    миллисекунд, а на хэш прореживание почти не влияет.
+    """
+    step = max(1, min(image.shape[:2]) // SAMPLE_SIZE)
+    small = cv2.resize(image[::step, ::step], (THUMBNAIL_SIZE, THUMBNAIL_SIZE), interpolation=cv2.INTER_AREA)
+    return small if small.ndim == 2 else cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+
+
+def perceptual_hash(grey: "np.ndarray") -> int:
+    """
+    64-битный pHash: знаки низкочастотных коэффициентов DCT относительно медианы
+
+    Устойчив к пережатию JPEG, изменению размера и небольшим сдвигам яркости.
+    """
+    small = cv2.resize(grey, (DCT_SIZE, DCT_SIZE), interpolation=cv2.INTER_AREA).astype(np.float64)
+    coefficients = (_DCT @ small @ _DCT.T)[:HASH_SIZE, :HASH_SIZE].ravel()
+    bits = coefficients > np.median(coefficients[1:])
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def normalized(grey: "np.ndarray") -> "np.ndarray":
+    """Миниатюра с нулевым средним и единичной нормой для проверки кандидатов по корреляции"""
+    vector = grey.astype(np.float32).ravel()
+    vector -= vector.mean()
+    norm = float(np.linalg.norm(vector))
+    return vector / norm if norm > 0 else vector
+
+
+def content_digest(image: "np.ndarray") -> bytes:
+    """Хэш декодированных пикселей (вместе с формой и типом массива)"""
+    image = np.ascontiguousarray(image)
+    digest = hashlib.blake2b(f"{image.shape}{image.dtype}".encode(), digest_size=16)
+    digest.update(image.data)
+    return digest.digest()
+
+
+def full_grey(image: "np.ndarray") -> "np.ndarray":
+    """Серое изображение в полном разрешении для сверки вырезок"""
+    return image if image.ndim == 2 else cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+
+
+def box_rect(points: Any, width: int, height: int) -> Optional[Tuple[int, int, int, int]]:
+    """Прямоугольник рамки с небольшим полем, обрезанный по изображению: (x0, y0, x1, y1)"""
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    x0 = max(int(math.floor(points[:, 0].min())) - CROP_PADDING, 0)
+    y0 = max(int(math.floor(points[:, 1].min())) - CROP_PADDING, 0)
+    x1 = min(int(math.ceil(points[:, 0].max())) + CROP_PADDING, width)
+    y1 = min(int(math.ceil(points[:, 1].max())) + CROP_PADDING, height)
+    if x1 - x0 < 2 or y1 - y0 < 2:
+        return None
+    return x0, y0, x1, y1
+
+
+def crops_differ(cached: "np.ndarray", current: "np.ndarray", max_block_difference: float, scale: float = 1.0) -> bool:
+    """
+    Отличаются ли вырезки одной и той же рамки
+
+    current - та же область текущего изображения, уже приведенная к сетке
+    cached; scale - во сколько раз текущее изображение больше сохраненного.
+    Обе вырезки слегка размываются (сильнее, если текущее изображение
+    меньше: детали мельче его пикселя не сравниваются), из них вычитается
+    средняя яркость, разница усредняется по блокам. Достаточно одного блока
+    (примерно одного символа) с разницей больше порога; шум пережатия и
+    пересчета размера лежит по краям букв и в среднем по блоку не набирается.
+    """
+    reduction = max(1.0, 1.0 / scale)
+    sigma = BLUR_SIGMA * reduction
+    cached = cv2.GaussianBlur(cached.astype(np.float32), (0, 0), sigma)
+    current = cv2.GaussianBlur(current.astype(np.float32), (0, 0), sigma)
+    difference = np.abs((cached - cached.mean()) - (current - current.mean()))
+
+    height, width = difference.shape
+    block = max(1, min(int(round(BLOCK_SIZE * reduction)), height, width))
+    rows, columns = height // block, width // block
+    blocks = difference[:rows * block, :columns * block].reshape(rows, block, columns, block).mean(axis=(1, 3))
+    return float(blocks.max()) > max_block_difference
+
+
+def edge_map(grey: "np.ndarray") -> "np.ndarray":
+    """
+    Карта мелких деталей кадра: средний модуль остатка после размытия
+    по блокам EDGE_BLOCK копии с длинной стороной EDGE_SIZE
+
+    Фон и плавные градиенты дают почти ноль, строка текста - десятки
+    единиц яркости; шум пережатия и изменения размера - меньше единицы.
+    """
+    height, width = grey.shape
+    scale = EDGE_SIZE / max(height, width)
+    size = (max(EDGE_BLOCK, round(width * scale)), max(EDGE_BLOCK, round(height * scale)))
+    small = cv2.resize(grey, size, interpolation=cv2.INTER_AREA).astype(np.float32)
+    residual = np.abs(small - cv2.GaussianBlur(small, (0, 0), 2.0))
+    rows, columns = small.shape[0] // EDGE_BLOCK, small.shape[1] // EDGE_BLOCK
+    return residual[:rows * EDGE_BLOCK, :columns * EDGE_BLOCK].reshape(
+        rows, EDGE_BLOCK, columns, EDGE_BLOCK
+    ).mean(axis=(1, 3))
+
+
+def boxes_mask(rects: List[Tuple[int, int, int, int]], shape: Tuple[int, int], grid: Tuple[int, int]) -> "np.ndarray":
+    """Блоки карты edge_map, которые задевают рамки (с полем в блок): их сверяют вырезки"""
+    height, width = shape
+    rows, columns = grid
+    mask = np.zeros(grid, dtype=bool)
+    for x0, y0, x1, y1 in rects:
+        mask[
+            max(int(y0 * rows / height) - 1, 0):int(math.ceil(y1 * rows / height)) + 1,
+            max(int(x0 * columns / width) - 1, 0):int(math.ceil(x1 * columns / width)) + 1
+        ] = True
+    return mask
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+class BKTree:
+    """
+    BK-дерево по расстоянию Хэмминга
+
+    Узлы не удаляются: у каждого узла есть множество живых записей, узлы
+    без записей пропускаются при поиске. Когда пустых узлов становится
+    больше, чем живых, дерево перестраивается из живых записей.
+    """
+
+    def __init__(self):
+        self.root: Optional[List[Any]] = None
+        self.nodes: Dict[int, List[Any]] = {}
+        self.live = 0
+
+    def add(self, value: int, item: int):
+        node = self.nodes.get(value)
+        if node is not None:
+            if not node[1]:
+                self.live += 1
+            node[1].add(item)
+            return
+
+        node = [value, {item}, {}]
+        self.nodes[value] = node
+        self.live += 1
+        if self.root is None:
+            self.root = node
+            return
+
+        current = self.root
+        while True:
+            distance = hamming(value, current[0])
+            child = current[2].get(distance)
+            if child is None:
+                current[2][distance] = node
+                return
+            current = child
+
+    def discard(self, value: int, item: int):
+        node = self.nodes.get(value)
+        if node is None or item not in node[1]:
+            return
+        node[1].discard(item)
+        if not node[1]:
+            self.live -= 1
+            if len(self.nodes) - self.live > self.live + 16:
+                self._rebuild()
+
+    def _rebuild(self):
+        entries = [(value, items) for value, (_, items, _) in self.nodes.items() if items]
+        self.root = None
+        self.nodes = {}
+        self.live = 0
+        for value, items in entries:
+            for item in items:
+                self.add(value, item)
+
+    def search(self, value: int, radius: int) -> List[Tuple[int, int]]:
+        """Записи с расстоянием не больше radius: список (расстояние, запись)"""
+        found = []
+        stack = [self.root] if self.root is not None else []
+        while stack:
+            node = stack.pop()
+            distance = hamming(value, node[0])
+            if distance <= radius:
+                found.extend((distance, item) for item in node[1])
+            for child_distance, child in node[2].items():
+                if distance - radius <= child_distance <= distance + radius:
+                    stack.append(child)
+        return found
+
+
+class OCRCache:
+    """
+    LRU-кэш результатов OCR
+
+    Точное совпадение пикселей отдается сразу; почти одинаковое изображение -
+    только после сверки вырезок всех рамок в полном разрешении и карты
+    мелких деталей кадра вне рамок.
+    """
+
+    def __init__(
+        self,
+        capacity: int = settings.OCR_CACHE_SIZE,
+        max_distance: int = settings.OCR_CACHE_MAX_DISTANCE,
+        min_correlation: float = settings.OCR_CACHE_MIN_CORRELATION,
+        max_block_difference: float = settings.OCR_CACHE_MAX_BLOCK_DIFF,
+        max_crop_pixels: int = settings.OCR_CACHE_MAX_CROP_PIXELS,
+        max_edge_difference: float = settings.OCR_CACHE_MAX_EDGE_DIFF
+    ):
+        self.capacity = capacity
+        self.max_distance = max_distance
+        self.min_correlation = min_correlation
+        self.max_block_difference = max_block_difference
+        self.max_crop_pixels = max_crop_pixels
+        self.max_edge_difference = max_edge_difference
+
+        self._entries: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self._digests: Dict[bytes, int] = {}
+        self._tree = BKTree()
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def describe(self, image: "np.ndarray") -> Dict[str, Any]:
+        """Признаки изображения для lookup и store (считаются один раз на запрос)"""
+        height, width = image.shape[:2]
+        grey = grey_thumbnail(image)
+        full = full_grey(image)
+        return {
+            "digest": content_digest(image),
+            "hash": perceptual_hash(grey),
+            "thumbnail": normalized(grey),
+            "shape": (height, width),
+            "grey": full,
+            "edges": edge_map(full),
+        }
+
+    def lookup(self, features: Dict[str, Any]) -> Optional[List[Any]]:
+        """
+        Поиск результатов OCR для того же или почти такого же изображения
+
+        Returns:
+            Результаты в формате readtext, пересчитанные под размер
+            текущего изображения, или None
+        """
+        if self.capacity <= 0:
+            return None
+        height, width = features["shape"]
+
+        with self._lock:
+            entry_id = self._digests.get(features["digest"])
+            if entry_id is not None:
+                self._entries.move_to_end(entry_id)
+                return list(self._entries[entry_id]["results"])
+
+            candidates = []
+            for distance, entry_id in self._tree.search(features["hash"], self.max_distance):
+                entry = self._entries[entry_id]
+                if entry["crops"] is None:
+                    continue
+                cached_height, cached_width = entry["shape"]
+                if abs(math.log((width / height) / (cached_width / cached_height))) > 0.02:
+                    continue
+                correlation = float(features["thumbnail"] @ entry["thumbnail"])
+                if correlation < self.min_correlation:
+                    continue
+                candidates.append(((distance, -correlation), entry_id, entry))
+        candidates.sort(key=lambda candidate: candidate[0])
+
+        for _, entry_id, entry in candidates:
+            if not self._confirm(features, entry):
+                continue
+            with self._lock:
+                if entry_id in self._entries:
+                    self._entries.move_to_end(entry_id)
+            scale = np.array([width / entry["shape"][1], height / entry["shape"][0]])
+            return [
+                (np.rint(np.asarray(points, dtype=np.float64) * scale).astype(int).tolist(), text, confidence)
+                for points, text, confidence in entry["results"]
+            ]
+        return None
+
+    def _confirm(self, features: Dict[str, Any], entry: Dict[str, Any]) -> bool:
+        """
+        Сверка кандидата с текущим изображением: карта деталей вне рамок
+        (нет ли нового текста) и вырезки всех рамок
+        """
+        cached_edges = entry["edges"]
+        edges = features["edges"]
+        if edges.shape != cached_edges.shape:
+            edges = cv2.resize(edges, (cached_edges.shape[1], cached_edges.shape[0]), interpolation=cv2.INTER_AREA)
+        outside = np.abs(edges - cached_edges)[~entry["edge_mask"]]
+        if outside.size and float(outside.max()) > self.max_edge_difference:
+            return False
+
+        grey = features["grey"]
+        height, width = features["shape"]
+        cached_height, cached_width = entry["shape"]
+        scale_x, scale_y = width / cached_width, height / cached_height
+        for (x0, y0, x1, y1), cached in entry["crops"]:
+            # Область рамки текущего изображения на сетке сохраненной вырезки
+            transform = np.float32([[scale_x, 0, x0 * scale_x], [0, scale_y, y0 * scale_y]])
+            current = cv2.warpAffine(
+                grey, transform, (cached.shape[1], cached.shape[0]),
+                flags=cv2.INTER_LINEAR | cv2.WARP_INVERSE_MAP, borderMode=cv2.BORDER_REPLICATE
+            )
+            if crops_differ(cached, current, self.max_block_difference, min(scale_x, scale_y)):
+                return False
+        return True
+
+    def _crops(self, features: Dict[str, Any], results: List[Any]) -> Optional[List[Any]]:
+        """
+        Вырезки рамок в полном разрешении для подтверждения похожих изображений
+
+        Без рамок (нет текста) или при слишком большой площади вырезок
+        запись отдается только при точном совпадении пикселей.
+        """
+        if not results:
+            return None
+        grey = features["grey"]
+        height, width = features["shape"]
+        crops = []
+        pixels = 0
+        for points, _, _ in results:
+            rect = box_rect(points, width, height)
+            if rect is None:
+                continue
+            x0, y0, x1, y1 = rect
+            crop = grey[y0:y1, x0:x1].copy()
+            pixels += crop.size
+            if pixels > self.max_crop_pixels:
+                return None
+            crops.append((rect, crop))
+        return crops or None
+
+    def store(self, features: Dict[str, Any], results: List[Any]):
+        """Сохранение результатов OCR (самые старые записи вытесняются)"""
+        if self.capacity <= 0:
+            return
+        crops = self._crops(features, results)
+        edge_mask = None
+        if crops is not None:
+            edge_mask = boxes_mask([rect for rect, _ in crops], features["shape"], features["edges"].shape)
+        with self._lock:
+            previous = self._digests.get(features["digest"])
+            if previous is not None:
+                self._remove(previous)
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = {
+                "digest": features["digest"],
+                "hash": features["hash"],
+                "thumbnail": features["thumbnail"],
+                "shape": features["shape"],
+                "results": results,
+                "crops": crops,
+                "edges": features["edges"],
+                "edge_mask": edge_mask,
+            }
+            self._digests[features["digest"]] = entry_id
+            self._tree.add(features["hash"], entry_id)
+
+            while len(self._entries) > self.capacity:
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, entry_id: int):
+        entry = self._entries.pop(entry_id)
+        self._tree.discard(entry["hash"], entry_id)
+        if self._digests.get(entry["digest"]) == entry_id:
+            del self._digests[entry["digest"]]
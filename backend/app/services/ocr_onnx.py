@@ -0,0 +1,204 @@
+"""
+Движок ONNX Runtime для детектора CRAFT и распознавателя CRNN из EasyOCR
+
+Модели Reader один раз экспортируются в ONNX и кэшируются в MODELS_DIR/onnx,
+затем reader.detector и reader.recognizer подменяются обертками над сессиями
+ONNX Runtime. Остальной код EasyOCR (предобработка, декодирование CTC,
+сборка рамок) не меняется, поэтому формат результатов тот же.
+"""
+import copy
+import os
+import tempfile
+import threading
+from typing import Any, Dict, Optional
+from app.core.config import settings
+
+try:
+    import onnxruntime as ort
+    ONNXRUNTIME_AVAILABLE = True
+except ImportError:
+    ONNXRUNTIME_AVAILABLE = False
+    ort = None
+
+try:
+    import torch
+    TORCH_AVAILABLE = True
+except ImportError:
+    TORCH_AVAILABLE = False
+    torch = None
+
+
+_sessions: Dict[str, Any] = {}
+_sessions_lock = threading.Lock()
+
+
+class _MeanOverHeight(torch.nn.Module if TORCH_AVAILABLE else object):
+    """Замена AdaptiveAvgPool2d((None, 1)) распознавателя, которую умеет экспортировать ONNX"""
+
+    def forward(self, x):
+        return x.mean(dim=3, keepdim=True)
+
+
+class OnnxModule:
+    """
+    Обертка над сессией ONNX Runtime с интерфейсом модуля PyTorch
+
+    EasyOCR вызывает модели как net(x) / model(image, text) и читает
+    результат как тензоры, поэтому вход переводится в NumPy, а выход
+    обратно в torch.Tensor.
+    """
+
+    def __init__(self, session: Any, outputs: int):
+        self.session = session
+        self.outputs = outputs
+        self.input_names = [item.name for item in session.get_inputs()]
+
+    def eval(self):
+        return self
+
+    def to(self, *args, **kwargs):
+        return self
+
+    def parameters(self):
+        return iter(())
+
+    def __call__(self, *args):
+        feed = {
+            name: value.detach().cpu().numpy()
+            for name, value in zip(["input", "text"], args)
+            if name in self.input_names
+        }
+        results = [torch.from_numpy(array) for array in self.session.run(None, feed)]
+        return tuple(results) if self.outputs > 1 else results[0]
+
+
+def _unwrap(module: Any) -> Any:
+    """Модель без обертки DataParallel"""
+    return getattr(module, "module", module)
+
+
+def _session(path: str) -> Any:
+    with _sessions_lock:
+        session = _sessions.get(path)
+        if session is None:
+            options = ort.SessionOptions()
+            options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+            options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+            options.intra_op_num_threads = settings.OCR_ONNX_THREADS or max(1, (os.cpu_count() or 2) // 2)
+            options.inter_op_num_threads = 1
+            session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+            _sessions[path] = session
+        return session
+
+
+def _export_detector(detector: Any, path: str):
+    model = _unwrap(detector).eval()
+    dummy = torch.randn(1, 3, 640, 640)
+    with torch.no_grad():
+        torch.onnx.export(
+            model, (dummy,), path,
+            input_names=["input"],
+            output_names=["score", "feature"],
+            dynamic_axes={
+                "input": {0: "batch", 2: "height", 3: "width"},
+                "score": {0: "batch", 1: "height", 2: "width"},
+                "feature": {0: "batch", 2: "height", 3: "width"},
+            },
+            opset_version=14,
+        )
+
+
+def _export_recognizer(recognizer: Any, path: str):
+    model = copy.deepcopy(_unwrap(recognizer)).eval()
+    if hasattr(model, "AdaptiveAvgPool"):
+        model.AdaptiveAvgPool = _MeanOverHeight()
+    image = torch.randn(1, 1, 64, 256)
+    text = torch.zeros(1, 26, dtype=torch.long)
+    with torch.no_grad():
+        torch.onnx.export(
+            model, (image, text), path,
+            input_names=["input", "text"],
+            output_names=["output"],
+            dynamic_axes={
+                "input": {0: "batch", 3: "width"},
+                "text": {0: "batch"},
+                "output": {0: "batch", 1: "steps"},
+            },
+            opset_version=14,
+        )
+
+
+def _quantize(path: str, quantized_path: str):
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    quantize_dynamic(path, quantized_path, weight_type=QuantType.QInt8)
+
+
+def _write_atomic(write, path: str):
+    """
+    Запись файла через уникальный временный файл в том же каталоге
+
+    Экспорт одной модели может идти одновременно в нескольких читателях или
+    воркерах: у каждого свой временный файл, а os.replace публикует только
+    полностью записанную модель.
+    """
+    directory, name = os.path.split(path)
+    descriptor, temp_path = tempfile.mkstemp(dir=directory, prefix=f"{name}.", suffix=".tmp")
+    os.close(descriptor)
+    try:
+        write(temp_path)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def _cached_export(name: str, export, module: Any, quantize: bool = False) -> str:
+    """Путь к экспортированной модели; экспорт выполняется один раз"""
+    directory = os.path.join(settings.MODELS_DIR, "onnx")
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{name}.onnx")
+    if not os.path.exists(path):
+        # Прерванный экспорт не остается в кэше
+        _write_atomic(lambda temp_path: export(module, temp_path), path)
+    if not quantize:
+        return path
+
+    quantized_path = os.path.join(directory, f"{name}_int8.onnx")
+    if not os.path.exists(quantized_path):
+        _write_atomic(lambda temp_path: _quantize(path, temp_path), quantized_path)
+    return quantized_path
+
+
+def accelerate_reader(reader: Any, quantize: Optional[bool] = None) -> Any:
+    """
+    Перевод Reader на ONNX Runtime
+
+    Детектор CRAFT у всех языков один, поэтому его сессия общая для всех
+    читателей. Распознаватель экспортируется отдельно для каждой модели
+    (latin, cyrillic, chinese_sim...). Квантование int8 (OCR_ONNX_QUANTIZE)
+    применяется только к распознавателю: LSTM и линейные слои от него
+    ускоряются, а свертки CRAFT в динамическом int8 на CPU обычно медленнее.
+
+    Returns:
+        Тот же Reader с подмененными моделями
+    """
+    if not ONNXRUNTIME_AVAILABLE:
+        raise ImportError("ONNX Runtime не установлен. Установите: pip install onnxruntime onnx")
+    if getattr(reader, "device", "cpu") != "cpu":
+        return reader
+    if quantize is None:
+        quantize = settings.OCR_ONNX_QUANTIZE
+
+    if not isinstance(reader.detector, OnnxModule):
+        detector_path = _cached_export("craft", _export_detector, reader.detector)
+        reader.detector = OnnxModule(_session(detector_path), outputs=2)
+
+    if not isinstance(reader.recognizer, OnnxModule):
+        model_name = getattr(reader, "model_lang", None) or "_".join(reader.lang_list)
+        recognizer_path = _cached_export(
+            f"recognizer_{model_name}", _export_recognizer, reader.recognizer, quantize=quantize
+        )
+        reader.recognizer = OnnxModule(_session(recognizer_path), outputs=1)
+
+    return reader
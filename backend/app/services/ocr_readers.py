@@ -0,0 +1,98 @@
+"""
+Пул читателей EasyOCR по наборам языков (письменностям)
+
+Один Reader со всеми языками сразу медленнее и тяжелее, а часть языков
+в EasyOCR нельзя совмещать (китайский - только с английским). Поэтому
+для каждой письменности из OCR_SCRIPT_LANGUAGES держится свой Reader:
+он загружается при первом обращении через общий реестр моделей, а при
+превышении OCR_READER_MEMORY_MB вытесняется тот, которым дольше всего не
+пользовались.
+"""
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from app.core.config import settings
+from app.services.model_registry import model_registry
+from app.services.ocr_onnx import accelerate_reader
+
+try:
+    import easyocr
+    import torch
+    EASYOCR_AVAILABLE = True
+except ImportError:
+    EASYOCR_AVAILABLE = False
+    easyocr = None
+    torch = None
+
+
+def classify_script(texts: Sequence[str]) -> Optional[str]:
+    """
+    Письменность распознанных фрагментов по преобладающим символам
+
+    Returns:
+        "cjk", "cyrillic", "latin" или None, если букв нет
+    """
+    counts = {"cjk": 0, "cyrillic": 0, "latin": 0}
+    for text in texts:
+        for char in text:
+            code = ord(char)
+            if 0x3000 <= code <= 0x9FFF or 0xF900 <= code <= 0xFAFF:
+                counts["cjk"] += 1
+            elif 0x400 <= code <= 0x52F:
+                counts["cyrillic"] += 1
+            elif char.isalpha() and code < 0x250:
+                counts["latin"] += 1
+    script, count = max(counts.items(), key=lambda item: item[1])
+    return script if count else None
+
+
+class ReaderPool:
+    """
+    Читатели easyocr.Reader по письменностям
+
+    Читатели хранятся в общем реестре моделей (группа "ocr") со своим
+    бюджетом OCR_READER_MEMORY_MB внутри общего бюджета.
+    """
+
+    def __init__(
+        self,
+        scripts: Dict[str, List[str]] = settings.OCR_SCRIPT_LANGUAGES,
+        memory_budget_mb: int = settings.OCR_READER_MEMORY_MB,
+        engine: str = settings.OCR_ENGINE
+    ):
+        self.scripts = scripts
+        self.engine = engine
+        model_registry.set_group_budget("ocr", memory_budget_mb)
+
+    def languages_for(self, script: str) -> Tuple[str, ...]:
+        if script not in self.scripts:
+            raise ValueError(f"Неизвестная письменность для OCR: {script}")
+        return tuple(self.scripts[script])
+
+    def _key(self, languages: Tuple[str, ...]) -> str:
+        return f"easyocr:{'+'.join(languages)}:{self.engine}"
+
+    def is_loaded(self, script: str) -> bool:
+        return model_registry.is_loaded(self._key(self.languages_for(script)))
+
+    def get(self, script: str) -> Any:
+        """Reader для письменности (загружается при первом обращении)"""
+        if not EASYOCR_AVAILABLE:
+            raise ImportError("EasyOCR не установлен. Установите: pip install easyocr")
+        languages = self.languages_for(script)
+
+        def load():
+            use_gpu = torch.cuda.is_available() if torch else False
+            # На CPU EasyOCR по умолчанию квантует модели средствами PyTorch
+            # (quantize=True); в ONNX экспортируются исходные float-веса
+            reader = easyocr.Reader(list(languages), gpu=use_gpu, quantize=self.engine != "onnx")
+            if self.engine == "onnx":
+                reader = accelerate_reader(reader)
+            return reader
+
+        return model_registry.get(self._key(languages), load, group="ocr")
+
+    def loaded(self) -> List[Dict[str, Any]]:
+        """Загруженные читатели: языки и размер в МБ (от давно использованных к недавним)"""
+        return [
+            {"languages": entry["key"].split(":")[1].split("+"), "size_mb": entry["size_mb"]}
+            for entry in model_registry.entries("ocr")
+        ]
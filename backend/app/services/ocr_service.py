@@ -1,13 +1,24 @@
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple, Union
 import os
 import time
+from concurrent.futures import ThreadPoolExecutor
 from app.core.config import settings
+from app.services.image_preprocessing import (
+    downscale_factor,
+    edge_density,
+    merge_tile_boxes,
+    plan_tiles,
+    text_regions,
+)
+from app.services.text_layout import glyph_metrics_for
+from app.services.ocr_cache import OCRCache
+from app.services.ocr_readers import ReaderPool, classify_script
 
 try:
     import easyocr
     import cv2
     import numpy as np
-    from PIL import Image
+    from PIL import Image, ImageDraw
     import torch
     EASYOCR_AVAILABLE = True
 except ImportError:
@@ -18,158 +29,486 @@ except ImportError:
     torch = None
 
 
+class NoTextDetectedError(ValueError):
+    """На изображении нет текста (определено предварительной проверкой или распознаванием)"""
+
+
 class OCRService:
     """Сервис для распознавания текста из изображений"""
     
     def __init__(self):
-        self.reader = None
-        
-        
-        self.languages = ['en', 'ru']  
+        self.readers = ReaderPool()
+        self.default_script = settings.OCR_DEFAULT_SCRIPT
+        self.cache = OCRCache()
     
-    def load_model(self):
-        """Загрузка модели EasyOCR"""
+    def load_model(self, script: Optional[str] = None):
+        """Загрузка модели EasyOCR для письменности (по умолчанию OCR_DEFAULT_SCRIPT)"""
         if not EASYOCR_AVAILABLE:
             raise ImportError("EasyOCR не установлен. Установите: pip install easyocr")
-        if self.reader is None:
-            use_gpu = torch.cuda.is_available() if torch else False
-            self.reader = easyocr.Reader(self.languages, gpu=use_gpu)
-        return self.reader
+        return self.readers.get(script or self.default_script)
     
-    def recognize(
-        self, 
-        image_path: str,
-        return_boxes: bool = True
-    ) -> Dict[str, Any]:
+    def load_image(self, image_path: str) -> "np.ndarray":
         """
-        Распознавание текста из изображения
+        Декодирование изображения в массив BGR
         
-        Args:
-            image_path: Путь к изображению
-            return_boxes: Возвращать ли координаты bounding boxes
-            
-        Returns:
-            Словарь с результатами распознавания
+        Результат можно передать и в recognize, и в replace_text_on_image,
+        чтобы файл декодировался один раз на весь запрос.
         """
-        reader = self.load_model()
-        
         if not EASYOCR_AVAILABLE:
             raise ImportError("EasyOCR не установлен")
         
         image = cv2.imread(image_path)
         if image is None:
             raise ValueError(f"Не удалось загрузить изображение: {image_path}")
+        return image
+    
+    def _pad_batch(self, images: List["np.ndarray"]) -> "np.ndarray":
+        """Выравнивание изображений по общему холсту (дополнение справа и снизу) для пакетной детекции"""
+        height = max(image.shape[0] for image in images)
+        width = max(image.shape[1] for image in images)
+        batch = np.zeros((len(images), height, width, 3), dtype=np.uint8)
+        for index, image in enumerate(images):
+            batch[index, :image.shape[0], :image.shape[1]] = image
+        return batch
+    
+    def _probe_text_boxes(
+        self,
+        reader,
+        rgbs: List["np.ndarray"],
+        probe_scales: Optional[List[float]] = None
+    ) -> List[List[List[int]]]:
+        """
+        Быстрый поиск строк текста по уменьшенным копиям изображений
+        
+        Только детектор CRAFT, без распознавания, одним пакетом на все
+        изображения. Рамки [x_min, x_max, y_min, y_max] возвращаются в пикселях
+        исходного изображения.
+        
+        Args:
+            probe_scales: Масштаб копии для каждого изображения
+                (по умолчанию длинная сторона OCR_PROBE_SIZE)
+        """
+        if probe_scales is None:
+            probe_scales = [min(1.0, settings.OCR_PROBE_SIZE / max(rgb.shape[:2])) for rgb in rgbs]
+        probes = [
+            rgb if probe_scale >= 1.0 else cv2.resize(
+                rgb, None, fx=probe_scale, fy=probe_scale, interpolation=cv2.INTER_AREA
+            )
+            for rgb, probe_scale in zip(rgbs, probe_scales)
+        ]
+        
+        batch = probes[0] if len(probes) == 1 else self._pad_batch(probes)
+        horizontal_agg, free_agg = reader.detect(
+            batch,
+            min_size=5,
+            canvas_size=max(max(probe.shape[:2]) for probe in probes),
+            reformat=False
+        )
+        
+        all_boxes = []
+        for probe_scale, horizontal_list, free_list in zip(probe_scales, horizontal_agg, free_agg):
+            boxes = [list(box) for box in horizontal_list]
+            boxes.extend(
+                [
+                    min(point[0] for point in box), max(point[0] for point in box),
+                    min(point[1] for point in box), max(point[1] for point in box)
+                ]
+                for box in free_list
+            )
+            all_boxes.append([
+                [int(round(value / probe_scale)) for value in box]
+                for box in boxes
+                if box[3] > box[2] and box[1] > box[0]
+            ])
+        return all_boxes
+    
+    def _find_text(
+        self,
+        reader,
+        images: List["np.ndarray"]
+    ) -> Tuple[List[Optional[List[List[int]]]], List[Optional["np.ndarray"]], List[float]]:
+        """
+        Предварительная проверка наличия текста
+        
+        1. Доля резких перепадов яркости на миниатюре: однородные фото
+           отбрасываются за миллисекунды без нейросети.
+        2. Детектор CRAFT на сильно уменьшенной копии (пакетом).
+        3. Если строки не найдены, детектор повторяется на более подробной
+           копии (короткая сторона OCR_PROBE_SIZE): мелкий текст длинных
+           скриншотов на первой копии может пропасть.
+        
+        Returns:
+            (рамки строк для каждого изображения - области интереса для
+            распознавания, или None, если текста нет; RGB-копии изображений
+            с текстом; масштаб пробы, нашедшей рамки)
+        """
+        found: List[Optional[List[List[int]]]] = [None] * len(images)
+        rgbs: List[Optional["np.ndarray"]] = [None] * len(images)
+        probe_scales = [
+            min(1.0, settings.OCR_PROBE_SIZE / max(image.shape[:2])) if image.size else 1.0
+            for image in images
+        ]
+        candidates = []
+        for index, image in enumerate(images):
+            step = max(1, max(image.shape[:2]) // (2 * settings.OCR_EDGE_SAMPLE_SIZE))
+            sample = image[::step, ::step]
+            scale = settings.OCR_EDGE_SAMPLE_SIZE / max(sample.shape[:2])
+            if scale < 1.0:
+                sample = cv2.resize(sample, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+            if edge_density(cv2.cvtColor(sample, cv2.COLOR_BGR2GRAY)) >= settings.OCR_TEXT_MIN_EDGE_DENSITY:
+                candidates.append(index)
+        
+        if not candidates:
+            return found, rgbs, probe_scales
+        
+        for index in candidates:
+            rgbs[index] = cv2.cvtColor(images[index], cv2.COLOR_BGR2RGB)
+        probes = self._probe_text_boxes(reader, [rgbs[index] for index in candidates], [probe_scales[index] for index in candidates])
+        for index, boxes in zip(candidates, probes):
+            found[index] = boxes or None
+        
+        for index in candidates:
+            if found[index] is not None:
+                continue
+            height, width = rgbs[index].shape[:2]
+            first_scale = min(1.0, settings.OCR_PROBE_SIZE / max(height, width))
+            finer_scale = min(1.0, max(2 * first_scale, settings.OCR_PROBE_SIZE / min(height, width)))
+            if finer_scale <= first_scale:
+                continue
+            found[index] = self._probe_text_boxes(reader, [rgbs[index]], [finer_scale])[0] or None
+            probe_scales[index] = finer_scale
+        
+        return found, rgbs, probe_scales
+    
+    def _route_script(self, reader, image: "np.ndarray", boxes: List[List[int]]) -> str:
+        """
+        Выбор письменности (а значит и Reader) для изображения
+        
+        Несколько самых крупных строк из пробной детекции распознаются
+        читателем по умолчанию. Письменность определяется по полученным
+        символам; если уверенность низкая (иероглифы латиницей/кириллицей
+        не читаются), те же строки пробуются CJK-читателем.
+        """
+        scripts = self.readers.scripts
+        if len(scripts) == 1 or not boxes:
+            return self.default_script
+        
+        grey = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        sample = sorted(boxes, key=lambda box: box[3] - box[2], reverse=True)[:settings.OCR_SCRIPT_SAMPLE_BOXES]
+        
+        def read_sample(sample_reader) -> Tuple[List[str], float]:
+            results = sample_reader.recognize(grey, horizontal_list=sample, free_list=[], detail=1, paragraph=False)
+            if not results:
+                return [], 0.0
+            return [text for _, text, _ in results], float(np.mean([confidence for _, _, confidence in results]))
+        
+        texts, confidence = read_sample(reader)
+        script = classify_script(texts)
+        if (script is None or confidence < settings.OCR_SCRIPT_MIN_CONFIDENCE) and "cjk" in scripts:
+            cjk_texts, cjk_confidence = read_sample(self.readers.get("cjk"))
+            if cjk_confidence > confidence and classify_script(cjk_texts) == "cjk":
+                return "cjk"
+        
+        return script if script in scripts else self.default_script
+    
+    def _prepare(self, rgb: "np.ndarray", boxes: List[List[int]], probe_scale: float = 1.0) -> Dict[str, Any]:
+        """
+        Адаптивное уменьшение и план нарезки на плитки
         
-        results = reader.readtext(
-            image_path,
-            paragraph=False,  
-            detail=1 if return_boxes else 0,  
+        Изображение уменьшается так, чтобы мелкие строки имели высоту около
+        OCR_TARGET_TEXT_HEIGHT, поэтому время детекции зависит от размера
+        текста, а не от числа пикселей. Уменьшение не опускает строки, которые
+        проба (масштаб probe_scale) могла пропустить, ниже OCR_MIN_TEXT_HEIGHT,
+        а при малом числе найденных строк не выполняется. Если текст занимает небольшую часть
+        изображения, распознаются только области вокруг найденных пробой строк,
+        и только когда проба не могла пропустить строки высотой
+        OCR_MIN_TEXT_HEIGHT; после грубой пробы распознается весь кадр.
+        Очень высокие и широкие изображения или области (длинные скриншоты)
+        режутся на перекрывающиеся плитки, иначе EasyOCR сжал бы их целиком
+        до canvas_size и потерял мелкий текст.
+        """
+        heights = [box[3] - box[2] for box in boxes]
+        original_height, original_width = rgb.shape[:2]
+        line_height = max(heights) if heights else 0
+        undetected_height = settings.OCR_PROBE_MIN_TEXT_HEIGHT / probe_scale
+        # Грубая проба могла пропустить читаемые строки вне своих рамок: тогда
+        # распознается весь кадр, а не только области вокруг найденных строк
+        regions = text_regions(
+            boxes,
+            original_height,
+            original_width,
+            margin=max(2 * line_height, 16),
+            max_coverage=settings.OCR_ROI_MAX_COVERAGE
+        ) if undetected_height <= settings.OCR_MIN_TEXT_HEIGHT else None
+        
+        # Строки ниже предела пробы в высоты не попали: уменьшение ограничено так,
+        # чтобы такие строки остались читаемыми
+        scale = downscale_factor(
+            heights,
+            settings.OCR_TARGET_TEXT_HEIGHT,
+            settings.OCR_MIN_SCALE,
+            undetected_height=undetected_height,
+            readable_height=settings.OCR_MIN_TEXT_HEIGHT,
+            min_boxes=settings.OCR_DOWNSCALE_MIN_BOXES
         )
+        if scale < 1.0:
+            rgb = cv2.resize(rgb, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        
+        height, width = rgb.shape[:2]
+        windows = [(0, height, 0, width)] if regions is None else [
+            (int(y0 * scale), min(int(np.ceil(y1 * scale)), height), int(x0 * scale), min(int(np.ceil(x1 * scale)), width))
+            for y0, y1, x0, x1 in regions
+        ]
+        overlap = int(min(max(settings.OCR_TILE_OVERLAP, 3 * line_height * scale), settings.OCR_TILE_SIZE // 2))
+        tiles = [
+            (y0 + ty0, y0 + ty1, x0 + tx0, x0 + tx1)
+            for y0, y1, x0, x1 in windows
+            for ty0, ty1, tx0, tx1 in plan_tiles(y1 - y0, x1 - x0, settings.OCR_TILE_SIZE, overlap, settings.OCR_TILE_ASPECT)
+        ]
+        return {
+            "image": rgb,
+            "scale": scale,
+            "heights": heights,
+            "tiles": tiles,
+            "whole": tiles == [(0, height, 0, width)]
+        }
+    
+    def _read_tiles(self, reader, prepared: Dict[str, Any]) -> List[List[Any]]:
+        """Параллельное распознавание плиток подготовленного изображения"""
+        rgb = prepared["image"]
+        
+        def read_tile(tile):
+            y0, y1, x0, x1 = tile
+            return reader.readtext(rgb[y0:y1, x0:x1], paragraph=False, detail=1)
         
+        tiles = prepared["tiles"]
+        if len(tiles) == 1:
+            return [read_tile(tiles[0])]
+        with ThreadPoolExecutor(max_workers=settings.OCR_TILE_WORKERS) as executor:
+            return list(executor.map(read_tile, tiles))
+    
+    def _merge_results(self, prepared: Dict[str, Any], tile_results: List[List[Any]]) -> List[Any]:
+        """
+        Перевод результатов плиток в координаты исходного изображения
         
+        Дубли на стыках плиток удаляются, результаты идут в порядке чтения.
+        """
+        tiles, scale = prepared["tiles"], prepared["scale"]
+        points, texts, scores, tile_ids = [], [], [], []
+        for tile_id, ((y0, _, x0, _), results) in enumerate(zip(tiles, tile_results)):
+            for bbox, text, confidence in results:
+                points.append((np.asarray(bbox, dtype=np.float64) + (x0, y0)) / scale)
+                texts.append(text)
+                scores.append(float(confidence))
+                tile_ids.append(tile_id)
+        
+        if not points:
+            return []
+        
+        keep = np.arange(len(points))
+        if len(tiles) > 1:
+            rects = np.array([[p[:, 0].min(), p[:, 1].min(), p[:, 0].max(), p[:, 1].max()] for p in points])
+            keep = merge_tile_boxes(rects, np.array(scores), np.array(tile_ids))
+            # Порядок чтения: сверху вниз, слева направо
+            row = max(max(prepared["heights"], default=0.0), 1.0)
+            keep = sorted(keep, key=lambda i: (round(rects[i, 1] / row), rects[i, 0]))
+        
+        return [
+            (np.rint(points[i]).astype(int).tolist(), texts[i], scores[i])
+            for i in keep
+        ]
+    
+    def _build_response(self, results: List[Any], return_boxes: bool) -> Dict[str, Any]:
+        """Сборка ответа recognize из результатов readtext"""
         full_text = []
         bounding_boxes = []
         
-        for result in results:
+        for bbox, text, confidence in results:
+            full_text.append(text)
             
-            if return_boxes and isinstance(result, tuple) and len(result) == 3:
-                bbox, text, confidence = result
-                full_text.append(text)
-                
-                
-                
-                x_coords = [point[0] for point in bbox]
-                y_coords = [point[1] for point in bbox]
-                
-                bounding_boxes.append({
-                    "text": text,
-                    "confidence": float(confidence),
-                    "bbox": {
-                        "x_min": min(x_coords),
-                        "y_min": min(y_coords),
-                        "x_max": max(x_coords),
-                        "y_max": max(y_coords),
-                        "points": bbox.tolist() if hasattr(bbox, 'tolist') else bbox
-                    }
-                })
-            elif isinstance(result, str):
-                
-                full_text.append(result)
-            else:
-                
-                if isinstance(result, tuple) and len(result) >= 2:
-                    full_text.append(result[1])  
-        
-        result_text = " ".join(full_text)
+            x_coords = [point[0] for point in bbox]
+            y_coords = [point[1] for point in bbox]
+            
+            bounding_boxes.append({
+                "text": text,
+                "confidence": float(confidence),
+                "bbox": {
+                    "x_min": min(x_coords),
+                    "y_min": min(y_coords),
+                    "x_max": max(x_coords),
+                    "y_max": max(y_coords),
+                    "points": bbox
+                }
+            })
         
-        response = {
-            "text": result_text,
+        return {
+            "text": "\n".join(full_text),
             "language": "auto",  
             "bounding_boxes": bounding_boxes if return_boxes else None,
-            "confidence": np.mean([box["confidence"] for box in bounding_boxes]) if bounding_boxes else None
+            "confidence": float(np.mean([box["confidence"] for box in bounding_boxes])) if bounding_boxes else None
         }
+    
+    def recognize(
+        self, 
+        image: Union[str, "np.ndarray"],
+        return_boxes: bool = True
+    ) -> Dict[str, Any]:
+        """
+        Распознавание текста из изображения
         
-        return response
+        Args:
+            image: Путь к изображению или уже декодированный массив BGR
+            return_boxes: Возвращать ли координаты bounding boxes
+            
+        Returns:
+            Словарь с результатами распознавания
+            
+        Raises:
+            NoTextDetectedError: На изображении нет текста
+        """
+        if isinstance(image, str):
+            image = self.load_image(image)
+        
+        result = self.recognize_batch([image], return_boxes=return_boxes)[0]
+        if not result["text"].strip():
+            raise NoTextDetectedError("На изображении не найден текст")
+        return result
+    
+    def recognize_batch(
+        self,
+        images: List["np.ndarray"],
+        return_boxes: bool = True
+    ) -> List[Dict[str, Any]]:
+        """
+        Пакетное распознавание нескольких изображений
+        
+        Пробная детекция и детекция CRAFT выполняются одним пакетом на все
+        изображения: после адаптивного уменьшения они дополняются до общего
+        холста и передаются в readtext_batched. Изображения, которые нужно
+        резать на плитки, распознаются по отдельности. Каждое изображение
+        распознается читателем своей письменности (см. _route_script).
+        Те же пиксели берутся из кэша сразу, почти одинаковые изображения
+        (пережатые, уменьшенные) - после сверки всех рамок текста в полном
+        разрешении (см. OCRCache). Изображения без текста отсекаются предварительной
+        проверкой (_find_text) и получают пустой результат.
+        
+        Args:
+            images: Декодированные массивы BGR
+            return_boxes: Возвращать ли координаты bounding boxes
+            
+        Returns:
+            Результаты в формате recognize в порядке входных изображений
+        """
+        if not images:
+            return []
+        default_reader = self.load_model()
+        
+        features = [self.cache.describe(image) for image in images]
+        results: List[Optional[List[Any]]] = [self.cache.lookup(item) for item in features]
+        missing = [index for index, cached in enumerate(results) if cached is None]
+        
+        if missing:
+            probe_boxes, rgbs, probe_scales = self._find_text(default_reader, [images[index] for index in missing])
+            
+            prepared = {}
+            groups: Dict[str, List[int]] = {}
+            for index, rgb, boxes, probe_scale in zip(missing, rgbs, probe_boxes, probe_scales):
+                if boxes is None:
+                    results[index] = []
+                    self.cache.store(features[index], [])
+                    continue
+                prepared[index] = self._prepare(rgb, boxes, probe_scale)
+                script = self._route_script(default_reader, images[index], boxes)
+                groups.setdefault(script, []).append(index)
+            
+            for script, indices in groups.items():
+                reader = self.load_model(script)
+                whole = [index for index in indices if prepared[index]["whole"]]
+                if len(whole) > 1:
+                    batched = reader.readtext_batched(
+                        self._pad_batch([prepared[index]["image"] for index in whole]),
+                        batch_size=settings.OCR_BATCH_SIZE,
+                        paragraph=False,
+                        detail=1
+                    )
+                    for index, image_results in zip(whole, batched):
+                        results[index] = self._merge_results(prepared[index], [image_results])
+                
+                for index in indices:
+                    if results[index] is None:
+                        results[index] = self._merge_results(prepared[index], self._read_tiles(reader, prepared[index]))
+                    self.cache.store(features[index], results[index])
+        
+        return [self._build_response(image_results, return_boxes) for image_results in results]
     
     def replace_text_on_image(
         self,
-        image_path: str,
-        translations: Dict[str, str],
-        output_path: str
+        image: Union[str, "np.ndarray"],
+        blocks: List[Dict[str, Any]],
+        language: str,
+        output_path: str,
+        min_confidence: float = 0.5
     ) -> str:
         """
         Бонусная функция: Замена текста на изображении переведенным текстом
         
+        Каждый блок (строка или абзац из group_text_blocks) закрашивается
+        цветом фона и в его область вписывается собственный перевод блока.
+        Кегль подбирается по метрикам глифов так, чтобы перевод с переносами
+        поместился в рамку.
+        
         Args:
-            image_path: Путь к исходному изображению
-            translations: Словарь переводов {language_code: translated_text}
+            image: Путь к исходному изображению или уже декодированный массив BGR
+            blocks: Блоки текста с переводами в поле translations
+            language: Язык перевода, который рисуется на изображении
             output_path: Путь для сохранения обработанного изображения
+            min_confidence: Блоки с меньшей уверенностью OCR не заменяются
             
         Returns:
             Путь к обработанному изображению
         """
-        reader = self.load_model()
-        image = cv2.imread(image_path)
-        
-        if image is None:
-            raise ValueError(f"Не удалось загрузить изображение: {image_path}")
-        
-        
-        results = reader.readtext(image_path)
-        
+        if isinstance(image, str):
+            image = self.load_image(image)
         
         processed_image = image.copy()
+        height, width = image.shape[:2]
         
+        placements = []
+        for block in blocks:
+            translated_text = block.get("translations", {}).get(language)
+            if block["confidence"] <= min_confidence or not translated_text:
+                continue
+            
+            x_min, y_min = max(int(block["bbox"]["x_min"]), 0), max(int(block["bbox"]["y_min"]), 0)
+            x_max, y_max = min(int(block["bbox"]["x_max"]), width), min(int(block["bbox"]["y_max"]), height)
+            if x_max <= x_min or y_max <= y_min:
+                continue
+            
+            # Цвет фона - медиана пикселей по периметру рамки
+            border = np.concatenate([
+                image[y_min, x_min:x_max], image[y_max - 1, x_min:x_max],
+                image[y_min:y_max, x_min], image[y_min:y_max, x_max - 1]
+            ])
+            background = np.median(border, axis=0)
+            cv2.rectangle(processed_image, (x_min, y_min), (x_max - 1, y_max - 1), background.tolist(), -1)
+            
+            # Яркость по BGR: черный текст на светлом фоне, белый на темном
+            luminance = 0.114 * background[0] + 0.587 * background[1] + 0.299 * background[2]
+            color = (0, 0, 0) if luminance > 128 else (255, 255, 255)
+            placements.append((translated_text, x_min, y_min, x_max - x_min, y_max - y_min, color))
         
-        for (bbox, original_text, confidence) in results:
-            if confidence > 0.5:  
-                
-                translated_text = list(translations.values())[0] if translations else original_text
-                
-                
-                x_coords = [int(point[0]) for point in bbox]
-                y_coords = [int(point[1]) for point in bbox]
-                
-                x_min, x_max = min(x_coords), max(x_coords)
-                y_min, y_max = min(y_coords), max(y_coords)
-                
-                
-                cv2.rectangle(processed_image, (x_min, y_min), (x_max, y_max), (255, 255, 255), -1)
-                
-                
-                font = cv2.FONT_HERSHEY_SIMPLEX
-                font_scale = 0.7
-                color = (0, 0, 0)
-                thickness = 2
-                
-                
-                text_lines = translated_text.split('\n')
-                line_height = 30
-                
-                for i, line in enumerate(text_lines):
-                    y_pos = y_min + (i + 1) * line_height
-                    cv2.putText(processed_image, line, (x_min, y_pos), font, font_scale, color, thickness)
-        
+        if placements:
+            canvas = Image.fromarray(cv2.cvtColor(processed_image, cv2.COLOR_BGR2RGB))
+            draw = ImageDraw.Draw(canvas)
+            for translated_text, x, y, box_width, box_height, color in placements:
+                metrics = glyph_metrics_for(translated_text)
+                size, lines = metrics.fit(translated_text, box_width, box_height)
+                line_height = size * metrics.line_ratio
+                font = metrics.font(size)
+                top = y + max((box_height - line_height * len(lines)) / 2, 0)
+                for index, line in enumerate(lines):
+                    draw.text((x, top + index * line_height), line, font=font, fill=color)
+            processed_image = cv2.cvtColor(np.asarray(canvas), cv2.COLOR_RGB2BGR)
         
         cv2.imwrite(output_path, processed_image)
         return output_path
@@ -0,0 +1,324 @@
+"""
+Раскладка текста на изображении: группировка рамок OCR в строки и абзацы,
+подбор размера шрифта по метрикам глифов
+"""
+import os
+import threading
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from app.core.config import settings
+
+try:
+    from PIL import ImageFont
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+    ImageFont = None
+
+
+FONT_CANDIDATES = [
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+    "/usr/share/fonts/truetype/noto/NotoSans-Regular.ttf",
+    "/System/Library/Fonts/Supplemental/Arial Unicode.ttf",
+    "/System/Library/Fonts/Supplemental/Arial.ttf",
+]
+CJK_FONT_CANDIDATES = [
+    "/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc",
+    "/usr/share/fonts/truetype/wqy/wqy-microhei.ttc",
+    "/System/Library/Fonts/PingFang.ttc",
+]
+
+# Глифы, метрики которых считаются заранее: ASCII, Latin-1 и кириллица
+PRECOMPUTED_CHARS = "".join(
+    chr(code) for code in list(range(0x20, 0x7F)) + list(range(0xA0, 0x180)) + list(range(0x400, 0x500))
+)
+
+
+def _is_cjk(char: str) -> bool:
+    code = ord(char)
+    return 0x3000 <= code <= 0x9FFF or 0xF900 <= code <= 0xFAFF or 0xFF00 <= code <= 0xFFEF
+
+
+class _DisjointSet:
+    def __init__(self, size: int):
+        self.parent = list(range(size))
+
+    def find(self, item: int) -> int:
+        while self.parent[item] != item:
+            self.parent[item] = self.parent[self.parent[item]]
+            item = self.parent[item]
+        return item
+
+    def union(self, a: int, b: int):
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a != root_b:
+            self.parent[max(root_a, root_b)] = min(root_a, root_b)
+
+    def groups(self) -> List[List[int]]:
+        groups: Dict[int, List[int]] = {}
+        for item in range(len(self.parent)):
+            groups.setdefault(self.find(item), []).append(item)
+        return list(groups.values())
+
+
+class _GridIndex:
+    """Равномерная сетка для поиска соседних прямоугольников"""
+
+    def __init__(self, rects: List[Tuple[float, float, float, float]], cell: float):
+        self.cell = max(cell, 1.0)
+        self.cells: Dict[Tuple[int, int], List[int]] = {}
+        for index, rect in enumerate(rects):
+            for key in self._keys(rect):
+                self.cells.setdefault(key, []).append(index)
+
+    def _keys(self, rect: Tuple[float, float, float, float]) -> Iterable[Tuple[int, int]]:
+        x_min, y_min, x_max, y_max = rect
+        for cx in range(int(x_min // self.cell), int(x_max // self.cell) + 1):
+            for cy in range(int(y_min // self.cell), int(y_max // self.cell) + 1):
+                yield cx, cy
+
+    def query(self, rect: Tuple[float, float, float, float], margin_x: float, margin_y: float) -> set:
+        x_min, y_min, x_max, y_max = rect
+        found = set()
+        for key in self._keys((x_min - margin_x, y_min - margin_y, x_max + margin_x, y_max + margin_y)):
+            found.update(self.cells.get(key, ()))
+        return found
+
+
+def _join_words(parts: List[str]) -> str:
+    """Склейка фрагментов через пробел (без пробела между иероглифами)"""
+    result = ""
+    for part in parts:
+        part = part.strip()
+        if not part:
+            continue
+        if result and not (_is_cjk(result[-1]) and _is_cjk(part[0])):
+            result += " "
+        result += part
+    return result
+
+
+def _union_rect(rects: List[Tuple[float, float, float, float]]) -> Tuple[float, float, float, float]:
+    return (
+        min(rect[0] for rect in rects),
+        min(rect[1] for rect in rects),
+        max(rect[2] for rect in rects),
+        max(rect[3] for rect in rects),
+    )
+
+
+def group_text_blocks(
+    bounding_boxes: List[Dict[str, Any]],
+    word_gap: float = 1.5,
+    line_gap: float = 0.8
+) -> List[Dict[str, Any]]:
+    """
+    Группировка рамок OCR в строки и абзацы
+
+    Рамки объединяются в строку, если они перекрываются по вертикали
+    и разделены промежутком не больше word_gap высоты строки. Строки
+    объединяются в абзац, если они близкой высоты, перекрываются
+    по горизонтали и идут друг под другом с интервалом не больше
+    line_gap высоты. Соседи ищутся через сеточный индекс, а не перебором пар.
+
+    Args:
+        bounding_boxes: Рамки из OCRService.recognize
+        word_gap: Максимальный промежуток между словами строки (в высотах)
+        line_gap: Максимальный интервал между строками абзаца (в высотах)
+
+    Returns:
+        Блоки в порядке чтения: text, bbox, line_count, line_height,
+        confidence (максимальная по рамкам блока) и box_indices
+    """
+    if not bounding_boxes:
+        return []
+
+    rects = [
+        (box["bbox"]["x_min"], box["bbox"]["y_min"], box["bbox"]["x_max"], box["bbox"]["y_max"])
+        for box in bounding_boxes
+    ]
+    heights = [max(rect[3] - rect[1], 1.0) for rect in rects]
+    cell = sorted(heights)[len(heights) // 2]
+
+    # Строки
+    grid = _GridIndex(rects, cell)
+    words = _DisjointSet(len(rects))
+    for i, rect in enumerate(rects):
+        for j in grid.query(rect, word_gap * heights[i], 0):
+            if j <= i:
+                continue
+            other = rects[j]
+            overlap = min(rect[3], other[3]) - max(rect[1], other[1])
+            gap = max(other[0] - rect[2], rect[0] - other[2])
+            if (
+                overlap >= 0.5 * min(heights[i], heights[j])
+                and max(heights[i], heights[j]) <= 2 * min(heights[i], heights[j])
+                and gap <= word_gap * max(heights[i], heights[j])
+            ):
+                words.union(i, j)
+
+    lines = [sorted(members, key=lambda index: rects[index][0]) for members in words.groups()]
+    line_rects = [_union_rect([rects[index] for index in members]) for members in lines]
+    line_heights = [sum(heights[index] for index in members) / len(members) for members in lines]
+
+    # Абзацы
+    grid = _GridIndex(line_rects, cell)
+    paragraphs = _DisjointSet(len(lines))
+    for i, rect in enumerate(line_rects):
+        for j in grid.query(rect, 0, line_gap * line_heights[i]):
+            if j == i:
+                continue
+            other = line_rects[j]
+            if other[1] < rect[1]:
+                continue
+            smaller, larger = sorted((line_heights[i], line_heights[j]))
+            vertical_gap = other[1] - rect[3]
+            horizontal_overlap = min(rect[2], other[2]) - max(rect[0], other[0])
+            if (
+                larger <= 1.5 * smaller
+                and -0.5 * smaller <= vertical_gap <= line_gap * larger
+                and horizontal_overlap > 0
+            ):
+                paragraphs.union(i, j)
+
+    blocks = []
+    for members in paragraphs.groups():
+        members.sort(key=lambda index: line_rects[index][1])
+        box_indices = [index for line in members for index in lines[line]]
+        x_min, y_min, x_max, y_max = _union_rect([line_rects[line] for line in members])
+        blocks.append({
+            "text": _join_words([bounding_boxes[index]["text"] for index in box_indices]),
+            "bbox": {"x_min": x_min, "y_min": y_min, "x_max": x_max, "y_max": y_max},
+            "line_count": len(members),
+            "line_height": sum(line_heights[line] for line in members) / len(members),
+            "confidence": max(float(bounding_boxes[index]["confidence"]) for index in box_indices),
+            "box_indices": box_indices,
+        })
+
+    blocks.sort(key=lambda block: (block["bbox"]["y_min"], block["bbox"]["x_min"]))
+    return blocks
+
+
+class GlyphMetrics:
+    """
+    Метрики глифов шрифта, снятые один раз на опорном размере
+
+    Ширина строки в пикселях линейно зависит от кегля, поэтому подбор
+    размера под рамку сводится к арифметике над заранее посчитанными
+    ширинами без отрисовки пробных вариантов.
+    """
+
+    REFERENCE_SIZE = 100
+
+    def __init__(self, font_path: Optional[str]):
+        self.font_path = font_path
+        self.reference_font = self.font(self.REFERENCE_SIZE)
+        ascent, descent = self.reference_font.getmetrics()
+        self.line_ratio = (ascent + descent) / self.REFERENCE_SIZE
+        self._advances = {char: self.reference_font.getlength(char) for char in PRECOMPUTED_CHARS}
+        self._lock = threading.Lock()
+
+    def font(self, size: int) -> "ImageFont.FreeTypeFont":
+        """Шрифт нужного кегля"""
+        return _load_font(self.font_path, size)
+
+    def advance(self, char: str) -> float:
+        """Ширина глифа на опорном размере"""
+        width = self._advances.get(char)
+        if width is None:
+            with self._lock:
+                width = self._advances[char] = self.reference_font.getlength(char)
+        return width
+
+    def text_width(self, text: str) -> float:
+        return sum(self.advance(char) for char in text)
+
+    def wrap(self, text: str, max_width: float) -> List[str]:
+        """
+        Перенос по словам при ширине строки max_width (в единицах опорного размера)
+
+        Слово шире строки (или текст без пробелов, например китайский)
+        переносится посимвольно.
+        """
+        space = self.advance(" ")
+        lines = []
+        current, current_width = "", 0.0
+        for word in text.split():
+            word_width = self.text_width(word)
+            if current and current_width + space + word_width <= max_width:
+                current += " " + word
+                current_width += space + word_width
+                continue
+            if current:
+                lines.append(current)
+            current, current_width = "", 0.0
+            for char in word:
+                char_width = self.advance(char)
+                if current and current_width + char_width > max_width:
+                    lines.append(current)
+                    current, current_width = "", 0.0
+                current += char
+                current_width += char_width
+        if current:
+            lines.append(current)
+        return lines
+
+    def fit(self, text: str, width: float, height: float, min_size: int = 8) -> Tuple[int, List[str]]:
+        """
+        Наибольший кегль, при котором текст с переносами помещается в рамку
+
+        Returns:
+            (кегль в пикселях, строки после переноса)
+        """
+        def layout(size: int) -> Tuple[bool, List[str]]:
+            lines = self.wrap(text, width * self.REFERENCE_SIZE / size)
+            return len(lines) * size * self.line_ratio <= height, lines
+
+        low = min_size
+        high = max(int(height / self.line_ratio), min_size)
+        best = layout(low)[1]
+        while low < high:
+            middle = (low + high + 1) // 2
+            fits, lines = layout(middle)
+            if fits:
+                low, best = middle, lines
+            else:
+                high = middle - 1
+        return low, best
+
+
+@lru_cache(maxsize=64)
+def _load_font(font_path: Optional[str], size: int) -> "ImageFont.FreeTypeFont":
+    if not PIL_AVAILABLE:
+        raise ImportError("Pillow не установлен. Установите: pip install Pillow")
+    if font_path is None:
+        return ImageFont.load_default(size=size)
+    return ImageFont.truetype(font_path, size)
+
+
+def _find_font(configured: str, candidates: List[str]) -> Optional[str]:
+    for path in [configured] + candidates:
+        if path and os.path.exists(path):
+            return path
+    return None
+
+
+@lru_cache(maxsize=None)
+def _metrics_for(font_path: Optional[str]) -> GlyphMetrics:
+    return GlyphMetrics(font_path)
+
+
+def glyph_metrics_for(text: str) -> GlyphMetrics:
+    """
+    Метрики шрифта, подходящего для текста
+
+    Для иероглифов берется CJK-шрифт, для остального - основной
+    (с кириллицей, включая казахские буквы). Если ни одного шрифта
+    в системе нет, используется встроенный шрифт Pillow.
+    """
+    font_path = None
+    if any(_is_cjk(char) for char in text):
+        font_path = _find_font(settings.OCR_CJK_FONT_PATH, CJK_FONT_CANDIDATES)
+    if font_path is None:
+        font_path = _find_font(settings.OCR_FONT_PATH, FONT_CANDIDATES)
+    return _metrics_for(font_path)
@@ -0,0 +1,92 @@
+"""
+Разбиение текста на фрагменты (предложения и строки) и обратная сборка
+"""
+import re
+from typing import Dict, List, Tuple
+
+
+_SPAN_SEPARATOR = re.compile(r"(\s*\n\s*|(?<=[.!?…;])\s+|(?<=[。！？；]))")
+_WHITESPACE = re.compile(r"(\s+)")
+
+
+def _split_long(span: str, max_chars: int) -> List[Tuple[str, str]]:
+    """Разбиение слишком длинного фрагмента по пробелам"""
+    words = _WHITESPACE.split(span)
+    pieces = []
+    current = ""
+    for index in range(0, len(words), 2):
+        word = words[index]
+        separator = words[index + 1] if index + 1 < len(words) else ""
+        if current and len(current) + len(word) > max_chars:
+            head, tail = current.rstrip(), current[len(current.rstrip()):]
+            pieces.append((head, tail))
+            current = ""
+        current += word + separator
+    if current:
+        head = current.rstrip()
+        pieces.append((head, current[len(head):]))
+    return pieces
+
+
+def split_spans(text: str, max_chars: int = 400) -> List[Tuple[str, str]]:
+    """
+    Разбиение текста на предложения и строки
+
+    Args:
+        text: Исходный текст
+        max_chars: Фрагменты длиннее делятся по пробелам
+
+    Returns:
+        Список пар (фрагмент, разделитель после него);
+        "".join(фрагмент + разделитель) восстанавливает исходный текст
+    """
+    parts = _SPAN_SEPARATOR.split(text)
+    spans = []
+    for index in range(0, len(parts), 2):
+        span = parts[index]
+        separator = parts[index + 1] if index + 1 < len(parts) else ""
+        if len(span) > max_chars:
+            pieces = _split_long(span, max_chars)
+            pieces[-1] = (pieces[-1][0], pieces[-1][1] + separator)
+            spans.extend(pieces)
+        else:
+            spans.append((span, separator))
+    return spans
+
+
+def join_spans(spans: List[Tuple[str, str]], replacements: Dict[str, str]) -> str:
+    """Сборка текста с заменой фрагментов (по тексту фрагмента без пробелов по краям)"""
+    result = []
+    for span, separator in spans:
+        key = span.strip()
+        if key in replacements:
+            lead = span[:len(span) - len(span.lstrip())]
+            trail = span[len(span.rstrip()):]
+            span = lead + replacements[key] + trail
+        result.append(span + separator)
+    return "".join(result)
+
+
+def chunk_text(text: str, max_chars: int = 300, first_max_chars: int = 0) -> List[str]:
+    """
+    Склейка соседних предложений в фрагменты не длиннее max_chars
+
+    Args:
+        text: Исходный текст
+        max_chars: Максимальная длина фрагмента
+        first_max_chars: Отдельный (обычно меньший) предел для первого фрагмента
+
+    Returns:
+        Непустые фрагменты по порядку
+    """
+    chunks = []
+    current = ""
+    for span, separator in split_spans(text, max_chars):
+        limit = first_max_chars if first_max_chars and not chunks else max_chars
+        if current.strip() and len(current) + len(span) > limit:
+            chunks.append(current.strip())
+            current = ""
+        current += span + separator
+    if current.strip():
+        chunks.append(current.strip())
+    return chunks
@@ -0,0 +1,169 @@
+"""
+Память переводов с нечетким поиском похожих предложений
+
+Переведенные предложения индексируются по множествам символьных триграмм
+нормализованного текста. Кандидаты ищутся по инвертированному индексу
+с префиксной фильтрацией, сходство считается коэффициентом Жаккара.
+"""
+import math
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Set, Tuple
+from app.core.config import settings
+
+
+_NON_WORD = re.compile(r"[\W_]+", re.UNICODE)
+_DIGITS = re.compile(r"\d+")
+
+
+def normalize_text(text: str) -> str:
+    """Нижний регистр, без пунктуации, пробелы схлопнуты"""
+    return _NON_WORD.sub(" ", text.lower()).strip()
+
+
+def char_ngrams(normalized: str, n: int = 3) -> Set[str]:
+    """Множество символьных n-грамм строки, обрамленной пробелами"""
+    padded = f" {normalized} "
+    if len(padded) <= n:
+        return {padded}
+    return {padded[i:i + n] for i in range(len(padded) - n + 1)}
+
+
+class TranslationMemory:
+    """Память переводов с поиском по сходству триграмм"""
+
+    def __init__(
+        self,
+        capacity: int = settings.TRANSLATION_MEMORY_SIZE,
+        threshold: float = settings.TRANSLATION_MEMORY_THRESHOLD,
+        max_chars: int = settings.TRANSLATION_MEMORY_MAX_CHARS
+    ):
+        self.capacity = capacity
+        self.threshold = threshold
+        self.max_chars = max_chars
+
+        self._entries: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self._exact: Dict[Tuple[str, str, str], int] = {}
+        self._postings: Dict[Tuple[str, str], Dict[str, Set[int]]] = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, text: str, source_language: str, target_language: str, translation: str):
+        """Добавление перевода в память (самые старые записи вытесняются)"""
+        if self.capacity <= 0 or not text or len(text) > self.max_chars:
+            return
+        normalized = normalize_text(text)
+        if not normalized:
+            return
+
+        key = (source_language, target_language, normalized)
+        grams = char_ngrams(normalized)
+
+        with self._lock:
+            existing = self._exact.get(key)
+            if existing is not None:
+                self._remove(existing)
+
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = {
+                "source_language": source_language,
+                "target_language": target_language,
+                "normalized": normalized,
+                "grams": grams,
+                "digits": _DIGITS.findall(text),
+                "translation": translation,
+            }
+            self._exact[key] = entry_id
+
+            postings = self._postings.setdefault((source_language, target_language), {})
+            for gram in grams:
+                postings.setdefault(gram, set()).add(entry_id)
+
+            while len(self._entries) > self.capacity:
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, entry_id: int):
+        entry = self._entries.pop(entry_id)
+        pair = (entry["source_language"], entry["target_language"])
+        self._exact.pop(pair + (entry["normalized"],), None)
+
+        postings = self._postings.get(pair, {})
+        for gram in entry["grams"]:
+            ids = postings.get(gram)
+            if ids is not None:
+                ids.discard(entry_id)
+                if not ids:
+                    del postings[gram]
+
+    def lookup(
+        self,
+        text: str,
+        source_language: str,
+        target_language: str,
+        threshold: Optional[float] = None
+    ) -> Optional[Tuple[str, float]]:
+        """
+        Поиск перевода самого похожего предложения
+
+        Числа в тексте должны совпадать точно: "5 items" не подменяется
+        переводом "6 items", как бы близки ни были строки.
+
+        Args:
+            text: Исходный текст
+            source_language: Язык текста
+            target_language: Язык перевода
+            threshold: Минимальное сходство (по умолчанию из настроек)
+
+        Returns:
+            (перевод, сходство от 0 до 1) или None
+        """
+        threshold = max(self.threshold if threshold is None else threshold, 1e-6)
+        if not text or len(text) > self.max_chars:
+            return None
+        normalized = normalize_text(text)
+        if not normalized:
+            return None
+        digits = _DIGITS.findall(text)
+
+        with self._lock:
+            entry_id = self._exact.get((source_language, target_language, normalized))
+            if entry_id is not None and self._entries[entry_id]["digits"] == digits:
+                self._entries.move_to_end(entry_id)
+                return self._entries[entry_id]["translation"], 1.0
+
+            postings = self._postings.get((source_language, target_language))
+            if not postings or threshold > 1.0:
+                return None
+
+            grams = char_ngrams(normalized)
+            # Сходство >= threshold требует не меньше min_overlap общих триграмм,
+            # поэтому достаточно просмотреть списки для самых редких
+            # len(grams) - min_overlap + 1 триграмм запроса
+            min_overlap = math.ceil(threshold * len(grams))
+            rarest = sorted(grams, key=lambda gram: len(postings.get(gram, ())))
+            candidates = set()
+            for gram in rarest[:len(grams) - min_overlap + 1]:
+                candidates.update(postings.get(gram, ()))
+
+            best_id = None
+            best_score = 0.0
+            for candidate_id in candidates:
+                entry = self._entries[candidate_id]
+                other = entry["grams"]
+                if not threshold * len(grams) <= len(other) <= len(grams) / threshold:
+                    continue
+                overlap = len(grams & other)
+                score = overlap / (len(grams) + len(other) - overlap)
+                if score >= threshold and score > best_score and entry["digits"] == digits:
+                    best_id = candidate_id
+                    best_score = score
+
+            if best_id is None:
+                return None
+            self._entries.move_to_end(best_id)
+            return self._entries[best_id]["translation"], round(best_score, 4)
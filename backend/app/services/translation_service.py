@@ -1,6 +1,11 @@
-from typing import Dict, Optional
+from typing import Dict, List, Optional, Tuple, Any, Iterator, Union
 from app.core.config import settings
-from concurrent.futures import ThreadPoolExecutor
+from app.services.language_detector import language_detector
+from app.services.translation_memory import TranslationMemory
+from app.services.text_spans import split_spans, join_spans
+from app.services.model_registry import model_registry
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from collections import OrderedDict
 import threading
 
 try:
@@ -19,13 +24,14 @@ except ImportError:
     single_detection = None
 
 try:
-    from transformers import AutoTokenizer, AutoModelForSeq2SeqLM
+    from transformers import AutoTokenizer, AutoModelForSeq2SeqLM, TextIteratorStreamer
     import torch
     TRANSFORMERS_AVAILABLE = True
 except ImportError:
     TRANSFORMERS_AVAILABLE = False
     AutoTokenizer = None
     AutoModelForSeq2SeqLM = None
+    TextIteratorStreamer = None
     torch = None
 
 
@@ -33,8 +39,6 @@ class TranslationService:
     """Сервис для перевода текста"""
     
     def __init__(self):
-        self.model = None
-        self.tokenizer = None
         self.model_name = settings.NLLB_MODEL
         self.use_fast_translator = True
         
@@ -62,36 +66,56 @@ class TranslationService:
             "tr": "tur_Latn",
             "auto": "eng_Latn",
         }
+        
+        self.nllb_lang_ids = {
+            "rus_Cyrl": 256147,
+            "kaz_Cyrl": 256089,
+            "eng_Latn": 256047,
+            "deu_Latn": 256006,
+            "fra_Latn": 256007,
+            "spa_Latn": 256008,
+            "zho_Hans": 256010,
+        }
+        
+        self.cache_size = settings.TRANSLATION_CACHE_SIZE
+        self.batch_size = settings.TRANSLATION_BATCH_SIZE
+        self.fast_batch_chars = 4000
+        self.span_min_letters = 8
+        self._cache: "OrderedDict[Tuple[str, str, str], str]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._model_lock = threading.Lock()
+        
+        self.memory = TranslationMemory()
     
     def load_model(self):
         """Загрузка модели NLLB"""
         if not TRANSFORMERS_AVAILABLE:
             raise ImportError("Transformers не установлен. Установите: pip install transformers")
-        if self.model is None or self.tokenizer is None:
-            self.tokenizer = AutoTokenizer.from_pretrained(self.model_name)
-            self.model = AutoModelForSeq2SeqLM.from_pretrained(
+        
+        def load():
+            tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+            model = AutoModelForSeq2SeqLM.from_pretrained(
                 self.model_name,
                 torch_dtype=torch.float16 if torch.cuda.is_available() else torch.float32
             )
             
             if torch.cuda.is_available():
-                self.model = self.model.cuda()
+                model = model.cuda()
             else:
-                self.model = self.model.cpu()
+                model = model.cpu()
             
-            self.model.eval()
-        return self.model, self.tokenizer
+            model.eval()
+            return model, tokenizer
+        
+        return model_registry.get(f"nllb:{self.model_name}", load, group="translation")
     
     def detect_language(self, text: str) -> str:
         """Определение языка текста"""
-        cyrillic_chars = sum(1 for char in text if '\u0400' <= char <= '\u04FF')
-        latin_chars = sum(1 for char in text if char.isalpha() and ord(char) < 128)
-        
-        if cyrillic_chars > latin_chars:
-            if any(char in text for char in ['ә', 'ғ', 'қ', 'ң', 'ө', 'ұ', 'ү', 'һ', 'і']):
-                return "kk"
-            return "ru"
-        return "en"
+        return language_detector.detect(text)
+    
+    def detect_languages(self, texts: List[str]) -> List[str]:
+        """Определение языка для пакета текстов за один проход"""
+        return language_detector.detect_batch(texts)
     
     def translate_fast(
         self,
@@ -166,11 +190,11 @@ class TranslationService:
         """Перевод текста через NLLB модель"""
         model, tokenizer = self.load_model()
         
-        if source_language is None:
+        if source_language is None or source_language == "auto":
             source_language = self.detect_language(text)
         
-        src_code = self.language_codes.get(source_language, "eng_Latn")
-        tgt_code = self.language_codes.get(target_language, "rus_Cyrl")
+        src_code = self.nllb_codes.get(source_language, "eng_Latn")
+        tgt_code = self.nllb_codes.get(target_language, "rus_Cyrl")
         
         if source_language == target_language:
             return text
@@ -187,26 +211,7 @@ class TranslationService:
             inputs = {k: v.cuda() for k, v in inputs.items()}
             model = model.cuda()
         
-        lang_id_map = {
-            "rus_Cyrl": 256147,
-            "kaz_Cyrl": 256089,
-            "eng_Latn": 256047,
-            "deu_Latn": 256006,
-            "fra_Latn": 256007,
-            "spa_Latn": 256008,
-            "zho_Hans": 256010,
-        }
-        
-        try:
-            tokenizer.tgt_lang = tgt_code
-            tokenizer.set_tgt_lang_special_tokens(tgt_code)
-            encoded = tokenizer.encode("", add_special_tokens=True)
-            if len(encoded) > 0:
-                tgt_lang_id = encoded[0]
-            else:
-                tgt_lang_id = lang_id_map.get(tgt_code, 256147)
-        except Exception:
-            tgt_lang_id = lang_id_map.get(tgt_code, 256147)
+        tgt_lang_id = self._nllb_lang_id(tokenizer, tgt_code)
         
         words = text.split()
         if len(words) > 100:
@@ -237,118 +242,552 @@ class TranslationService:
         target_languages: list = ["ru", "kk", "en"]
     ) -> Dict[str, str]:
         """Перевод текста на несколько языков"""
-        translations = {}
-        
-        seen = set()
-        unique_languages = []
-        for lang in target_languages:
-            if lang not in seen:
-                seen.add(lang)
-                unique_languages.append(lang)
-        
-        if not unique_languages:
-            return translations
-        
-        if source_language is None:
-            source_language = self.detect_language(text)
-        
-        languages_to_translate = []
-        for target_lang in unique_languages:
-            if source_language == target_lang:
-                translations[target_lang] = text
-            else:
-                languages_to_translate.append(target_lang)
-        
-        if not languages_to_translate:
-            return translations
+        if not target_languages:
+            return {}
+        return self.translate_document(text, source_language, target_languages)["translations"]
+    
+    def translate_as_completed(
+        self,
+        text: str,
+        source_language: Optional[str] = None,
+        target_languages: list = ["ru", "kk", "en"]
+    ) -> Iterator[Tuple[str, str]]:
+        """
+        Перевод текста на несколько языков с выдачей каждого языка по готовности
+        
+        Разбиение на фрагменты, определение их языка и поиск повторов
+        выполняются один раз, затем языки переводятся параллельно: вызывающий
+        код может начать работу с первым готовым переводом (например, озвучку),
+        не дожидаясь остальных.
+        
+        Yields:
+            (язык, перевод) в порядке завершения
+        """
+        target_languages = list(dict.fromkeys(target_languages))
+        if not target_languages:
+            return
+        spans, _, span_sources = self._plan_spans(text, source_language)
+        
+        def translate_language(tgt: str) -> Tuple[str, str]:
+            sources = {span: src for span, src in span_sources.items() if src != tgt}
+            results = self._translate_jobs([(span, src, tgt) for span, src in sources.items()])
+            replacements = {span: results[(span, src, tgt)][0] for span, src in sources.items()}
+            return tgt, join_spans(spans, replacements).strip()
+        
+        with ThreadPoolExecutor(max_workers=min(len(target_languages), 5)) as executor:
+            futures = [executor.submit(translate_language, tgt) for tgt in target_languages]
+            for future in as_completed(futures):
+                yield future.result()
+    
+    def get_cached(
+        self,
+        text: str,
+        source_language: Optional[str],
+        target_language: str
+    ) -> Optional[str]:
+        """Поиск готового перевода в LRU-кэше"""
+        key = (source_language or "auto", target_language, text)
+        with self._cache_lock:
+            translated = self._cache.get(key)
+            if translated is not None:
+                self._cache.move_to_end(key)
+            return translated
+    
+    def _store_cached(
+        self,
+        text: str,
+        source_language: Optional[str],
+        target_language: str,
+        translated: str
+    ):
+        """Сохранение перевода в LRU-кэш с вытеснением самых старых записей"""
+        if self.cache_size <= 0:
+            return
+        key = (source_language or "auto", target_language, text)
+        with self._cache_lock:
+            self._cache[key] = translated
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+    
+    def _nllb_lang_id(self, tokenizer, nllb_code: str) -> int:
+        """ID токена целевого языка NLLB"""
+        try:
+            lang_id = tokenizer.convert_tokens_to_ids(nllb_code)
+            if lang_id is not None and lang_id != tokenizer.unk_token_id:
+                return lang_id
+        except Exception:
+            pass
+        return self.nllb_lang_ids.get(nllb_code, 256147)
+    
+    def _translate_fast_batch(
+        self,
+        texts: List[str],
+        source_language: Optional[str],
+        target_language: str
+    ) -> List[str]:
+        """
+        Пакетный перевод через внешний API
+        
+        Короткие однострочные тексты склеиваются через перевод строки и уходят
+        одним запросом; если API вернул другое число строк, пачка переводится поштучно.
+        """
+        chunks = []
+        current = []
+        current_len = 0
+        for idx, text in enumerate(texts):
+            if "\n" in text or len(text) >= self.fast_batch_chars:
+                chunks.append([idx])
+                continue
+            if current and current_len + len(text) + 1 > self.fast_batch_chars:
+                chunks.append(current)
+                current = []
+                current_len = 0
+            current.append(idx)
+            current_len += len(text) + 1
+        if current:
+            chunks.append(current)
+        
+        def translate_chunk(indices: List[int]) -> Tuple[List[int], List[str]]:
+            if len(indices) == 1:
+                return indices, [self.translate_fast(texts[indices[0]], source_language, target_language)]
+            joined = "\n".join(texts[i] for i in indices)
+            translated = self.translate_fast(joined, source_language, target_language)
+            parts = [part.strip() for part in translated.split("\n")]
+            if len(parts) != len(indices):
+                parts = [self.translate_fast(texts[i], source_language, target_language) for i in indices]
+            return indices, parts
+        
+        results: List[str] = list(texts)
+        if not chunks:
+            return results
+        
+        with ThreadPoolExecutor(max_workers=min(len(chunks), 5)) as executor:
+            for indices, parts in executor.map(translate_chunk, chunks):
+                for idx, part in zip(indices, parts):
+                    results[idx] = part
+        return results
+    
+    def _nllb_translate_batch(
+        self,
+        texts: List[str],
+        source_language: Optional[str],
+        target_language: str
+    ) -> List[str]:
+        """Пакетный перевод через NLLB: один вызов generate на batch_size текстов"""
+        model, tokenizer = self.load_model()
         
-        if TRANSLATORS_AVAILABLE:
-            def translate_one_fast(target_lang: str, idx: int) -> tuple:
-                try:
-                    translated = self.translate_fast(text, source_language, target_lang)
-                    return (target_lang, translated)
-                except Exception:
-                    return (target_lang, text)
+        src_code = self.nllb_codes.get(source_language, "eng_Latn")
+        tgt_code = self.nllb_codes.get(target_language, "rus_Cyrl")
+        tgt_lang_id = self._nllb_lang_id(tokenizer, tgt_code)
+        use_cuda = torch.cuda.is_available()
+        
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        results: List[str] = list(texts)
+        
+        for start in range(0, len(order), self.batch_size):
+            batch_indices = order[start:start + self.batch_size]
+            with self._model_lock:
+                tokenizer.src_lang = src_code
+                inputs = tokenizer(
+                    [texts[i] for i in batch_indices],
+                    return_tensors="pt",
+                    padding=True,
+                    truncation=True,
+                    max_length=256
+                )
+            if use_cuda:
+                inputs = {k: v.cuda() for k, v in inputs.items()}
             
-            with ThreadPoolExecutor(max_workers=min(len(languages_to_translate), 5)) as executor:
-                futures = [
-                    executor.submit(translate_one_fast, lang, idx+1)
-                    for idx, lang in enumerate(languages_to_translate)
-                ]
-                for future in futures:
-                    target_lang, translated_text = future.result()
-                    translations[target_lang] = translated_text
+            max_new_tokens = min(256, int(inputs["input_ids"].shape[1] * 1.5) + 10)
+            with torch.no_grad():
+                generated_tokens = model.generate(
+                    **inputs,
+                    forced_bos_token_id=tgt_lang_id,
+                    max_new_tokens=max_new_tokens,
+                    num_beams=1,
+                    do_sample=False,
+                )
             
-            return translations
+            decoded = tokenizer.batch_decode(generated_tokens, skip_special_tokens=True)
+            for idx, translated_text in zip(batch_indices, decoded):
+                results[idx] = translated_text.strip()
         
-        if not TRANSFORMERS_AVAILABLE:
-            for target_lang in languages_to_translate:
-                translations[target_lang] = text
-            return translations
-        
-        words = text.split()
-        if len(words) > 100:
-            text = " ".join(words[:100])
+        return results
+    
+    def _use_fast_backend(self) -> bool:
+        """Переводить ли через внешний API вместо локальной модели NLLB"""
+        return self.use_fast_translator and (TRANSLATORS_AVAILABLE or DEEP_TRANSLATOR_AVAILABLE)
+    
+    def _translate_group(
+        self,
+        texts: List[str],
+        source_language: Optional[str],
+        target_language: str
+    ) -> List[str]:
+        """Перевод группы текстов с одной парой языков доступным бэкендом"""
+        if self._use_fast_backend():
+            return self._translate_fast_batch(texts, source_language, target_language)
+        
+        if TRANSFORMERS_AVAILABLE:
+            try:
+                return self._nllb_translate_batch(texts, source_language, target_language)
+            except Exception:
+                pass
         
-        try:
-            model, tokenizer = self.load_model()
-        except Exception:
-            for target_lang in languages_to_translate:
-                translations[target_lang] = text
-            return translations
+        return list(texts)
+    
+    def _lookup_ready(
+        self,
+        text: str,
+        source_language: str,
+        target_language: str
+    ) -> Optional[Tuple[str, Optional[float]]]:
+        """Готовый перевод из кэша или памяти переводов: (перевод, сходство или None)"""
+        cached = self.get_cached(text, source_language, target_language)
+        if cached is not None:
+            return cached, None
+        return self.memory.lookup(text, source_language, target_language)
+    
+    def _remember(self, text: str, source_language: str, target_language: str, translated: str):
+        """Сохранение нового перевода в кэш и память переводов"""
+        if translated != text:
+            self._store_cached(text, source_language, target_language, translated)
+            self.memory.add(text, source_language, target_language, translated)
+    
+    def _translate_jobs(
+        self,
+        jobs: List[Tuple[str, str, str]]
+    ) -> Dict[Tuple[str, str, str], Tuple[str, Optional[float]]]:
+        """
+        Перевод набора заданий (текст, исходный язык, целевой язык)
+        
+        Повторы переводятся один раз, готовые переводы берутся из кэша,
+        близкие к уже переведенным предложения - из памяти переводов, остальное
+        уходит в бэкенд пачками по паре языков, пары обрабатываются параллельно.
+        
+        Returns:
+            {задание: (перевод, сходство из памяти переводов или None)}
+        """
+        results: Dict[Tuple[str, str, str], Tuple[str, Optional[float]]] = {}
+        pending: Dict[Tuple[str, str], List[str]] = {}
+        
+        for job in dict.fromkeys(jobs):
+            text, src, tgt = job
+            if src == tgt or not text.strip():
+                results[job] = (text, None)
+                continue
+            ready = self._lookup_ready(text, src, tgt)
+            if ready is not None:
+                results[job] = ready
+                continue
+            pending.setdefault((src, tgt), []).append(text)
+        
+        def translate_pending(pair: Tuple[str, str]) -> Tuple[Tuple[str, str], List[str]]:
+            src, tgt = pair
+            return pair, self._translate_group(pending[pair], src, tgt)
+        
+        if pending:
+            with ThreadPoolExecutor(max_workers=min(len(pending), 5)) as executor:
+                for (src, tgt), translated in executor.map(translate_pending, list(pending)):
+                    for text, translated_text in zip(pending[(src, tgt)], translated):
+                        results[(text, src, tgt)] = (translated_text, None)
+                        self._remember(text, src, tgt, translated_text)
+        
+        return results
+    
+    def translate_batch(
+        self,
+        texts: List[str],
+        source_language: Optional[str] = None,
+        target_languages: list = ["ru", "kk", "en"]
+    ) -> List[Dict[str, Any]]:
+        """
+        Пакетный перевод списка текстов на несколько языков
+        
+        Args:
+            texts: Список текстов
+            source_language: Язык всех текстов (None для автоопределения по каждому)
+            target_languages: Языки перевода
+        
+        Returns:
+            Список результатов в порядке входных текстов; memory_scores содержит
+            сходство для переводов, взятых из памяти переводов
+        """
+        target_languages = list(dict.fromkeys(target_languages))
+        unique_texts = list(dict.fromkeys(texts))
+        
+        if source_language is None or source_language == "auto":
+            sources = dict(zip(unique_texts, self.detect_languages(unique_texts)))
+        else:
+            sources = {text: source_language for text in unique_texts}
+        
+        results = self._translate_jobs([
+            (text, sources[text], tgt)
+            for text in unique_texts
+            for tgt in target_languages
+        ])
+        
+        batch = []
+        for text in texts:
+            src = sources[text]
+            translations = {}
+            memory_scores = {}
+            for tgt in target_languages:
+                translations[tgt], score = results[(text, src, tgt)]
+                if score is not None:
+                    memory_scores[tgt] = score
+            batch.append({
+                "original_text": text,
+                "source_language": src,
+                "translations": translations,
+                "memory_scores": memory_scores
+            })
+        return batch
+    
+    def _plan_spans(
+        self,
+        text: str,
+        source_language: Optional[str]
+    ) -> Tuple[List[Tuple[str, str]], str, Dict[str, str]]:
+        """
+        Разбиение текста на фрагменты и определение языка каждого уникального фрагмента
+        
+        Returns:
+            (фрагменты с разделителями, язык документа,
+             {фрагмент: исходный язык} для фрагментов, которые нужно переводить)
+        """
+        spans = split_spans(text)
+        unique_spans = list(dict.fromkeys(span.strip() for span, _ in spans if span.strip()))
+        
+        if source_language is None or source_language == "auto":
+            # Язык документа - обычным порогом: короткий текст ("Привет")
+            # должен получить свой язык, а не "en" по умолчанию
+            source_language = language_detector.detect(text)
+        # Повышенный порог только для переопределения языка отдельных фрагментов
+        span_languages = language_detector.detect_batch(
+            unique_spans,
+            default=None,
+            min_letters=self.span_min_letters
+        )
+        
+        span_sources = {}
+        for span, span_language in zip(unique_spans, span_languages):
+            if any(char.isalpha() for char in span):
+                span_sources[span] = span_language or source_language
+        
+        return spans, source_language, span_sources
+    
+    def translate_document(
+        self,
+        text: str,
+        source_language: Optional[str] = None,
+        target_languages: list = ["ru", "kk", "en"]
+    ) -> Dict[str, Any]:
+        """
+        Перевод текста по фрагментам
+        
+        Текст делится на предложения и строки, повторяющиеся фрагменты
+        переводятся один раз. Фрагменты без букв и фрагменты, уже написанные
+        на целевом языке, остаются как есть. Перевод собирается в исходном порядке.
+        
+        Args:
+            text: Исходный текст
+            source_language: Язык текста (None для автоопределения)
+            target_languages: Языки перевода
+        
+        Returns:
+            Результат в формате translate_batch; memory_scores содержит
+            минимальное сходство среди фрагментов, взятых из памяти переводов
+        """
+        return self.translate_documents([text], source_language, target_languages)[0]
+    
+    def translate_documents(
+        self,
+        texts: List[str],
+        source_language: Union[Optional[str], List[Optional[str]]] = None,
+        target_languages: list = ["ru", "kk", "en"]
+    ) -> List[Dict[str, Any]]:
+        """
+        Перевод нескольких текстов по фрагментам одним пакетом
+        
+        Фрагменты всех текстов собираются в общий список заданий, поэтому
+        строка, повторяющаяся в разных текстах, переводится один раз.
+        
+        Args:
+            texts: Исходные тексты
+            source_language: Язык всех текстов или список языков по текстам
+                (None - автоопределение для каждого текста отдельно)
+            target_languages: Языки перевода
+        
+        Returns:
+            Результаты translate_document в порядке входных текстов
+        """
+        target_languages = list(dict.fromkeys(target_languages))
+        if not isinstance(source_language, list):
+            source_language = [source_language] * len(texts)
+        plans = [self._plan_spans(text, src) for text, src in zip(texts, source_language)]
+        
+        jobs = [
+            (span, src, tgt)
+            for _, _, span_sources in plans
+            for span, src in span_sources.items()
+            for tgt in target_languages
+            if src != tgt
+        ]
+        results = self._translate_jobs(jobs)
+        
+        documents = []
+        for text, (spans, document_language, span_sources) in zip(texts, plans):
+            translations = {}
+            memory_scores = {}
+            for tgt in target_languages:
+                replacements = {}
+                for span, src in span_sources.items():
+                    if src == tgt:
+                        continue
+                    replacements[span], score = results[(span, src, tgt)]
+                    if score is not None:
+                        memory_scores[tgt] = min(score, memory_scores.get(tgt, 1.0))
+                translations[tgt] = join_spans(spans, replacements).strip()
+            
+            documents.append({
+                "original_text": text,
+                "source_language": document_language,
+                "translations": translations,
+                "memory_scores": memory_scores
+            })
+        return documents
+    
+    def _nllb_stream(
+        self,
+        text: str,
+        source_language: str,
+        target_language: str
+    ) -> Iterator[str]:
+        """Перевод фрагмента через NLLB с выдачей текста по мере декодирования токенов"""
+        model, tokenizer = self.load_model()
         
         src_code = self.nllb_codes.get(source_language, "eng_Latn")
-        tokenizer.src_lang = src_code
-        tokenizer.set_src_lang_special_tokens(src_code)
+        tgt_code = self.nllb_codes.get(target_language, "rus_Cyrl")
+        tgt_lang_id = self._nllb_lang_id(tokenizer, tgt_code)
         
-        inputs = tokenizer(text, return_tensors="pt", padding=True, truncation=True, max_length=128)
+        with self._model_lock:
+            tokenizer.src_lang = src_code
+            inputs = tokenizer(text, return_tensors="pt", truncation=True, max_length=256)
         if torch.cuda.is_available():
             inputs = {k: v.cuda() for k, v in inputs.items()}
-            model = model.cuda()
         
-        def translate_one_optimized(target_lang: str, idx: int) -> tuple:
+        streamer = TextIteratorStreamer(tokenizer, skip_prompt=True, skip_special_tokens=True)
+        errors = []
+        
+        def generate():
             try:
-                tgt_code = self.nllb_codes.get(target_lang, "rus_Cyrl")
-                
-                tokenizer.tgt_lang = tgt_code
-                tokenizer.set_tgt_lang_special_tokens(tgt_code)
-                
-                lang_id_map = {
-                    "rus_Cyrl": 256147,
-                    "kaz_Cyrl": 256089,
-                    "eng_Latn": 256047,
-                    "deu_Latn": 256006,
-                    "fra_Latn": 256007,
-                    "spa_Latn": 256008,
-                    "zho_Hans": 256010,
-                }
-                tgt_lang_id = lang_id_map.get(tgt_code, 256147)
-                
                 with torch.no_grad():
-                    generated_tokens = model.generate(
+                    model.generate(
                         **inputs,
                         forced_bos_token_id=tgt_lang_id,
-                        max_new_tokens=100,
+                        max_new_tokens=min(256, int(inputs["input_ids"].shape[1] * 1.5) + 10),
                         num_beams=1,
                         do_sample=False,
+                        streamer=streamer,
                     )
-                
-                translated_text = tokenizer.batch_decode(generated_tokens, skip_special_tokens=True)[0]
-                return (target_lang, translated_text.strip())
-            except Exception:
-                return (target_lang, text)
+            except Exception as e:
+                errors.append(e)
+                streamer.end()
+        
+        thread = threading.Thread(target=generate, daemon=True)
+        thread.start()
+        for piece in streamer:
+            if piece:
+                yield piece
+        thread.join()
+        
+        if errors:
+            raise errors[0]
+    
+    def translate_stream(
+        self,
+        text: str,
+        source_language: Optional[str] = None,
+        target_languages: list = ["ru", "kk", "en"]
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Потоковый перевод текста
+        
+        Фрагменты переводятся по порядку, и каждый перевод отдается сразу.
+        На локальной модели NLLB текст фрагмента выдается по мере декодирования
+        токенов, так что первые слова появляются через время одного шага генерации.
+        
+        Yields:
+            {"event": "start", "source_language", "target_languages"}
+            {"event": "delta", "language", "text"} - очередной кусок перевода
+            {"event": "done", "original_text", "source_language", "translations"}
+        """
+        target_languages = list(dict.fromkeys(target_languages))
+        spans, source_language, span_sources = self._plan_spans(text, source_language)
+        stream_tokens = not self._use_fast_backend() and TRANSFORMERS_AVAILABLE
+        
+        yield {
+            "event": "start",
+            "source_language": source_language,
+            "target_languages": target_languages
+        }
         
-        with ThreadPoolExecutor(max_workers=min(len(languages_to_translate), 3)) as executor:
-            futures = [
-                executor.submit(translate_one_optimized, lang, idx+1)
-                for idx, lang in enumerate(languages_to_translate)
-            ]
-            
-            for future in futures:
-                target_lang, translated_text = future.result()
-                translations[target_lang] = translated_text
+        finished: Dict[Tuple[str, str], str] = {}
+        parts: Dict[str, List[str]] = {tgt: [] for tgt in target_languages}
         
-        return translations
+        for span, separator in spans:
+            key = span.strip()
+            src = span_sources.get(key)
+            lead = span[:len(span) - len(span.lstrip())]
+            trail = span[len(span.rstrip()):] + separator
+            
+            if src is not None and not stream_tokens:
+                jobs = [
+                    (key, src, tgt)
+                    for tgt in target_languages
+                    if tgt != src and (key, tgt) not in finished
+                ]
+                for (_, _, tgt), (translated, _) in self._translate_jobs(jobs).items():
+                    finished[(key, tgt)] = translated
+            
+            for tgt in target_languages:
+                if src is None or src == tgt:
+                    pieces = [span + separator]
+                elif (key, tgt) in finished:
+                    pieces = [lead + finished[(key, tgt)] + trail]
+                else:
+                    ready = self._lookup_ready(key, src, tgt)
+                    if ready is not None:
+                        finished[(key, tgt)] = ready[0]
+                        pieces = [lead + ready[0] + trail]
+                    else:
+                        pieces = [lead]
+                        tokens = []
+                        for token_text in self._nllb_stream(key, src, tgt):
+                            tokens.append(token_text)
+                            if pieces:
+                                token_text = "".join(pieces) + token_text
+                                pieces = []
+                            parts[tgt].append(token_text)
+                            yield {"event": "delta", "language": tgt, "text": token_text}
+                        translated = "".join(tokens).strip()
+                        finished[(key, tgt)] = translated
+                        self._remember(key, src, tgt, translated)
+                        pieces.append(trail)
+                
+                for piece in pieces:
+                    if piece:
+                        parts[tgt].append(piece)
+                        yield {"event": "delta", "language": tgt, "text": piece}
+        
+        yield {
+            "event": "done",
+            "original_text": text,
+            "source_language": source_language,
+            "translations": {tgt: "".join(parts[tgt]).strip() for tgt in target_languages}
+        }
 
 
 translation_service = TranslationService()
@@ -0,0 +1,278 @@
+"""
+Кэш синтезированной речи с адресацией по содержимому
+
+Ключ записи - хэш нормализованного текста, языка, голоса и движка. Аудио
+хранится один раз в blobs/<sha256 содержимого>, а файл <ключ>.<расширение>
+- жесткая ссылка на него: разные запросы с одинаковым звуком (например,
+kk и ru в gTTS) не занимают место дважды.
+
+Каталог общий для воркеров pre-fork сервера, поэтому источник истины -
+файлы. Чтение не берет блокировку: попадание - stat файла ключа по точному
+имени, время изменения файла - время последнего обращения для всех
+воркеров. Запись идет под файловой блокировкой и обновляет общий размер
+кэша в файле .size, не обходя каталог. Полный обход (индекс для LRU по
+времени обращения) нужен только для вытеснения, а вытеснение освобождает
+место с запасом до TTS_CACHE_LOW_WATER квоты, поэтому обход редок.
+"""
+import contextlib
+import hashlib
+import os
+import re
+import shutil
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, Optional, Set, Tuple
+from app.core.config import settings
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+def normalize_text(text: str) -> str:
+    """Текст для ключа кэша: NFC, схлопнутые пробелы"""
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFC", text)).strip()
+
+
+def cache_key(text: str, language: str, voice: Optional[str], engine: str) -> str:
+    payload = "\0".join([engine, language, voice or "", normalize_text(text)])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _file_digest(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# Расширения файлов движков (gTTS - mp3, Coqui - wav) для поиска ключа без индекса
+EXTENSIONS = (".mp3", ".wav")
+
+
+def _link_or_copy(source: str, destination: str):
+    try:
+        os.link(source, destination)
+    except OSError:
+        shutil.copyfile(source, destination)
+
+
+class TTSCache:
+    """LRU-кэш аудиофайлов TTS с квотой на диске"""
+
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        max_bytes: int = settings.TTS_CACHE_MAX_MB * 1024 * 1024,
+        low_water: float = settings.TTS_CACHE_LOW_WATER
+    ):
+        self.directory = directory or settings.TTS_CACHE_DIR or os.path.join(settings.UPLOAD_DIR, "tts", "cache")
+        self.blob_directory = os.path.join(self.directory, "blobs")
+        # Файлы больше квоты отдаются, но в кэш не попадают
+        self.large_directory = os.path.join(self.directory, "large")
+        self.lock_path = os.path.join(self.directory, ".lock")
+        self.size_path = os.path.join(self.directory, ".size")
+        self.max_bytes = max_bytes
+        self.low_water_bytes = int(max_bytes * low_water)
+
+        # Индекс для вытеснения, строится обходом каталога под блокировкой:
+        # ключ -> (путь к файлу ключа, хэш содержимого)
+        self._entries: "OrderedDict[str, Tuple[str, str]]" = OrderedDict()
+        # хэш содержимого -> (путь к файлу в blobs, размер)
+        self._blobs: Dict[str, Tuple[str, int]] = {}
+        self._blob_keys: Dict[str, Set[str]] = {}
+        self._size = 0
+        self._lock = threading.Lock()
+
+    @property
+    def size_bytes(self) -> int:
+        """Размер содержимого кэша (всех воркеров)"""
+        with self._locked():
+            return self._read_size()
+
+    def __len__(self) -> int:
+        if not os.path.isdir(self.directory):
+            return 0
+        return sum(1 for name in os.listdir(self.directory) if self._is_entry(name))
+
+    def _is_entry(self, name: str) -> bool:
+        return (
+            not name.startswith(".") and ".tmp" not in name
+            and os.path.isfile(os.path.join(self.directory, name))
+        )
+
+    @contextlib.contextmanager
+    def _locked(self):
+        """Блокировка потоков процесса и файловая блокировка каталога для других процессов"""
+        with self._lock:
+            os.makedirs(self.blob_directory, exist_ok=True)
+            if fcntl is None:
+                yield
+                return
+            with open(self.lock_path, "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _read_size(self) -> int:
+        """Общий размер кэша из .size (вызывается под _locked; нет файла - обход каталога)"""
+        try:
+            with open(self.size_path) as f:
+                return int(f.read())
+        except (OSError, ValueError):
+            self._scan()
+            self._write_size(self._size)
+            return self._size
+
+    def _write_size(self, size: int):
+        with open(self.size_path, "w") as f:
+            f.write(str(size))
+
+    def _add_blob(self, digest: str, path: str, size: int):
+        self._blobs[digest] = (path, size)
+        self._blob_keys[digest] = set()
+        self._size += size
+
+    def _remove_blob(self, digest: str):
+        path, size = self._blobs.pop(digest)
+        self._blob_keys.pop(digest, None)
+        self._size -= size
+        if os.path.exists(path):
+            os.remove(path)
+
+    def _remove_entry(self, key: str):
+        path, digest = self._entries.pop(key)
+        if os.path.exists(path):
+            os.remove(path)
+        keys = self._blob_keys[digest]
+        keys.discard(key)
+        if not keys:
+            self._remove_blob(digest)
+
+    def _evict(self, keep: str) -> int:
+        """
+        Вытеснение давно не использованных записей до low_water_bytes (кроме keep)
+
+        Вызывается под _locked: индекс перестраивается по каталогу, так как
+        записи добавляли и читали и другие воркеры.
+
+        Returns:
+            Размер кэша после вытеснения
+        """
+        self._scan()
+        self._entries.move_to_end(keep)
+        while len(self._entries) > 1 and self._size > self.low_water_bytes:
+            self._remove_entry(next(iter(self._entries)))
+        return self._size
+
+    def _scan(self):
+        """Перестроение индекса по файлам каталога (порядок LRU - по времени изменения)"""
+        known = {path: digest for path, digest in self._entries.values()}
+        self._entries.clear()
+        self._blobs.clear()
+        self._blob_keys.clear()
+        self._size = 0
+
+        blobs_by_inode = {}
+        for name in os.listdir(self.blob_directory):
+            path = os.path.join(self.blob_directory, name)
+            if ".tmp" in name or not os.path.isfile(path):
+                continue
+            stat = os.stat(path)
+            digest = os.path.splitext(name)[0]
+            blobs_by_inode[(stat.st_dev, stat.st_ino)] = digest
+            self._add_blob(digest, path, stat.st_size)
+
+        entries = []
+        for name in os.listdir(self.directory):
+            if not self._is_entry(name):
+                continue
+            path = os.path.join(self.directory, name)
+            stat = os.stat(path)
+            digest = blobs_by_inode.get((stat.st_dev, stat.st_ino))
+            if digest is None:
+                # Копия вместо жесткой ссылки (файловая система без ссылок)
+                digest = known.get(path) or _file_digest(path)
+                if digest not in self._blobs:
+                    os.remove(path)
+                    continue
+            entries.append((stat.st_mtime, os.path.splitext(name)[0], path, digest))
+
+        for _, key, path, digest in sorted(entries):
+            self._entries[key] = (path, digest)
+            self._blob_keys[digest].add(key)
+
+        for digest, keys in list(self._blob_keys.items()):
+            if not keys:
+                self._remove_blob(digest)
+
+    def get(self, key: str, extension: Optional[str] = None) -> Optional[str]:
+        """
+        Путь к аудио для ключа или None
+
+        Без блокировки и обхода каталога: stat файла ключа по точному имени
+        (extension - расширение движка, иначе перебор EXTENSIONS).
+        """
+        for ext in (extension,) if extension else EXTENSIONS:
+            path = os.path.join(self.directory, f"{key}{ext}")
+            try:
+                # Отметка обращения: время изменения файла видят и другие воркеры
+                os.utime(path)
+            except FileNotFoundError:
+                continue
+            return path
+        return None
+
+    def temp_path(self, key: str, extension: str) -> str:
+        """Временный файл, в который синтезируется запись перед put"""
+        os.makedirs(self.directory, exist_ok=True)
+        return os.path.join(self.directory, f"{key}.{os.getpid()}.{threading.get_ident()}.tmp{extension}")
+
+    def put(self, key: str, audio_path: str) -> str:
+        """
+        Сохранение синтезированного файла в кэше
+
+        Файл перемещается в blobs, если такого содержимого там еще нет,
+        иначе удаляется. Файл больше квоты не кэшируется.
+
+        Returns:
+            Путь к аудио для ключа
+        """
+        extension = os.path.splitext(audio_path)[1]
+        path = os.path.join(self.directory, f"{key}{extension}")
+        size = os.path.getsize(audio_path)
+        digest = _file_digest(audio_path)
+
+        if size > self.max_bytes:
+            os.makedirs(self.large_directory, exist_ok=True)
+            large_path = os.path.join(self.large_directory, f"{key}{extension}")
+            os.replace(audio_path, large_path)
+            return large_path
+
+        with self._locked():
+            total = self._read_size()
+            if os.path.exists(path):
+                # Тот же ключ уже синтезировал другой поток или воркер
+                os.remove(audio_path)
+                os.utime(path)
+                return path
+
+            blob_path = os.path.join(self.blob_directory, f"{digest}{extension}")
+            if os.path.exists(blob_path):
+                os.remove(audio_path)
+            else:
+                os.replace(audio_path, blob_path)
+                total += size
+
+            _link_or_copy(blob_path, path)
+            # Ссылка на старый blob наследует его время: запись только что использована
+            os.utime(path)
+            if total > self.max_bytes:
+                total = self._evict(key)
+            self._write_size(total)
+            return path
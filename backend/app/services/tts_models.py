@@ -0,0 +1,55 @@
+"""
+Пул моделей Coqui TTS
+
+Раньше в памяти держалась одна модель, и при чередовании языков каждый
+запрос заново читал Tacotron с диска. Здесь модели по имени хранятся в
+общем реестре моделей с бюджетом группы TTS_MODEL_MEMORY_MB; модели языков
+из TTS_PRELOAD_LANGUAGES загружает и прогревает model_preloader.
+"""
+import threading
+from typing import Any, Dict, List
+from app.core.config import settings
+from app.services.model_registry import model_registry
+
+try:
+    from TTS.api import TTS
+    import torch
+    TTS_AVAILABLE = True
+except ImportError:
+    TTS_AVAILABLE = False
+    TTS = None
+    torch = None
+
+
+class TTSModelPool:
+    """Модели Coqui TTS в общем реестре моделей (группа "tts" с бюджетом TTS_MODEL_MEMORY_MB)"""
+
+    def __init__(self, memory_budget_mb: int = settings.TTS_MODEL_MEMORY_MB):
+        model_registry.set_group_budget("tts", memory_budget_mb)
+        self._lock = threading.Lock()
+        self._synthesis_locks: Dict[str, threading.Lock] = {}
+
+    def is_loaded(self, model_name: str) -> bool:
+        return model_registry.is_loaded(f"coqui:{model_name}")
+
+    def synthesis_lock(self, model_name: str) -> threading.Lock:
+        """Блокировка синтеза на модели: один экземпляр TTS не потокобезопасен"""
+        with self._lock:
+            return self._synthesis_locks.setdefault(model_name, threading.Lock())
+
+    def get(self, model_name: str, gpu: bool = False) -> Any:
+        """Модель по имени (загружается при первом обращении)"""
+        if not TTS_AVAILABLE:
+            raise ImportError("TTS не установлен. Установите: pip install TTS")
+        return model_registry.get(
+            f"coqui:{model_name}",
+            lambda: TTS(model_name, progress_bar=False, gpu=gpu),
+            group="tts"
+        )
+
+    def loaded(self) -> List[Dict[str, Any]]:
+        """Загруженные модели и размер в МБ (от давно использованных к недавним)"""
+        return [
+            {"model": entry["key"][len("coqui:"):], "size_mb": entry["size_mb"]}
+            for entry in model_registry.entries("tts")
+        ]
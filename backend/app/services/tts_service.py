@@ -1,6 +1,13 @@
-from typing import Optional, Dict
+from typing import Optional, Dict, Iterator, List, Tuple
 import os
+import shutil
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from app.core.config import settings
+from app.services.audio_concat import concatenate_audio, mp3_frames, wav_pcm, wav_stream_header
+from app.services.text_spans import chunk_text
+from app.services.tts_cache import TTSCache, cache_key
+from app.services.tts_models import TTSModelPool
 
 try:
     from gtts import gTTS
@@ -23,8 +30,15 @@ class TTSService:
     """Сервис для синтеза речи (Text to Speech)"""
     
     def __init__(self):
-        self.tts_model = None
-        self.current_model = None
+        self.models = TTSModelPool()
+        self.cache = TTSCache()
+        self._chunk_executor = ThreadPoolExecutor(max_workers=settings.TTS_WORKERS)
+        
+        self.gtts_languages = {
+            "ru": "ru", "en": "en", "de": "de", "fr": "fr",
+            "es": "es", "it": "it", "pt": "pt", "tr": "tr",
+            "kk": "ru", "zh": "zh-CN", "ar": "ar"
+        }
         
         self.language_models = {
             "en": "tts_models/en/ljspeech/tacotron2-DDC",  
@@ -51,31 +65,162 @@ class TTSService:
             "tr": ["female"],
         }
     
-    def load_model(self, language: str = "en") -> Optional[TTS]:
-        """
-        Загрузка модели TTS для указанного языка
-        """
+    def _language_model(self, language: str) -> str:
+        """Модель Coqui для языка (без загрузки)"""
+        return self.language_models.get(language, self.language_models["en"])
+    
+    def _load(self, language: str) -> Tuple[Optional[str], Optional[TTS]]:
+        """Имя и экземпляр модели для языка (при ошибке - английская модель на CPU)"""
         if not TTS_AVAILABLE:
             raise ImportError("TTS не установлен. Установите: pip install TTS")
         
-        model_name = self.language_models.get(language, self.language_models["en"])
-        
-        if self.tts_model is not None and self.current_model == model_name:
-            return self.tts_model
+        model_name = self._language_model(language)
         
         try:
             use_gpu = torch.cuda.is_available() if torch else False
-            self.tts_model = TTS(model_name, progress_bar=False, gpu=use_gpu)
-            self.current_model = model_name
-            return self.tts_model
+            return model_name, self.models.get(model_name, gpu=use_gpu)
         except Exception:
             try:
                 fallback_model = "tts_models/en/ljspeech/tacotron2-DDC"
-                self.tts_model = TTS(fallback_model, progress_bar=False, gpu=False)
-                self.current_model = fallback_model
-                return self.tts_model
+                return fallback_model, self.models.get(fallback_model, gpu=False)
             except Exception:
-                return None
+                return None, None
+    
+    def load_model(self, language: str = "en") -> Optional[TTS]:
+        """
+        Загрузка модели TTS для указанного языка
+        """
+        return self._load(language)[1]
+    
+    def _engine_key(
+        self,
+        text: str,
+        language: str,
+        voice: Optional[str],
+        engine: str,
+        model_name: Optional[str] = None
+    ) -> str:
+        """
+        Ключ кэша: для gTTS важен язык gTTS, для Coqui - модель, которая
+        синтезировала аудио (по умолчанию - модель языка)
+        """
+        if engine == "gtts":
+            tts_lang = self.gtts_languages.get(language, "en")
+            return cache_key(text, tts_lang, "slow" if voice == "slow" else None, "gtts")
+        model_name = model_name or self._language_model(language)
+        return cache_key(text, language, voice, f"coqui:{model_name}")
+    
+    def _synthesize_chunk(
+        self,
+        text: str,
+        language: str,
+        voice: Optional[str],
+        engine: str
+    ) -> Tuple[str, bool, Optional[str]]:
+        """
+        Синтез одного фрагмента через кэш
+        
+        Returns:
+            (путь к аудио в кэше, взят ли результат из кэша,
+             модель Coqui, которая синтезировала аудио, - None для gTTS)
+        """
+        key = self._engine_key(text, language, voice, engine)
+        extension = ".mp3" if engine == "gtts" else ".wav"
+        cached_path = self.cache.get(key, extension)
+        if cached_path is not None:
+            return cached_path, True, None if engine == "gtts" else self._language_model(language)
+        
+        loaded_model = tts = None
+        if engine == "coqui":
+            # Попадание в кэш выше не требует загрузки модели
+            loaded_model, tts = self._load(language)
+            if tts is None:
+                raise ValueError("Не удалось загрузить TTS модель")
+            if loaded_model != self._language_model(language):
+                # Запасная модель: аудио кэшируется под ее ключом, а не под
+                # ключом модели языка, которая может загрузиться позже
+                key = self._engine_key(text, language, voice, engine, loaded_model)
+                cached_path = self.cache.get(key, extension)
+                if cached_path is not None:
+                    return cached_path, True, loaded_model
+        
+        temp_path = self.cache.temp_path(key, extension)
+        try:
+            if engine == "gtts":
+                tts = gTTS(text=text, lang=self.gtts_languages.get(language, "en"), slow=voice == "slow")
+                tts.save(temp_path)
+            else:
+                with self.models.synthesis_lock(loaded_model):
+                    if voice and hasattr(tts, 'speakers'):
+                        tts.tts_to_file(
+                            text=text,
+                            file_path=temp_path,
+                            speaker=voice
+                        )
+                    else:
+                        tts.tts_to_file(
+                            text=text,
+                            file_path=temp_path
+                        )
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        return self.cache.put(key, temp_path), False, loaded_model
+    
+    def _synthesize_text(
+        self,
+        text: str,
+        chunks: List[str],
+        language: str,
+        voice: Optional[str],
+        engine: str
+    ) -> Tuple[str, bool]:
+        """Синтез фрагментов параллельно и склейка в один файл (тоже кэшируется)"""
+        if len(chunks) == 1:
+            path, cached, _ = self._synthesize_chunk(chunks[0], language, voice, engine)
+            return path, cached
+        
+        key = self._engine_key(text, language, voice, engine)
+        extension = ".mp3" if engine == "gtts" else ".wav"
+        cached_path = self.cache.get(key, extension)
+        if cached_path is not None:
+            return cached_path, True
+        
+        parts = list(self._chunk_executor.map(
+            lambda chunk: self._synthesize_chunk(chunk, language, voice, engine),
+            chunks
+        ))
+        
+        models = sorted({model for _, _, model in parts if model is not None})
+        if engine == "coqui" and models != [self._language_model(language)]:
+            # Хотя бы один фрагмент синтезирован запасной моделью
+            key = self._engine_key(text, language, voice, engine, "+".join(models))
+        temp_path = self.cache.temp_path(key, extension)
+        try:
+            concatenate_audio([path for path, _, _ in parts], temp_path)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        return self.cache.put(key, temp_path), all(cached for _, cached, _ in parts)
+    
+    def _plan(self, text: str) -> Tuple[List[str], List[str]]:
+        """Фрагменты текста и движки в порядке предпочтения"""
+        if len(text) > settings.TTS_MAX_CHARS:
+            raise ValueError(f"Текст слишком длинный для синтеза: максимум {settings.TTS_MAX_CHARS} символов")
+        chunks = chunk_text(text, settings.TTS_CHUNK_CHARS, settings.TTS_FIRST_CHUNK_CHARS)
+        if not chunks:
+            raise ValueError("Пустой текст для синтеза")
+        
+        engines = []
+        if GTTS_AVAILABLE:
+            engines.append("gtts")
+        if TTS_AVAILABLE:
+            engines.append("coqui")
+        if not engines:
+            raise ValueError("TTS недоступен")
+        return chunks, engines
     
     def synthesize(
         self,
@@ -87,10 +232,14 @@ class TTSService:
         """
         Синтез речи из текста
         
+        Длинный текст делится по предложениям на фрагменты до TTS_CHUNK_CHARS
+        символов, фрагменты синтезируются параллельно (до TTS_WORKERS сразу)
+        и склеиваются без перекодирования: MP3 по кадрам, WAV по PCM-данным.
+        
         Args:
             text: Текст для синтеза
             language: Язык текста
-            output_path: Путь для сохранения аудио (если None, генерируется автоматически)
+            output_path: Путь для сохранения аудио (если None, файл остается в кэше)
             voice: Выбор голоса (опционально)
         
         Returns:
@@ -99,92 +248,125 @@ class TTSService:
         import time
         start_time = time.time()
         
-        if len(text) > 500:
-            text = text[:500]
-        
-        if output_path is None:
-            os.makedirs("uploads/tts", exist_ok=True)
-            timestamp = int(time.time() * 1000)
-            output_path = f"uploads/tts/speech_{language}_{timestamp}.mp3"
+        chunks, engines = self._plan(text)
         
-        if GTTS_AVAILABLE:
+        error = None
+        for engine in engines:
             try:
-                synthesis_start = time.time()
-                
-                lang_map = {
-                    "ru": "ru", "en": "en", "de": "de", "fr": "fr",
-                    "es": "es", "it": "it", "pt": "pt", "tr": "tr",
-                    "kk": "ru", "zh": "zh-CN", "ar": "ar"
-                }
-                tts_lang = lang_map.get(language, "en")
-                
-                is_slow = voice == "slow"
-                
-                tts = gTTS(text=text, lang=tts_lang, slow=is_slow)
-                tts.save(output_path)
-                
-                synthesis_time = time.time() - synthesis_start
-                total_time = time.time() - start_time
-                
-                file_size = os.path.getsize(output_path) if os.path.exists(output_path) else 0
-                
-                return {
-                    "audio_path": output_path,
-                    "language": language,
-                    "voice": f"google_{voice if voice else 'default'}",
-                    "duration_seconds": synthesis_time,
-                    "file_size_bytes": file_size,
-                    "text_length": len(text),
-                    "success": True
-                }
-            except Exception:
-                pass
-        
-        if not TTS_AVAILABLE:
-            raise ValueError("TTS недоступен")
-        
-        tts = self.load_model(language)
-        if tts is None:
-            raise ValueError("Не удалось загрузить TTS модель")
-        
-        output_path = output_path.replace('.mp3', '.wav')
-        
-        try:
-            synthesis_start = time.time()
-            
-            if voice and hasattr(tts, 'speakers'):
-                tts.tts_to_file(
-                    text=text,
-                    file_path=output_path,
-                    speaker=voice
-                )
-            else:
-                tts.tts_to_file(
-                    text=text,
-                    file_path=output_path
-                )
-            
-            synthesis_time = time.time() - synthesis_start
-            total_time = time.time() - start_time
-            
-            file_size = os.path.getsize(output_path) if os.path.exists(output_path) else 0
+                cached_path, cached = self._synthesize_text(text, chunks, language, voice, engine)
+            except Exception as e:
+                error = e
+                continue
             
+            audio_path = self._deliver(cached_path, output_path)
             return {
-                "audio_path": output_path,
+                "audio_path": audio_path,
                 "language": language,
-                "voice": voice or "default",
-                "duration_seconds": synthesis_time,
-                "file_size_bytes": file_size,
+                "voice": f"google_{voice if voice else 'default'}" if engine == "gtts" else voice or "default",
+                "duration_seconds": time.time() - start_time,
+                "file_size_bytes": os.path.getsize(audio_path),
                 "text_length": len(text),
+                "chunks": len(chunks),
+                "cached": cached,
                 "success": True
             }
+        
+        return {
+            "audio_path": None,
+            "error": str(error),
+            "success": False
+        }
+    
+    def synthesize_stream(
+        self,
+        text: str,
+        language: str = "en",
+        voice: Optional[str] = None
+    ) -> Tuple[str, Iterator[bytes]]:
+        """
+        Потоковый синтез речи по фрагментам
+        
+        Первый фрагмент синтезируется до возврата (по нему выбирается движок
+        и формат), остальные - параллельно в пуле TTS_WORKERS, пока клиент
+        проигрывает начало. Фрагменты отдаются по порядку без перекодирования:
+        кадры MP3 для gTTS, PCM под потоковым заголовком WAV для Coqui.
+        
+        Returns:
+            (MIME-тип, итератор байтов аудио)
+        """
+        chunks, engines = self._plan(text)
+        
+        error = None
+        for engine in engines:
+            # Следующие фрагменты начинают синтезироваться вместе с первым
+            pending = deque(
+                self._chunk_executor.submit(self._synthesize_chunk, chunk, language, voice, engine)
+                for chunk in chunks[1:1 + settings.TTS_WORKERS]
+            )
+            try:
+                first_path, _, _ = self._synthesize_chunk(chunks[0], language, voice, engine)
+            except Exception as e:
+                for future in pending:
+                    future.cancel()
+                error = e
+                continue
             
-        except Exception as e:
-            return {
-                "audio_path": None,
-                "error": str(e),
-                "success": False
-            }
+            media_type = "audio/mpeg" if engine == "gtts" else "audio/wav"
+            return media_type, self._stream_chunks(first_path, chunks, pending, language, voice, engine)
+        
+        raise ValueError(f"Ошибка синтеза речи: {error}")
+    
+    def _stream_chunks(
+        self,
+        first_path: str,
+        chunks: List[str],
+        pending: deque,
+        language: str,
+        voice: Optional[str],
+        engine: str
+    ) -> Iterator[bytes]:
+        next_chunk = 1 + len(pending)
+        wav_format = None
+        try:
+            for index in range(len(chunks)):
+                path = first_path if index == 0 else pending.popleft().result()[0]
+                if next_chunk < len(chunks):
+                    pending.append(self._chunk_executor.submit(
+                        self._synthesize_chunk, chunks[next_chunk], language, voice, engine
+                    ))
+                    next_chunk += 1
+                
+                if engine == "gtts":
+                    with open(path, "rb") as f:
+                        yield mp3_frames(f.read())
+                    continue
+                
+                pcm, part_format = wav_pcm(path)
+                if wav_format is None:
+                    wav_format = part_format
+                    yield wav_stream_header(*wav_format)
+                elif part_format != wav_format:
+                    raise ValueError(f"Несовместимый формат WAV во фрагменте {index + 1}")
+                yield pcm
+        finally:
+            # Клиент мог прервать воспроизведение: оставшиеся фрагменты не нужны
+            for future in pending:
+                future.cancel()
+    
+    def _deliver(self, cached_path: str, output_path: Optional[str]) -> str:
+        """Файл из кэша по запрошенному пути (жесткая ссылка, без копирования данных)"""
+        if output_path is None or os.path.abspath(output_path) == os.path.abspath(cached_path):
+            return cached_path
+        # Расширение определяет движок, а не вызывающий код
+        output_path = os.path.splitext(output_path)[0] + os.path.splitext(cached_path)[1]
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+        if os.path.exists(output_path):
+            os.remove(output_path)
+        try:
+            os.link(cached_path, output_path)
+        except OSError:
+            shutil.copyfile(cached_path, output_path)
+        return output_path
     
     def get_available_voices(self, language: str) -> list:
         """
@@ -1,15 +1,19 @@
 from typing import Dict, List, Any, Optional
 import os
+import time
 from app.core.config import settings
+from app.services.model_registry import directory_bytes, model_registry
 from concurrent.futures import ThreadPoolExecutor, as_completed
 import tempfile
 
 try:
     from faster_whisper import WhisperModel
+    from faster_whisper.utils import download_model
     WHISPER_AVAILABLE = True
 except ImportError:
     WHISPER_AVAILABLE = False
     WhisperModel = None
+    download_model = None
 
 try:
     from pyannote.audio import Pipeline
@@ -24,39 +28,55 @@ class WhisperService:
     """Сервис для распознавания речи из аудио/видео файлов (faster-whisper)"""
     
     def __init__(self):
-        self.model = None
         self.model_name = settings.WHISPER_MODEL
-        self.diarization_pipeline = None
+        self.diarization_model = "pyannote/speaker-diarization-3.1"
+        # После ошибки загрузки pipeline (нет токена, сбой сети или HF Hub)
+        # повторная попытка - не раньше чем через DIARIZATION_RETRY_SECONDS
+        self.diarization_retry_at = 0.0
+    
+    def _model_path(self) -> str:
+        """Каталог модели CTranslate2 (после загрузки модель уже в MODELS_DIR)"""
+        if os.path.isdir(self.model_name):
+            return self.model_name
+        return download_model(self.model_name, cache_dir=settings.MODELS_DIR, local_files_only=True)
     
     def load_model(self):
         """Загрузка модели Whisper"""
         if not WHISPER_AVAILABLE:
             raise ImportError("Faster-Whisper не установлен. Установите: pip install faster-whisper")
-        if self.model is None:
-            self.model = WhisperModel(
+        return model_registry.get(
+            f"whisper:{self.model_name}",
+            lambda: WhisperModel(
                 self.model_name,
                 device="cpu",
                 compute_type="int8",  
                 download_root=settings.MODELS_DIR,
                 num_workers=4,  
-            )
-        return self.model
+            ),
+            group="whisper",
+            # Веса CTranslate2 не видны как параметры PyTorch: размер берется с диска
+            measure=lambda _: directory_bytes(self._model_path())
+        )
     
     def load_diarization_pipeline(self):
         """Загрузка pipeline для speaker diarization"""
         if not PYANNOTE_AVAILABLE:
             raise ImportError("pyannote.audio не установлен. Установите: pip install pyannote.audio")
         
-        if self.diarization_pipeline is None:
-            try:
-                self.diarization_pipeline = Pipeline.from_pretrained(
-                    "pyannote/speaker-diarization-3.1",
+        if time.monotonic() < self.diarization_retry_at:
+            return None
+        try:
+            return model_registry.get(
+                f"pyannote:{self.diarization_model}",
+                lambda: Pipeline.from_pretrained(
+                    self.diarization_model,
                     use_auth_token=None  
-                )
-            except Exception:
-                self.diarization_pipeline = None
-        
-        return self.diarization_pipeline
+                ),
+                group="diarization"
+            )
+        except Exception:
+            self.diarization_retry_at = time.monotonic() + settings.DIARIZATION_RETRY_SECONDS
+            return None
     
     def perform_speaker_diarization(self, audio_path: str) -> Optional[Dict[str, Any]]:
         """
@@ -201,6 +221,54 @@ class WhisperService:
             "segments": all_segments if return_timestamps else []
         }
     
+    def transcribe_window(
+        self,
+        audio: Any,
+        language: Optional[str] = None,
+        return_timestamps: bool = False,
+        offset: float = 0.0
+    ) -> Dict[str, Any]:
+        """
+        Распознавание уже декодированного фрагмента (float32, 16 кГц, моно)
+        
+        Args:
+            audio: Массив отсчетов фрагмента
+            language: Язык аудио (None для автоопределения)
+            return_timestamps: Возвращать ли временные метки
+            offset: Начало фрагмента в исходной записи (секунды), прибавляется к меткам
+        """
+        model = self.load_model()
+        segments, info = model.transcribe(
+            audio,
+            language=language,
+            task="transcribe",
+            beam_size=1,
+            best_of=1,
+            temperature=0,
+            vad_filter=True,
+            condition_on_previous_text=False,
+            compression_ratio_threshold=2.4,
+            log_prob_threshold=-1.0,
+            no_speech_threshold=0.6,
+            word_timestamps=False,
+        )
+        
+        texts = []
+        timed = []
+        for segment in segments:
+            texts.append(segment.text)
+            if return_timestamps:
+                timed.append({
+                    "start": segment.start + offset,
+                    "end": segment.end + offset,
+                    "text": segment.text.strip()
+                })
+        return {
+            "text": " ".join(texts).strip(),
+            "language": info.language,
+            "segments": timed
+        }
+    
     def _transcribe_long_audio(
         self,
         audio_path: str,
@@ -0,0 +1,100 @@
+"""
+Бенчмарк пропускной способности определения языка
+
+Сравнивает старую эвристику (два прохода Python по символам, только ru/kk/en)
+с пакетным n-граммным определителем из app.services.language_detector.
+
+Запуск из каталога backend:
+    python -m benchmarks.bench_language_detection
+"""
+import argparse
+import random
+import time
+from typing import Callable, List
+
+from app.services.language_detector import language_detector
+
+
+HELD_OUT = {
+    "ru": ["Поезд отправляется с третьего пути", "Не забудьте свои вещи", "Аптека работает круглосуточно"],
+    "kk": ["Пойыз үшінші жолдан жөнелтіледі", "Заттарыңызды ұмытпаңыз", "Дәріхана тәулік бойы жұмыс істейді"],
+    "en": ["The train departs from platform three", "Do not forget your belongings", "The pharmacy is open around the clock"],
+    "de": ["Der Zug fährt von Gleis drei ab", "Vergessen Sie Ihr Gepäck nicht", "Die Apotheke ist rund um die Uhr geöffnet"],
+    "fr": ["Le train part du quai numéro trois", "N'oubliez pas vos affaires", "La pharmacie est ouverte jour et nuit"],
+    "es": ["El tren sale del andén tres", "No olvide sus pertenencias", "La farmacia está abierta las veinticuatro horas"],
+    "zh": ["火车从三号站台出发", "请不要忘记您的随身物品", "药店全天营业"],
+}
+
+
+def legacy_detect_language(text: str) -> str:
+    """Прежняя реализация TranslationService.detect_language"""
+    cyrillic_chars = sum(1 for char in text if 'Ѐ' <= char <= 'ӿ')
+    latin_chars = sum(1 for char in text if char.isalpha() and ord(char) < 128)
+
+    if cyrillic_chars > latin_chars:
+        if any(char in text for char in ['ә', 'ғ', 'қ', 'ң', 'ө', 'ұ', 'ү', 'һ', 'і']):
+            return "kk"
+        return "ru"
+    return "en"
+
+
+def build_corpus(size: int, seed: int = 0) -> List[str]:
+    """Случайный корпус из предложений всех языков"""
+    rng = random.Random(seed)
+    sentences = [sentence for group in HELD_OUT.values() for sentence in group]
+    return [
+        " ".join(rng.choice(sentences) for _ in range(rng.randint(1, 4)))
+        for _ in range(size)
+    ]
+
+
+def measure(name: str, detect: Callable[[List[str]], List[str]], corpus: List[str], repeats: int):
+    total_chars = sum(len(text) for text in corpus)
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        detect(corpus)
+        best = min(best, time.perf_counter() - start)
+    print(
+        f"{name:<22} {len(corpus) / best:>12,.0f} текстов/с "
+        f"{total_chars / best / 1e6:>8.2f} Мсимв/с"
+    )
+
+
+def accuracy(detect: Callable[[List[str]], List[str]]) -> float:
+    texts = [text for group in HELD_OUT.values() for text in group]
+    expected = [lang for lang, group in HELD_OUT.items() for _ in group]
+    predicted = detect(texts)
+    return sum(p == e for p, e in zip(predicted, expected)) / len(texts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--texts", type=int, default=20000, help="Размер корпуса")
+    parser.add_argument("--batch", type=int, default=256, help="Размер пакета для n-граммного определителя")
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    corpus = build_corpus(args.texts)
+
+    def legacy(texts: List[str]) -> List[str]:
+        return [legacy_detect_language(text) for text in texts]
+
+    def ngram_single(texts: List[str]) -> List[str]:
+        return [language_detector.detect(text) for text in texts]
+
+    def ngram_batched(texts: List[str]) -> List[str]:
+        results = []
+        for start in range(0, len(texts), args.batch):
+            results.extend(language_detector.detect_batch(texts[start:start + args.batch]))
+        return results
+
+    print(f"Корпус: {len(corpus)} текстов, языки: {', '.join(language_detector.languages)}")
+    measure("legacy", legacy, corpus, args.repeats)
+    measure("ngram (по одному)", ngram_single, corpus, args.repeats)
+    measure(f"ngram (пакет {args.batch})", ngram_batched, corpus, args.repeats)
+    print(f"Точность legacy: {accuracy(legacy):.0%}, ngram: {accuracy(ngram_batched):.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Бенчмарк движков OCR: EasyOCR на PyTorch против ONNX Runtime
+
+Для каждого движка создается отдельный Reader, на одних и тех же
+изображениях замеряется время readtext и сравнивается распознанный текст.
+Без --images используются синтетические изображения с текстом.
+
+Запуск из каталога backend:
+    python -m benchmarks.bench_ocr_engines
+    python -m benchmarks.bench_ocr_engines --images photo1.jpg photo2.png --quantize
+"""
+import argparse
+import statistics
+import time
+from typing import List
+
+import cv2
+import easyocr
+import numpy as np
+
+from app.services.ocr_onnx import accelerate_reader
+
+
+LINES = [
+    "Train departs from platform three",
+    "Do not forget your belongings",
+    "Pharmacy is open around the clock",
+    "Exit on the left side",
+]
+
+
+def synthetic_images(count: int, seed: int = 0) -> List[np.ndarray]:
+    """Изображения 1280x960 с несколькими строками текста разного размера"""
+    rng = np.random.default_rng(seed)
+    images = []
+    for _ in range(count):
+        image = np.full((960, 1280, 3), 235, dtype=np.uint8)
+        for row, line in enumerate(LINES):
+            scale = float(rng.uniform(1.0, 2.0))
+            cv2.putText(image, line, (40, 150 + row * 200), cv2.FONT_HERSHEY_SIMPLEX, scale, (20, 20, 20), 2)
+        images.append(image)
+    return images
+
+
+def measure(name: str, reader, images: List[np.ndarray], repeats: int) -> List[str]:
+    reader.readtext(images[0])  # прогрев
+    timings = []
+    texts = []
+    for _ in range(repeats):
+        texts = []
+        for image in images:
+            start = time.perf_counter()
+            results = reader.readtext(cv2.cvtColor(image, cv2.COLOR_BGR2RGB), paragraph=False, detail=1)
+            timings.append(time.perf_counter() - start)
+            texts.append(" ".join(text for _, text, _ in results))
+    print(
+        f"{name:<16} median {statistics.median(timings) * 1000:>8.1f} мс/изобр. "
+        f"p95 {sorted(timings)[int(len(timings) * 0.95) - 1] * 1000:>8.1f} мс"
+    )
+    return texts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", nargs="*", help="Пути к изображениям (по умолчанию синтетические)")
+    parser.add_argument("--count", type=int, default=8, help="Число синтетических изображений")
+    parser.add_argument("--languages", default="en,ru", help="Языки Reader через запятую")
+    parser.add_argument("--quantize", action="store_true", help="Квантование int8 распознавателя")
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    images = [cv2.imread(path) for path in args.images] if args.images else synthetic_images(args.count)
+    languages = args.languages.split(",")
+
+    # Оба движка на float-весах: встроенное квантование EasyOCR на CPU
+    # исказило бы сравнение и не экспортируется в ONNX
+    pytorch_texts = measure("pytorch", easyocr.Reader(languages, gpu=False, quantize=False), images, args.repeats)
+
+    onnx_reader = accelerate_reader(easyocr.Reader(languages, gpu=False, quantize=False), quantize=args.quantize)
+    onnx_name = "onnx int8" if args.quantize else "onnx"
+    onnx_texts = measure(onnx_name, onnx_reader, images, args.repeats)
+
+    same = sum(a == b for a, b in zip(pytorch_texts, onnx_texts))
+    print(f"Совпадение текста: {same}/{len(images)} изображений")
+
+
+if __name__ == "__main__":
+    main()
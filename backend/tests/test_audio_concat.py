@@ -0,0 +1,103 @@
+import wave
+
+import pytest
+
+from app.services.audio_concat import concatenate_audio, mp3_frames, _frame_length
+from app.services.text_spans import chunk_text
+
+
+# MPEG-1 Layer III, 128 кбит/с, 44.1 кГц, без padding: кадр 417 байт
+HEADER = bytes([0xFF, 0xFB, 0x90, 0x00])
+FRAME_LENGTH = 417
+
+
+def frame(fill: int) -> bytes:
+    return HEADER + bytes([fill]) * (FRAME_LENGTH - 4)
+
+
+def info_frame() -> bytes:
+    return HEADER + b"\0" * 32 + b"Info" + b"\0" * (FRAME_LENGTH - 40)
+
+
+def id3v2(payload: bytes = b"\0" * 20) -> bytes:
+    size = len(payload)
+    return b"ID3\x04\x00\x00" + bytes([(size >> 21) & 0x7F, (size >> 14) & 0x7F, (size >> 7) & 0x7F, size & 0x7F]) + payload
+
+
+def write_wav(path, frames: bytes, rate: int = 16000, channels: int = 1):
+    with wave.open(str(path), "wb") as f:
+        f.setnchannels(channels)
+        f.setsampwidth(2)
+        f.setframerate(rate)
+        f.writeframes(frames)
+
+
+def test_frame_length_from_header():
+    assert _frame_length(HEADER) == FRAME_LENGTH
+    assert _frame_length(bytes([0xFF, 0xFB, 0x92, 0x00])) == FRAME_LENGTH + 1
+    assert _frame_length(b"RIFF") is None
+
+
+def test_mp3_frames_strip_tags_and_info_frame():
+    data = id3v2() + info_frame() + frame(1) + frame(2) + b"TAG" + b"\0" * 125
+
+    assert mp3_frames(data) == frame(1) + frame(2)
+    assert mp3_frames(frame(3)) == frame(3)
+
+
+def test_concatenate_mp3_keeps_only_audio_frames(tmp_path):
+    paths = []
+    for index in range(3):
+        path = tmp_path / f"part{index}.mp3"
+        path.write_bytes(id3v2() + info_frame() + frame(index))
+        paths.append(str(path))
+
+    output = concatenate_audio(paths, str(tmp_path / "out.mp3"))
+
+    assert open(output, "rb").read() == frame(0) + frame(1) + frame(2)
+
+
+def test_concatenate_wav_appends_pcm_under_one_header(tmp_path):
+    write_wav(tmp_path / "a.wav", b"\x01\x00" * 100)
+    write_wav(tmp_path / "b.wav", b"\x02\x00" * 50)
+
+    output = concatenate_audio([str(tmp_path / "a.wav"), str(tmp_path / "b.wav")], str(tmp_path / "out.wav"))
+
+    with wave.open(output, "rb") as f:
+        assert f.getframerate() == 16000
+        assert f.getnframes() == 150
+        assert f.readframes(150) == b"\x01\x00" * 100 + b"\x02\x00" * 50
+
+
+def test_concatenate_rejects_mismatched_wav_and_unknown_format(tmp_path):
+    write_wav(tmp_path / "a.wav", b"\0\0" * 10, rate=16000)
+    write_wav(tmp_path / "b.wav", b"\0\0" * 10, rate=22050)
+    (tmp_path / "a.ogg").write_bytes(b"OggS")
+    (tmp_path / "b.ogg").write_bytes(b"OggS")
+
+    with pytest.raises(ValueError):
+        concatenate_audio([str(tmp_path / "a.wav"), str(tmp_path / "b.wav")], str(tmp_path / "out.wav"))
+    with pytest.raises(ValueError):
+        concatenate_audio([str(tmp_path / "a.ogg"), str(tmp_path / "b.ogg")], str(tmp_path / "out.ogg"))
+    with pytest.raises(ValueError):
+        concatenate_audio([], str(tmp_path / "out.mp3"))
+
+
+def test_single_part_is_copied(tmp_path):
+    (tmp_path / "a.mp3").write_bytes(id3v2() + frame(1))
+
+    output = concatenate_audio([str(tmp_path / "a.mp3")], str(tmp_path / "out.mp3"))
+
+    assert open(output, "rb").read() == id3v2() + frame(1)
+
+
+def test_chunk_text_groups_sentences_with_smaller_first_chunk():
+    text = " ".join(f"Sentence number {index} is here." for index in range(20))
+
+    chunks = chunk_text(text, max_chars=100, first_max_chars=40)
+
+    assert " ".join(chunks) == text
+    assert len(chunks[0]) <= 40
+    assert all(len(chunk) <= 100 for chunk in chunks)
+    assert len(chunks[1]) > 40
+    assert chunk_text("   ") == []
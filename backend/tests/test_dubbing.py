@@ -0,0 +1,51 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from app.core.config import settings
+from app.services.dubbing_service import DubbingService, fit_to_slot
+
+
+def test_short_clip_is_padded_with_silence():
+    clip = np.ones(100, dtype=np.float32)
+
+    fitted = fit_to_slot(clip, 150, max_speedup=1.5)
+
+    assert len(fitted) == 150
+    assert fitted[:100].tolist() == [1.0] * 100
+    assert not fitted[100:].any()
+
+
+def test_long_clip_is_sped_up_to_fit_slot():
+    clip = np.linspace(0, 1, 120, dtype=np.float32)
+
+    fitted = fit_to_slot(clip, 100, max_speedup=1.5)
+
+    assert len(fitted) == 100
+    assert fitted[0] == 0.0 and fitted[-1] == pytest.approx(1.0)
+    assert np.all(np.diff(fitted) > 0)
+
+
+def test_speedup_is_capped_and_rest_is_cut_with_fade():
+    clip = np.ones(300, dtype=np.float32)
+
+    fitted = fit_to_slot(clip, 100, max_speedup=1.5)
+
+    assert len(fitted) == 100
+    assert fitted[-1] == 0.0
+    assert fitted[0] == 1.0
+    assert len(fit_to_slot(clip, 0, max_speedup=1.5)) == 0
+
+
+def test_slots_run_until_next_segment_and_tail_after_last(monkeypatch):
+    monkeypatch.setattr(settings, "DUB_TAIL_SECONDS", 1.0)
+    service = DubbingService()
+    service.sample_rate = 100
+    segments = [
+        {"start": 0.0, "end": 1.5},
+        {"start": 2.0, "end": 3.0},
+        {"start": 2.5, "end": 4.0},
+    ]
+
+    assert service._slots(segments) == [200, 50, 250]
+    assert service._slots([{"start": 3.0, "end": 2.0}]) == [0]
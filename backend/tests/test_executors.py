@@ -0,0 +1,127 @@
+import asyncio
+import threading
+
+import pytest
+
+from app.services.executors import ExecutorBusyError, ServiceExecutor
+
+
+@pytest.fixture
+def executor():
+    executor = ServiceExecutor("test", workers=1, queue_limit=1)
+    yield executor
+    executor.shutdown()
+
+
+def block(executor):
+    """Единственный поток пула занят, пока не выставлено событие"""
+    started, release = threading.Event(), threading.Event()
+
+    def wait():
+        started.set()
+        release.wait(5)
+
+    future = executor.submit(wait)
+    assert started.wait(5)
+    return future, release
+
+
+def test_queue_limit_rejects_and_counts(executor):
+    running, release = block(executor)
+    queued = executor.submit(lambda: "queued")
+
+    with pytest.raises(ExecutorBusyError):
+        executor.submit(lambda: "rejected")
+
+    release.set()
+    assert running.result(5) is None
+    assert queued.result(5) == "queued"
+    stats = executor.stats()
+    assert stats["rejected"] == 1
+    assert stats["completed"] == 2
+    assert stats["queued"] == 0
+    assert stats["running"] == 0
+
+
+def test_cancel_before_start_leaves_queue(executor):
+    running, release = block(executor)
+    queued = executor.submit(lambda: "never")
+    assert executor.queued == 1
+
+    assert queued.cancel()
+    assert executor.queued == 0
+    # Освободившееся место в очереди снова принимает задачи
+    accepted = executor.submit(lambda: "accepted")
+
+    release.set()
+    assert accepted.result(5) == "accepted"
+    assert executor.stats()["completed"] == 2
+
+
+def test_iterate_runs_steps_in_pool(executor):
+    threads = []
+
+    def generate():
+        for i in range(3):
+            threads.append(threading.current_thread().name)
+            yield i
+
+    async def collect():
+        return [item async for item in await executor.iterate(generate())]
+
+    assert asyncio.run(collect()) == [0, 1, 2]
+    assert threads and all(name.startswith("test-executor") for name in threads)
+    # Первый шаг и по шагу на каждый следующий элемент и конец потока
+    assert executor.stats()["completed"] == 4
+
+
+def test_iterate_busy_before_stream_opens(executor):
+    running, release = block(executor)
+    executor.submit(lambda: None)
+    opened = []
+
+    def generate():
+        opened.append(True)
+        yield "data"
+
+    with pytest.raises(ExecutorBusyError):
+        asyncio.run(executor.iterate(generate()))
+
+    release.set()
+    running.result(5)
+    assert opened == []
+
+
+def test_iterate_continues_past_queue_limit(executor):
+    async def stream():
+        events = await executor.iterate(iter(["a", "b"]))
+        items = [await events.__anext__()]
+        # Очередь заполнилась после открытия потока: принятый поток не обрывается
+        running, release = block(executor)
+        executor.submit(lambda: None)
+        threading.Timer(0.05, release.set).start()
+        items += [item async for item in events]
+        running.result(5)
+        return items
+
+    assert asyncio.run(stream()) == ["a", "b"]
+    assert executor.rejected == 0
+
+
+def test_iterate_closes_generator_on_disconnect(executor):
+    closed = threading.Event()
+
+    def generate():
+        try:
+            yield 1
+            yield 2
+        finally:
+            closed.set()
+
+    async def disconnect():
+        events = await executor.iterate(generate())
+        assert await events.__anext__() == 1
+        await events.aclose()
+
+    asyncio.run(disconnect())
+    assert closed.wait(5)
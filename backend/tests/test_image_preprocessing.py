@@ -0,0 +1,89 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from app.services.image_preprocessing import (
+    downscale_factor,
+    plan_tiles,
+    merge_tile_boxes,
+    edge_density,
+    text_regions,
+)
+
+
+def test_downscale_targets_small_lines_and_never_upscales():
+    assert downscale_factor([80, 80, 200, 200], target_height=20, min_scale=0.25) == 0.25
+    assert downscale_factor([40, 40, 40, 100], target_height=20, min_scale=0.25) == 0.5
+    assert downscale_factor([10, 12], target_height=20, min_scale=0.25) == 1.0
+    assert downscale_factor([], target_height=20, min_scale=0.25) == 1.0
+
+
+def test_downscale_needs_enough_boxes():
+    assert downscale_factor([100], target_height=20, min_scale=0.25, min_boxes=3) == 1.0
+
+
+def test_downscale_is_capped_by_probe_detection_limit():
+    # Строка чуть ниже предела пробы (30 px) должна остаться не меньше 15 px
+    scale = downscale_factor(
+        [200, 200, 200], target_height=20, min_scale=0.05,
+        undetected_height=30, readable_height=15
+    )
+    assert scale == 0.5
+
+
+def test_small_or_regular_images_are_not_tiled():
+    assert plan_tiles(1000, 800, tile_size=1600, overlap=100, max_aspect=2.5) == [(0, 1000, 0, 800)]
+    assert plan_tiles(3000, 2000, tile_size=1600, overlap=100, max_aspect=2.5) == [(0, 3000, 0, 2000)]
+
+
+def test_tall_image_is_covered_by_overlapping_tiles():
+    tiles = plan_tiles(10000, 1000, tile_size=1600, overlap=200, max_aspect=2.5)
+
+    assert all(x0 == 0 and x1 == 1000 for _, _, x0, x1 in tiles)
+    assert all(y1 - y0 == 1600 for y0, y1, _, _ in tiles)
+    assert tiles[0][0] == 0 and tiles[-1][1] == 10000
+    assert all(next_y0 <= y1 - 200 for (_, y1, _, _), (next_y0, _, _, _) in zip(tiles, tiles[1:]))
+
+
+def test_wide_image_is_tiled_horizontally():
+    tiles = plan_tiles(500, 6000, tile_size=1600, overlap=200, max_aspect=2.5)
+
+    assert all(y0 == 0 and y1 == 500 for y0, y1, _, _ in tiles)
+    assert tiles[-1][3] == 6000
+
+
+def test_merge_drops_truncated_duplicate_from_other_tile():
+    rects = np.array([
+        [10, 1500, 400, 1540],
+        [10, 1500, 250, 1540],
+        [10, 100, 400, 140],
+        [20, 105, 200, 135],
+    ], dtype=np.float32)
+    scores = np.array([0.9, 0.95, 0.8, 0.7])
+    tile_ids = np.array([0, 1, 0, 0])
+
+    # Вложенная рамка из той же плитки - другая строка, она остается
+    assert merge_tile_boxes(rects, scores, tile_ids).tolist() == [0, 2, 3]
+    assert merge_tile_boxes(np.zeros((0, 4)), np.zeros(0), np.zeros(0)).tolist() == []
+
+
+def test_edge_density_separates_text_from_flat_background():
+    flat = np.full((100, 100), 128, dtype=np.uint8)
+    stripes = np.tile(np.array([0, 255] * 50, dtype=np.uint8), (100, 1))
+
+    assert edge_density(flat) == 0.0
+    assert edge_density(stripes) == 1.0
+    assert edge_density(np.zeros((1, 10), dtype=np.uint8)) == 0.0
+
+
+def test_text_regions_merge_overlapping_boxes():
+    boxes = [[10, 100, 10, 30], [90, 200, 20, 40], [500, 600, 500, 520]]
+
+    regions = text_regions(boxes, height=1000, width=1000, margin=5, max_coverage=0.5)
+
+    assert sorted(regions) == [(5, 45, 5, 205), (495, 525, 495, 605)]
+
+
+def test_text_regions_fall_back_to_full_image():
+    assert text_regions([[0, 900, 0, 900]], height=1000, width=1000, margin=0, max_coverage=0.5) is None
+    assert text_regions([], height=1000, width=1000, margin=0, max_coverage=0.5) is None
@@ -0,0 +1,47 @@
+import pytest
+
+pytest.importorskip("numpy")
+
+from app.services.language_detector import LanguageDetector
+
+
+@pytest.fixture(scope="module")
+def detector():
+    return LanguageDetector()
+
+
+@pytest.mark.parametrize("text, language", [
+    ("Добрый вечер, где находится ближайшая станция метро?", "ru"),
+    ("Сәлеметсіз бе, ең жақын метро бекеті қайда орналасқан?", "kk"),
+    ("Good evening, where is the nearest subway station?", "en"),
+    ("Guten Abend, wo ist die nächste U-Bahn-Station?", "de"),
+    ("Bonsoir, où se trouve la station de métro la plus proche?", "fr"),
+    ("Buenas noches, ¿dónde está la estación de metro más cercana?", "es"),
+    ("晚上好，最近的地铁站在哪里？", "zh"),
+])
+def test_detects_sentence_language(detector, text, language):
+    assert detector.detect(text) == language
+
+
+def test_batch_keeps_input_order_and_matches_single_calls(detector):
+    texts = ["Спасибо за помощь", "Thank you for your help", "Vielen Dank für Ihre Hilfe", "谢谢你的帮助"]
+
+    assert detector.detect_batch(texts) == [detector.detect(text) for text in texts]
+    assert detector.detect_batch(texts) == ["ru", "en", "de", "zh"]
+
+
+def test_strings_without_enough_letters_get_default(detector):
+    assert detector.detect_batch(["12:45", "", "!!!"], default=None) == [None, None, None]
+    assert detector.detect_batch(["ok"], default="ru", min_letters=3) == ["ru"]
+    assert detector.detect("2024") == "en"
+
+
+def test_empty_batch(detector):
+    assert detector.detect_batch([]) == []
+
+
+def test_scores_have_row_per_text_and_count_letters(detector):
+    scores, letters = detector.scores(["abc 123", "где"])
+
+    assert scores.shape == (2, len(detector.languages))
+    assert letters.tolist() == [3, 3]
@@ -0,0 +1,122 @@
+import time
+
+import pytest
+
+from app.services.model_registry import ModelRegistry, parameter_bytes
+
+MB = 1024 * 1024
+
+
+def size(megabytes):
+    return lambda model: megabytes * MB
+
+
+@pytest.fixture
+def registry():
+    return ModelRegistry(budget_mb=100, rss_limit_mb=0, idle_ttl=0)
+
+
+def load(registry, key, megabytes, group=None):
+    return registry.get(key, lambda: {"name": key}, group=group, measure=size(megabytes))
+
+
+def keys(registry):
+    return [entry["key"] for entry in registry.entries()]
+
+
+def test_model_is_loaded_once(registry):
+    calls = []
+    loader = lambda: calls.append(1) or object()
+
+    first = registry.get("a", loader, measure=size(10))
+    second = registry.get("a", loader, measure=size(10))
+
+    assert first is second
+    assert len(calls) == 1
+    assert registry.entries()[0]["uses"] == 2
+
+
+def test_least_recently_used_model_is_evicted_over_budget(registry):
+    load(registry, "a", 40)
+    load(registry, "b", 40)
+    load(registry, "a", 40)
+
+    load(registry, "c", 40)
+
+    assert keys(registry) == ["a", "c"]
+
+
+def test_group_budget_evicts_only_group_members(registry):
+    registry.set_group_budget("ocr", 50)
+    load(registry, "nllb", 30)
+    load(registry, "ocr:latin", 30, group="ocr")
+
+    load(registry, "ocr:cyrillic", 30, group="ocr")
+
+    assert keys(registry) == ["nllb", "ocr:cyrillic"]
+
+
+def test_pinned_model_is_never_evicted(registry):
+    load(registry, "a", 60)
+    assert registry.pin("a")
+    assert not registry.pin("missing")
+
+    load(registry, "b", 60)
+
+    assert keys(registry) == ["a", "b"]
+    assert registry.entries()[0]["pinned"]
+
+
+def test_model_larger_than_budget_warns_and_stays(registry):
+    with pytest.warns(RuntimeWarning):
+        load(registry, "huge", 150)
+
+    assert keys(registry) == ["huge"]
+    assert registry.entries()[0]["over_budget"]
+
+
+def test_idle_models_are_unloaded_after_ttl():
+    registry = ModelRegistry(budget_mb=100, rss_limit_mb=0, idle_ttl=0.05)
+    registry.reaping = False
+    load(registry, "old", 10)
+    load(registry, "pinned", 10)
+    registry.pin("pinned")
+    time.sleep(0.1)
+    load(registry, "fresh", 10)
+
+    assert registry.unload_idle() == ["old"]
+    assert keys(registry) == ["pinned", "fresh"]
+
+
+def test_failed_measurement_keeps_loaded_model(registry):
+    calls = []
+
+    def measure(model):
+        raise FileNotFoundError("model directory not in cache")
+
+    def loader():
+        calls.append(1)
+        return {"weights": None}
+
+    with pytest.warns(RuntimeWarning):
+        model = registry.get("whisper", loader, measure=measure)
+
+    assert registry.get("whisper", loader, measure=measure) is model
+    assert len(calls) == 1
+    assert registry.entries()[0]["measured"] in ("parameters", "rss")
+
+
+def test_unload(registry):
+    load(registry, "a", 10)
+
+    assert registry.unload("a")
+    assert not registry.unload("a")
+    assert not registry.is_loaded("a")
+
+
+def test_parameter_bytes_walks_wrappers():
+    torch = pytest.importorskip("torch")
+    layer = torch.nn.Linear(10, 10)
+
+    assert parameter_bytes((layer, "tokenizer")) == 110 * 4
+    assert parameter_bytes({"not": "a model"}) == 0
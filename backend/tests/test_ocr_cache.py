@@ -0,0 +1,102 @@
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+np = pytest.importorskip("numpy")
+
+from app.services.ocr_cache import OCRCache, hamming
+
+
+LINES = ["INVOICE No 2024-118", "Customer: ACME LLC", "Item: consulting", None, "Thank you!"]
+
+
+def invoice(price: str):
+    """Счет 1200x900 с одной отличающейся строкой и рамки строк в формате readtext"""
+    image = np.full((900, 1200, 3), 255, dtype=np.uint8)
+    results = []
+    for index, text in enumerate(LINES):
+        text = text or f"Price: {price}"
+        x, y = 80, 120 + index * 120
+        cv2.putText(image, text, (x, y), cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0, 0, 0), 2, cv2.LINE_AA)
+        (width, height), baseline = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, 1.0, 2)
+        box = [[x, y - height], [x + width, y - height], [x + width, y + baseline], [x, y + baseline]]
+        results.append((box, text, 0.99))
+    return image, results
+
+
+def jpeg(image, quality=70):
+    _, encoded = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    return cv2.imdecode(encoded, cv2.IMREAD_COLOR)
+
+
+def test_same_layout_with_different_small_text_is_not_reused():
+    cache = OCRCache(capacity=10)
+    first, first_results = invoice("100 USD")
+    second, _ = invoice("900 EUR")
+    first_features, second_features = cache.describe(first), cache.describe(second)
+    # Миниатюры такие счета не различают: решает только сверка в полном разрешении
+    assert hamming(first_features["hash"], second_features["hash"]) <= cache.max_distance
+    assert float(first_features["thumbnail"] @ second_features["thumbnail"]) >= cache.min_correlation
+
+    cache.store(first_features, first_results)
+
+    assert cache.lookup(second_features) is None
+
+
+def test_identical_pixels_hit_exactly():
+    cache = OCRCache(capacity=10)
+    image, results = invoice("100 USD")
+    cache.store(cache.describe(image), results)
+
+    assert cache.lookup(cache.describe(image.copy())) == results
+
+
+def test_recompressed_and_resized_copy_is_confirmed():
+    cache = OCRCache(capacity=10)
+    image, results = invoice("100 USD")
+    cache.store(cache.describe(image), results)
+
+    recompressed = cache.lookup(cache.describe(jpeg(image)))
+    assert [text for _, text, _ in recompressed] == [text for _, text, _ in results]
+
+    smaller = cv2.resize(image, (1000, 750), interpolation=cv2.INTER_AREA)
+    resized = cache.lookup(cache.describe(smaller))
+    assert [text for _, text, _ in resized] == [text for _, text, _ in results]
+    x, y = results[0][0][0]
+    assert resized[0][0][0] == [round(x * 1000 / 1200), round(y * 750 / 900)]
+
+    half = cv2.resize(jpeg(image), (600, 450), interpolation=cv2.INTER_AREA)
+    assert cache.lookup(cache.describe(half)) is not None
+
+
+def test_downscaled_copy_of_different_invoice_is_not_reused():
+    cache = OCRCache(capacity=10)
+    first, first_results = invoice("100 USD")
+    second, _ = invoice("900 EUR")
+    cache.store(cache.describe(first), first_results)
+
+    half = cv2.resize(jpeg(second), (600, 450), interpolation=cv2.INTER_AREA)
+    assert cache.lookup(cache.describe(half)) is None
+
+
+def test_image_without_text_is_reused_only_on_exact_match():
+    cache = OCRCache(capacity=10)
+    blank = np.tile(np.linspace(180, 250, 800, dtype=np.uint8)[None, :, None], (600, 1, 3))
+    cache.store(cache.describe(blank), [])
+
+    assert cache.lookup(cache.describe(blank.copy())) == []
+    assert cache.lookup(cache.describe(jpeg(blank))) is None
+
+
+def test_text_added_outside_cached_boxes_is_not_reused():
+    cache = OCRCache(capacity=10)
+    image, results = invoice("100 USD")
+    cache.store(cache.describe(image), results)
+
+    extended = image.copy()
+    cv2.putText(extended, "Note: paid", (700, 720), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 0), 1, cv2.LINE_AA)
+    original, features = cache.describe(image), cache.describe(jpeg(extended))
+    # Миниатюры и вырезки старых рамок лишнюю строку не замечают
+    assert hamming(original["hash"], features["hash"]) <= cache.max_distance
+    assert float(original["thumbnail"] @ features["thumbnail"]) >= cache.min_correlation
+
+    assert cache.lookup(features) is None
@@ -0,0 +1,52 @@
+import os
+import threading
+import time
+
+import pytest
+
+from app.core.config import settings
+from app.services import ocr_onnx
+
+
+@pytest.fixture
+def models_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "MODELS_DIR", str(tmp_path))
+    return tmp_path / "onnx"
+
+
+def test_concurrent_exports_publish_complete_model(models_dir):
+    barrier = threading.Barrier(4)
+    temp_paths = []
+
+    def export(module, path):
+        temp_paths.append(path)
+        barrier.wait()
+        with open(path, "wb") as handle:
+            for _ in range(50):
+                handle.write(module)
+                time.sleep(0.001)
+
+    threads = [
+        threading.Thread(target=ocr_onnx._cached_export, args=("craft", export, b"x" * 1000))
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(set(temp_paths)) == 4
+    assert os.listdir(models_dir) == ["craft.onnx"]
+    assert (models_dir / "craft.onnx").stat().st_size == 50 * 1000
+
+
+def test_failed_export_leaves_no_files(models_dir):
+    def export(module, path):
+        with open(path, "wb") as handle:
+            handle.write(b"partial")
+        raise RuntimeError("export failed")
+
+    with pytest.raises(RuntimeError):
+        ocr_onnx._cached_export("craft", export, None)
+
+    assert os.listdir(models_dir) == []
@@ -0,0 +1,61 @@
+import os
+import socket
+import sys
+import types
+
+import pytest
+
+from app import server
+from app.core.config import settings
+from app.services import model_registry
+
+
+pytestmark = pytest.mark.skipif(not hasattr(os, "fork"), reason="pre-fork сервер требует os.fork")
+
+
+def test_crashing_worker_logs_traceback(monkeypatch, capfd):
+    class Server:
+        def __init__(self, config):
+            pass
+
+        def run(self, sockets):
+            raise RuntimeError("startup failed in lifespan")
+
+    monkeypatch.setitem(sys.modules, "uvicorn", types.SimpleNamespace(Server=Server, Config=lambda app, lifespan: None))
+    monkeypatch.setattr(server, "_limit_torch_threads", lambda threads: None)
+
+    with socket.socket() as sock:
+        pid = server.spawn_worker(None, sock, 1)
+        _, status = os.waitpid(pid, 0)
+
+    assert os.waitstatus_to_exitcode(status) == 1
+    err = capfd.readouterr().err
+    assert "Traceback" in err
+    assert "startup failed in lifespan" in err
+
+
+def test_workers_over_memory_limit_are_selected(monkeypatch):
+    monkeypatch.setattr(settings, "SERVER_WORKER_MEMORY_MB", 100)
+    memory = {1: 50 * 1024 * 1024, 2: 150 * 1024 * 1024, 3: 500 * 1024 * 1024, 4: None}
+    monkeypatch.setattr(model_registry, "private_rss", lambda pid=None: memory[pid])
+
+    assert server.oversized_workers({1: 0.0, 2: 0.0, 3: 0.0, 4: 0.0}, terminating={3}) == {2}
+
+    monkeypatch.setattr(settings, "SERVER_WORKER_MEMORY_MB", 0)
+    assert server.oversized_workers({2: 0.0}, terminating=set()) == set()
+
+
+def test_private_rss_of_other_process():
+    if not os.path.exists("/proc/self/statm"):
+        pytest.skip("нет /proc")
+
+    assert model_registry.private_rss(os.getpid()) == pytest.approx(model_registry.private_rss(), rel=0.5)
+    assert model_registry.private_rss(2 ** 22 + 12345) is None
+
+
+def test_onnx_ocr_is_loaded_in_workers(monkeypatch):
+    monkeypatch.setattr(settings, "OCR_ENGINE", "pytorch")
+    assert server.fork_unsafe_models() == ("whisper",)
+
+    monkeypatch.setattr(settings, "OCR_ENGINE", "onnx")
+    assert server.fork_unsafe_models() == ("whisper", "ocr")
@@ -0,0 +1,68 @@
+import pytest
+
+from app.services.text_layout import group_text_blocks
+
+
+def box(text, x_min, y_min, x_max, y_max, confidence=0.9):
+    return {
+        "text": text,
+        "confidence": confidence,
+        "bbox": {"x_min": x_min, "y_min": y_min, "x_max": x_max, "y_max": y_max},
+    }
+
+
+def test_words_on_one_line_are_joined_left_to_right():
+    blocks = group_text_blocks([
+        box("world", 130, 10, 220, 40),
+        box("Hello", 20, 12, 110, 40, confidence=0.5),
+    ])
+
+    assert len(blocks) == 1
+    assert blocks[0]["text"] == "Hello world"
+    assert blocks[0]["line_count"] == 1
+    assert blocks[0]["box_indices"] == [1, 0]
+    assert blocks[0]["confidence"] == 0.9
+    assert blocks[0]["bbox"] == {"x_min": 20, "y_min": 10, "x_max": 220, "y_max": 40}
+
+
+def test_close_lines_form_paragraph_and_distant_text_is_separate():
+    blocks = group_text_blocks([
+        box("Opening", 20, 10, 140, 40),
+        box("hours", 160, 10, 240, 40),
+        box("9:00 - 18:00", 20, 50, 200, 80),
+        box("SALE", 20, 400, 300, 480),
+        box("Exit", 600, 10, 680, 40),
+    ])
+
+    assert [block["text"] for block in blocks] == ["Opening hours 9:00 - 18:00", "Exit", "SALE"]
+    assert blocks[0]["line_count"] == 2
+
+
+def test_large_heading_is_not_merged_with_small_text():
+    blocks = group_text_blocks([
+        box("TITLE", 20, 10, 400, 110),
+        box("small print", 20, 115, 200, 135),
+    ])
+
+    assert [block["text"] for block in blocks] == ["TITLE", "small print"]
+
+
+def test_chinese_fragments_are_joined_without_space():
+    blocks = group_text_blocks([box("你好", 10, 10, 60, 40), box("世界", 70, 10, 120, 40)])
+
+    assert blocks[0]["text"] == "你好世界"
+    assert group_text_blocks([]) == []
+
+
+def test_fit_picks_largest_size_that_wraps_into_box():
+    pytest.importorskip("PIL")
+    from app.services.text_layout import glyph_metrics_for
+
+    metrics = glyph_metrics_for("Нажмите кнопку, чтобы продолжить")
+    size, lines = metrics.fit("Нажмите кнопку, чтобы продолжить", width=200, height=120)
+
+    assert len(lines) > 1
+    assert " ".join(lines) == "Нажмите кнопку, чтобы продолжить"
+    assert len(lines) * size * metrics.line_ratio <= 120
+    assert all(metrics.font(size).getlength(line) <= 202 for line in lines)
+
@@ -0,0 +1,103 @@
+import pytest
+
+pytest.importorskip("numpy")
+
+from app.services.text_spans import split_spans, join_spans
+from app.services.translation_service import TranslationService
+
+
+def test_split_spans_round_trips_text():
+    text = "Первое предложение.  Второе!\n\n  Третья строка\nЧетвертая? 你好。世界"
+    spans = split_spans(text)
+
+    assert "".join(span + separator for span, separator in spans) == text
+    assert [span.strip() for span, _ in spans] == [
+        "Первое предложение.", "Второе!", "Третья строка", "Четвертая?", "你好。", "世界"
+    ]
+
+
+def test_long_span_is_split_by_words():
+    text = " ".join(["word"] * 50)
+    spans = split_spans(text, max_chars=40)
+
+    assert "".join(span + separator for span, separator in spans) == text
+    assert all(len(span) <= 40 for span, _ in spans)
+
+
+def test_join_spans_replaces_by_stripped_text_and_keeps_layout():
+    spans = split_spans("Hello.  Bye!\n12:00")
+
+    assert join_spans(spans, {"Hello.": "Привет.", "Bye!": "Пока!"}) == "Привет.  Пока!\n12:00"
+
+
+@pytest.fixture
+def service(monkeypatch):
+    service = TranslationService()
+    service.memory.capacity = 0
+    calls = []
+
+    def translate_group(texts, source_language, target_language):
+        calls.append((list(texts), source_language, target_language))
+        return [f"<{target_language}>{text}" for text in texts]
+
+    monkeypatch.setattr(service, "_translate_group", translate_group)
+    service.calls = calls
+    return service
+
+
+def test_repeated_spans_are_translated_once(service):
+    text = "Press the button to continue.\nPress the button to continue.\nThank you for waiting here."
+
+    result = service.translate_document(text, "en", ["ru"])
+
+    assert service.calls == [(["Press the button to continue.", "Thank you for waiting here."], "en", "ru")]
+    assert result["translations"]["ru"] == (
+        "<ru>Press the button to continue.\n<ru>Press the button to continue.\n<ru>Thank you for waiting here."
+    )
+
+
+def test_spans_in_target_language_and_without_letters_are_kept(service):
+    text = "Добро пожаловать в наш магазин.\nOpening hours are from nine to six.\n09:00 - 18:00"
+
+    result = service.translate_document(text, None, ["ru", "en"])
+
+    assert sorted(service.calls) == [
+        (["Opening hours are from nine to six."], "en", "ru"),
+        (["Добро пожаловать в наш магазин."], "ru", "en"),
+    ]
+    assert result["translations"]["ru"] == (
+        "Добро пожаловать в наш магазин.\n<ru>Opening hours are from nine to six.\n09:00 - 18:00"
+    )
+    assert result["translations"]["en"] == (
+        "<en>Добро пожаловать в наш магазин.\nOpening hours are from nine to six.\n09:00 - 18:00"
+    )
+
+
+@pytest.mark.parametrize("text, language", [("Привет", "ru"), ("你好世界", "zh")])
+def test_short_text_with_auto_source_keeps_its_language(service, text, language):
+    result = service.translate_document(text, None, ["en", "ru"])
+
+    assert result["source_language"] == language
+    assert result["translations"]["en"] == f"<en>{text}"
+    assert ([text], language, "en") in service.calls
+    assert all(source == language for _, source, _ in service.calls)
+
+
+def test_cached_spans_are_not_sent_again(service):
+    service.translate_document("Thank you for waiting here.", "en", ["ru"])
+    service.translate_document("Thank you for waiting here. See you tomorrow morning.", "en", ["ru"])
+
+    assert service.calls[1] == (["See you tomorrow morning."], "en", "ru")
+
+
+def test_languages_are_yielded_as_completed_from_one_plan(service, monkeypatch):
+    plans = []
+    plan_spans = service._plan_spans
+    monkeypatch.setattr(service, "_plan_spans", lambda *args: plans.append(args) or plan_spans(*args))
+    text = "Press the button to continue.\nPress the button to continue.\nДобро пожаловать в наш магазин."
+
+    translated = dict(service.translate_as_completed(text, None, ["ru", "kk", "en", "ru"]))
+
+    assert len(plans) == 1
+    assert translated == service.translate_document(text, None, ["ru", "kk", "en"])["translations"]
+    assert list(service.translate_as_completed(text, None, [])) == []
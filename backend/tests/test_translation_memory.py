@@ -0,0 +1,63 @@
+from app.services.translation_memory import TranslationMemory, char_ngrams, normalize_text
+
+
+def test_normalize_text_drops_case_and_punctuation():
+    assert normalize_text("  Hello,   World!! ") == "hello world"
+    assert char_ngrams("ab") == {" ab", "ab "}
+
+
+def test_exact_match_ignores_case_and_punctuation():
+    memory = TranslationMemory(capacity=10, threshold=0.8)
+    memory.add("Press the button to continue.", "en", "ru", "Нажмите кнопку, чтобы продолжить.")
+
+    assert memory.lookup("press the button to continue", "en", "ru") == ("Нажмите кнопку, чтобы продолжить.", 1.0)
+
+
+def test_near_duplicate_is_found_above_threshold():
+    memory = TranslationMemory(capacity=10, threshold=0.7)
+    memory.add("Press the button to continue", "en", "ru", "Нажмите кнопку, чтобы продолжить")
+
+    translation, score = memory.lookup("Press the buttons to continue", "en", "ru")
+    assert translation == "Нажмите кнопку, чтобы продолжить"
+    assert 0.7 <= score < 1.0
+
+    assert memory.lookup("Here you can buy tickets", "en", "ru") is None
+
+
+def test_lookup_is_scoped_to_language_pair():
+    memory = TranslationMemory(capacity=10)
+    memory.add("Good morning", "en", "ru", "Доброе утро")
+
+    assert memory.lookup("Good morning", "en", "kk") is None
+    assert memory.lookup("Good morning", "de", "ru") is None
+
+
+def test_numbers_must_match_exactly():
+    memory = TranslationMemory(capacity=10, threshold=0.5)
+    memory.add("Order 5 items today", "en", "ru", "Закажите 5 товаров сегодня")
+
+    assert memory.lookup("Order 6 items today", "en", "ru") is None
+    assert memory.lookup("Order 5 items today!", "en", "ru")[0] == "Закажите 5 товаров сегодня"
+
+
+def test_oldest_entries_are_evicted_and_lookup_refreshes():
+    memory = TranslationMemory(capacity=2, threshold=1.0)
+    memory.add("first sentence", "en", "ru", "первое")
+    memory.add("second sentence", "en", "ru", "второе")
+    assert memory.lookup("first sentence", "en", "ru") is not None
+
+    memory.add("third sentence", "en", "ru", "третье")
+
+    assert len(memory) == 2
+    assert memory.lookup("second sentence", "en", "ru") is None
+    assert memory.lookup("first sentence", "en", "ru") == ("первое", 1.0)
+
+
+def test_readding_replaces_translation_and_long_text_is_skipped():
+    memory = TranslationMemory(capacity=10, max_chars=20)
+    memory.add("Hello", "en", "ru", "Привет")
+    memory.add("hello!", "en", "ru", "Здравствуйте")
+    memory.add("x" * 21, "en", "ru", "long")
+
+    assert len(memory) == 1
+    assert memory.lookup("Hello", "en", "ru") == ("Здравствуйте", 1.0)
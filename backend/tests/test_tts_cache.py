@@ -0,0 +1,130 @@
+import os
+import time
+
+import pytest
+
+from app.services.tts_cache import TTSCache, cache_key
+
+
+def synthesize(cache, key, content, extension=".mp3"):
+    """Файл, как его пишет TTSService: во временный путь кэша, затем put"""
+    path = cache.temp_path(key, extension)
+    with open(path, "wb") as f:
+        f.write(content)
+    return cache.put(key, path)
+
+
+def age(path, seconds):
+    stat = os.stat(path)
+    os.utime(path, (stat.st_atime - seconds, stat.st_mtime - seconds))
+
+
+@pytest.fixture
+def directory(tmp_path):
+    return str(tmp_path / "cache")
+
+
+def test_cache_key_normalizes_whitespace():
+    assert cache_key("Привет,   мир ", "ru", None, "gtts") == cache_key("Привет, мир", "ru", None, "gtts")
+    assert cache_key("Привет", "ru", None, "gtts") != cache_key("Привет", "kk", None, "gtts")
+
+
+def test_put_and_get(directory):
+    cache = TTSCache(directory, max_bytes=1000)
+    path = synthesize(cache, "a", b"x" * 100)
+
+    assert cache.get("a") == path
+    assert open(path, "rb").read() == b"x" * 100
+    assert cache.get("missing") is None
+
+
+def test_same_audio_is_stored_once(directory):
+    cache = TTSCache(directory, max_bytes=1000)
+    first = synthesize(cache, "kk", b"same audio")
+    second = synthesize(cache, "ru", b"same audio")
+
+    assert first != second
+    assert cache.size_bytes == len(b"same audio")
+    assert len(os.listdir(os.path.join(directory, "blobs"))) == 1
+
+
+def test_least_recently_used_entry_is_evicted(directory):
+    cache = TTSCache(directory, max_bytes=250)
+    for index, key in enumerate(["a", "b"]):
+        age(synthesize(cache, key, bytes([index]) * 100), 100 - index * 10)
+    cache.get("a")
+
+    synthesize(cache, "c", b"c" * 100)
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
+    assert cache.size_bytes == 200
+
+
+def test_file_larger_than_quota_is_returned_but_not_cached(directory):
+    cache = TTSCache(directory, max_bytes=50)
+    path = synthesize(cache, "big", b"x" * 100)
+
+    assert open(path, "rb").read() == b"x" * 100
+    assert cache.get("big") is None
+
+
+def test_workers_share_quota_and_recency(directory):
+    first, second = TTSCache(directory, max_bytes=250), TTSCache(directory, max_bytes=250)
+    age(synthesize(first, "a", b"a" * 100), 100)
+    age(synthesize(second, "b", b"b" * 100), 90)
+
+    # Запись второго воркера видна первому, обращение обновляет время для обоих
+    assert first.get("b") is not None
+    time.sleep(0.01)
+    path = first.get("a")
+
+    synthesize(second, "c", b"c" * 100)
+
+    assert os.path.exists(path)
+    assert second.get("a") == path
+    assert first.get("b") is None
+    blobs = os.path.join(directory, "blobs")
+    assert sum(os.path.getsize(os.path.join(blobs, name)) for name in os.listdir(blobs)) <= 250
+
+
+def test_index_is_restored_from_directory(directory):
+    cache = TTSCache(directory, max_bytes=1000)
+    path = synthesize(cache, "a", b"x" * 100)
+
+    restored = TTSCache(directory, max_bytes=1000)
+
+    assert restored.get("a") == path
+    assert len(restored) == 1
+
+
+def test_reads_and_puts_under_quota_do_not_scan_directory(directory, monkeypatch):
+    first, second = TTSCache(directory, max_bytes=10000), TTSCache(directory, max_bytes=10000)
+    synthesize(first, "a", b"a" * 100)
+    scans = []
+    for cache in (first, second):
+        scan = cache._scan
+        monkeypatch.setattr(cache, "_scan", lambda scan=scan: scans.append(1) or scan())
+
+    for index in range(20):
+        synthesize(first if index % 2 else second, f"key{index}", bytes([index]) * 100)
+    assert second.get("a") is not None
+    assert first.get("key0", ".mp3") is not None
+    assert first.get("missing") is None
+
+    assert scans == []
+    assert first.size_bytes == 2100
+
+
+def test_eviction_frees_space_below_quota(directory):
+    cache = TTSCache(directory, max_bytes=1000, low_water=0.5)
+    for index in range(10):
+        age(synthesize(cache, f"key{index}", bytes([index]) * 100), 100 - index)
+
+    synthesize(cache, "new", b"n" * 100)
+
+    assert cache.size_bytes <= 500
+    assert cache.get("new") is not None
+    assert cache.get("key9") is not None
+    assert cache.get("key0") is None
@@ -0,0 +1,99 @@
+import io
+import struct
+import wave
+
+import pytest
+
+from app.services.audio_concat import wav_pcm, wav_stream_header
+from app.services.tts_cache import TTSCache
+from app.services.tts_service import TTSService
+
+
+def write_wav(path, frames: bytes, rate: int = 16000):
+    with wave.open(str(path), "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(rate)
+        f.writeframes(frames)
+
+
+def test_stream_header_describes_pcm_with_open_length():
+    header = wav_stream_header(2, 2, 22050)
+
+    assert len(header) == 44
+    assert header[:4] == b"RIFF" and header[8:12] == b"WAVE" and header[36:40] == b"data"
+    assert struct.unpack("<I", header[4:8])[0] == 0xFFFFFFFF
+    assert struct.unpack("<I", header[40:44])[0] == 0xFFFFFFFF
+    channels, rate, byte_rate, block_align, bits = struct.unpack("<HIIHH", header[22:36])
+    assert (channels, rate, byte_rate, block_align, bits) == (2, 22050, 22050 * 4, 4, 16)
+
+    with wave.open(io.BytesIO(header + b"\x01\x00\x02\x00" * 10), "rb") as f:
+        assert (f.getnchannels(), f.getsampwidth(), f.getframerate()) == (2, 2, 22050)
+        assert f.readframes(10) == b"\x01\x00\x02\x00" * 10
+
+
+def test_wav_pcm_returns_frames_and_format(tmp_path):
+    write_wav(tmp_path / "a.wav", b"\x05\x00" * 8)
+
+    assert wav_pcm(str(tmp_path / "a.wav")) == (b"\x05\x00" * 8, (1, 2, 16000))
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    service = TTSService()
+    chunks = ["first", "second", "third"]
+    rates = {"first": 16000, "second": 16000, "third": 16000}
+
+    def synthesize_chunk(text, language, voice, engine):
+        path = tmp_path / f"{text}.wav"
+        write_wav(path, bytes([chunks.index(text) + 1, 0]) * 4, rate=rates[text])
+        return str(path), False, "model"
+
+    monkeypatch.setattr(service, "_plan", lambda text: (chunks, ["coqui"]))
+    monkeypatch.setattr(service, "_synthesize_chunk", synthesize_chunk)
+    service.rates = rates
+    return service
+
+
+def test_stream_sends_one_header_then_pcm_in_order(service):
+    media_type, audio = service.synthesize_stream("first second third", language="en")
+    parts = list(audio)
+
+    assert media_type == "audio/wav"
+    assert parts[0] == wav_stream_header(1, 2, 16000)
+    assert parts[1:] == [b"\x01\x00" * 4, b"\x02\x00" * 4, b"\x03\x00" * 4]
+
+
+def test_stream_rejects_chunk_with_other_format(service):
+    service.rates["third"] = 22050
+    _, audio = service.synthesize_stream("first second third", language="en")
+
+    with pytest.raises(ValueError):
+        list(audio)
+
+
+def test_fallback_model_audio_is_cached_under_its_own_key(tmp_path, monkeypatch):
+    service = TTSService()
+    service.cache = TTSCache(str(tmp_path / "cache"))
+    fallback = service.language_models["en"]
+    loaded = [fallback]
+
+    class Model:
+        def __init__(self, name):
+            self.name = name
+
+        def tts_to_file(self, text, file_path):
+            write_wav(file_path, b"\x01\x00" if self.name == fallback else b"\x02\x00")
+
+    monkeypatch.setattr(service, "_load", lambda language: (loaded[0], Model(loaded[0])))
+
+    path, cached, model = service._synthesize_chunk("Привет", "ru", None, "coqui")
+    assert (cached, model) == (False, fallback)
+
+    # Модель языка загрузилась: аудио запасной модели ей не отдается
+    loaded[0] = service.language_models["ru"]
+    path, cached, model = service._synthesize_chunk("Привет", "ru", None, "coqui")
+    assert (cached, model) == (False, service.language_models["ru"])
+    assert wav_pcm(path)[0] == b"\x02\x00"
+
+    assert service._synthesize_chunk("Привет", "ru", None, "coqui")[:2] == (path, True)
@@ -0,0 +1,36 @@
+import pytest
+
+from app.core.config import settings
+from app.services import whisper_service as module
+from app.services.whisper_service import WhisperService
+
+
+class FlakyPipeline:
+    attempts = 0
+
+    @classmethod
+    def from_pretrained(cls, name, use_auth_token=None):
+        cls.attempts += 1
+        if cls.attempts == 1:
+            raise ConnectionError("HF Hub unavailable")
+        return cls()
+
+
+def test_diarization_is_retried_after_cooldown(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(module, "PYANNOTE_AVAILABLE", True)
+    monkeypatch.setattr(module, "Pipeline", FlakyPipeline)
+    monkeypatch.setattr(module.time, "monotonic", lambda: clock[0])
+    monkeypatch.setattr(settings, "DIARIZATION_RETRY_SECONDS", 60)
+    service = WhisperService()
+    service.diarization_model = "test/flaky-diarization"
+
+    assert service.load_diarization_pipeline() is None
+    clock[0] += 30
+    assert service.load_diarization_pipeline() is None
+    assert FlakyPipeline.attempts == 1
+
+    clock[0] += 31
+    assert isinstance(service.load_diarization_pipeline(), FlakyPipeline)
+    assert FlakyPipeline.attempts == 2
+    module.model_registry.unload("pyannote:test/flaky-diarization")
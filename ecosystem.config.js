@@ -2,19 +2,29 @@ module.exports = {
   apps: [
     {
       name: 'ai-translate-backend',
-      script: 'uvicorn',
-      args: 'app.main:app --host 0.0.0.0 --port 8000',
+      // Pre-fork сервер: модели грузятся один раз в мастере, воркеры
+      // (SERVER_WORKERS) делят веса copy-on-write; instances остается 1.
+      // max_memory_restart pm2 проверяет только мастер (pid python3), память
+      // воркеров в него не входит: 7G - запас для мастера с моделями
+      // (MODEL_MEMORY_BUDGET_MB). Воркеры ограничивает сам мастер:
+      // SERVER_WORKER_MEMORY_MB собственной памяти на воркер
+      script: 'python3',
+      args: '-m app.server',
       cwd: './backend',
-      interpreter: 'python3',
+      interpreter: 'none',
       instances: 1,
       exec_mode: 'fork',
       autorestart: true,
       watch: false,
-      max_memory_restart: '2G',
+      max_memory_restart: '7G',
+      kill_timeout: 30000,
       env: {
         NODE_ENV: 'production',
         PYTHONUNBUFFERED: '1',
-        PYTHONDONTWRITEBYTECODE: '1'
+        PYTHONDONTWRITEBYTECODE: '1',
+        SERVER_WORKERS: '2',
+        SERVER_WORKER_MEMORY_MB: '3072',
+        MALLOC_ARENA_MAX: '2'
       },
       error_file: './logs/backend-error.log',
       out_file: './logs/backend-out.log',